@@ -0,0 +1,108 @@
+"""Precomputed per-category aggregates for natural-language queries.
+
+Totals for a time period come from the dataset's TimeIndex (time_index.py).
+"""
+import json
+import re
+import numpy as np
+import pandas as pd
+
+_REGEX_CHARS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+def matching_positions(names, category):
+    """Positions of the names that match category, like str.contains(category, case=False)."""
+    if _REGEX_CHARS.search(category):
+        try:
+            pattern = re.compile(category, re.IGNORECASE)
+            return [i for i, name in enumerate(names) if pattern.search(name)]
+        except re.error:
+            pass
+    needle = category.lower()
+    return [i for i, name in enumerate(names) if needle in name.lower()]
+
+
+class AggregateIndex:
+    """Sum, count and anomaly count of Amount per category.
+
+    The last entry holds transactions without a category so totals still
+    include them. Rows can be appended chunk by chunk with update().
+    """
+
+    def __init__(self, categories=(), sums=None, counts=None, anomalies=None):
+        self.categories = list(categories)
+        self._reindex()
+        size = len(self.categories) + 1
+        self.sums = np.zeros(size) if sums is None else np.asarray(sums, dtype='float64')
+        self.counts = np.zeros(size, dtype='int64') if counts is None else np.asarray(counts, dtype='int64')
+        self.anomalies = np.zeros(size, dtype='int64') if anomalies is None else np.asarray(anomalies, dtype='int64')
+
+    def _reindex(self):
+        self._positions = {name: i for i, name in enumerate(self.categories)}
+
+    def _add_categories(self, names):
+        new_names = [name for name in names if name not in self._positions]
+        if not new_names:
+            return
+        # New categories go before the trailing "no category" entry.
+        self.categories.extend(new_names)
+        self._reindex()
+        pad = np.zeros(len(new_names))
+        self.sums = np.concatenate([self.sums[:-1], pad, self.sums[-1:]])
+        self.counts = np.concatenate([self.counts[:-1], pad.astype('int64'), self.counts[-1:]])
+        self.anomalies = np.concatenate([self.anomalies[:-1], pad.astype('int64'), self.anomalies[-1:]])
+
+    def update(self, chunk):
+        """Adds a chunk of rows (Amount, optional Category/is_anomaly)."""
+        if 'Amount' not in chunk.columns or len(chunk) == 0:
+            return
+        if 'Category' in chunk.columns:
+            codes, uniques = pd.factorize(chunk['Category'])
+            uniques = [str(name) for name in uniques]
+            self._add_categories(uniques)
+            mapping = np.array([self._positions[name] for name in uniques] + [len(self.categories)])
+            rows = mapping[codes]  # code -1 (missing) picks the trailing entry
+        else:
+            rows = np.full(len(chunk), len(self.categories))
+
+        size = self.sums.size
+        amounts = np.nan_to_num(chunk['Amount'].to_numpy('float64'))
+        self.sums += np.bincount(rows, weights=amounts, minlength=size)
+        self.counts += np.bincount(rows, minlength=size)
+        if 'is_anomaly' in chunk.columns:
+            flagged = chunk['is_anomaly'].to_numpy() == 1
+            self.anomalies += np.bincount(rows[flagged], minlength=size)
+
+    def merge(self, other):
+        """Adds another index's totals, e.g. one built from a shard of the same upload."""
+        self._add_categories(other.categories)
+        rows = np.array([self._positions[name] for name in other.categories] + [len(self.categories)])
+        np.add.at(self.sums, rows, other.sums)
+        np.add.at(self.counts, rows, other.counts)
+        np.add.at(self.anomalies, rows, other.anomalies)
+
+    def matching_rows(self, category):
+        """Positions of the categories that match category (see matching_positions)."""
+        return matching_positions(self.categories, category)
+
+    def total_spending(self):
+        return float(self.sums.sum())
+
+    def category_spending(self, category):
+        return float(self.sums[self.matching_rows(category)].sum())
+
+    def anomaly_count(self):
+        return int(self.anomalies.sum())
+
+    def to_json(self):
+        return json.dumps({
+            "categories": self.categories,
+            "sums": self.sums.tolist(),
+            "counts": self.counts.tolist(),
+            "anomalies": self.anomalies.tolist(),
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(data["categories"], data["sums"], data["counts"], data["anomalies"])
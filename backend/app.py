@@ -1,54 +1,142 @@
-import matplotlib
-matplotlib.use('Agg')
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS # Import the CORS library
 import pandas as pd
-import joblib
+import numpy as np
+import hashlib
+import json
 import os
-from groq import Groq
+import threading
 from dotenv import load_dotenv
 from io import BytesIO
-import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import confusion_matrix
+from dataset_store import UNLABELED, DatasetStore
+from upload_registry import UnknownDatasetError, UploadRegistry
+from query_parser import MIN_CONFIDENCE as LOCAL_PARSER_MIN_CONFIDENCE, parse_query_locally
+from llm_cache import LLMResponseCache, cached_chat_completion
+from llm_executor import LLMExecutor, LLMOverloadedError, LLMTimeoutError
+from scoring import (
+    RAW_FEATURE_COLUMNS, ScoringInputError, features_from_columns, features_from_npy,
+    parse_threshold, select_above_threshold,
+)
+from model_registry import ModelNotReadyError, ModelRegistry
+from parallel_scoring import ScoringExecutor
+from time_index import TIME_PERIODS
+from upload_validation import MAX_REQUEST_BYTES, UploadRejected, validate_csv_upload
+from simulation import (
+    DEFAULT_MONTHS, MAX_MONTHS, MAX_SCENARIOS, ScenarioError, normalize_scenario, parse_scenario_text,
+    scenario_results, simulate, spending_inputs, template_narrative,
+)
+from confusion_report import ConfusionReportCache, confusion_counts, derived_metrics, upload_digest
+from model_evaluation import EvaluationCache, ModelCatalog, evaluate_models
+from instrumentation import ProfileStore, RequestMetrics, SamplingProfiler, begin_trace, end_trace, span
+from ingest import (
+    NON_ESSENTIAL_CATEGORIES, REQUIRED_MODEL_COLUMNS, STREAMING_THRESHOLD_BYTES, MissingColumnsError,
+    analyze_csv_streaming, append_csv_rows, build_savings_plan, csv_row_hashes, expenditure_from_aggregates,
+    flag_anomalies, predict_anomalies, row_hashes, save_upload,
+)
+from responses import (
+    DEFAULT_PAGE_SIZE, NDJSON_MIMETYPE, ResponseFormatError, dumps as dumps_json, encode_rows, iter_ndjson,
+    parse_options, select_page,
+)
 
 # Load environment variables
 load_dotenv()
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with every jsonify() timed as the json_serialize stage.
+
+    Compact responses go through responses.dumps (orjson when installed),
+    which also encodes NumPy values; pretty-printed ones use Flask's encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        with span('json_serialize'):
+            if 'indent' in kwargs:
+                return super().dumps(obj, **kwargs)
+            return dumps_json(obj, sort_keys=self.sort_keys, default=self.default).decode()
+
 # Initialize the Flask application
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
+# Oversized request bodies get a 413 before any of the body is read.
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
 # Enable Cross-Origin Resource Sharing (CORS) to allow your React frontend
 # to communicate with this backend.
 CORS(app)
 
 # Configure Groq API
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-if GROQ_API_KEY:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-else:
+if not GROQ_API_KEY:
     print("⚠️  Warning: GROQ_API_KEY environment variable not set. AI features will not work.")
-    groq_client = None
+_groq_client = None
+_groq_client_lock = threading.Lock()
+
+def get_groq_client():
+    """The Groq client, created on first use so the SDK stays off the startup path."""
+    global _groq_client
+    if not GROQ_API_KEY:
+        return None
+    with _groq_client_lock:
+        if _groq_client is None:
+            from groq import Groq
+            # GROQ_BASE_URL (read by the SDK) can point this at a local stub for load tests.
+            _groq_client = Groq(api_key=GROQ_API_KEY, timeout=float(os.getenv('LLM_TIMEOUT_SECONDS', 30)), max_retries=1)
+    return _groq_client
+
+LLM_MODEL = "llama-3.3-70b-versatile"  # Latest fast and accurate model
+# Repeated questions and scenarios are answered from this cache instead of Groq.
+llm_cache = LLMResponseCache.from_env()
+# Groq calls run on a bounded thread pool: at most LLM_MAX_CONCURRENCY in flight,
+# LLM_MAX_PENDING queued before /query answers 503 (/simulate falls back to a
+# template narrative). Serve the app
+# with gunicorn's gthread workers (see gunicorn.conf.py) so one worker process
+# keeps many LLM-bound requests in flight at once.
+llm_executor = LLMExecutor()
+
+@app.errorhandler(ModelNotReadyError)
+def model_not_ready_response(error):
+    """503 with Retry-After while the model artifacts are loading or failed to load."""
+    response = jsonify({"error": "The fraud model is not loaded yet. Please retry shortly.", "details": str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@app.errorhandler(UploadRejected)
+def upload_rejected_response(error):
+    """400 (or 413 when over a size or row limit) for an upload the validator refused."""
+    return jsonify({"error": "Upload rejected", "details": str(error)}), error.status
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large_response(error):
+    return jsonify({"error": "Upload rejected",
+                    "details": f"The request body is larger than the {app.config['MAX_CONTENT_LENGTH']:,}-byte limit."}), 413
+
+def missing_columns_response():
+    return jsonify({
+        "error": "CSV is missing required columns for anomaly detection.",
+        "details": "The model requires 'Time', 'Amount', and 'V1' through 'V28' columns."
+    }), 400
+
+def llm_unavailable_response(error):
+    """503 with Retry-After when the LLM queue is full, 504 on timeout."""
+    if isinstance(error, LLMOverloadedError):
+        response = jsonify({"error": "The AI assistant is busy. Please retry shortly.", "details": str(error)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return jsonify({"error": "The AI assistant took too long to respond.", "details": str(error)}), 504
 
 # --- 1. Load the pre-trained assets ---
-# This block of code runs only once when the server starts.
+# Artifacts load once on a background thread so the server starts answering
+# immediately (GET /ready reports when the model is loaded); the registry then
+# watches ml_assets/ and hot-swaps a retrained model without a restart.
+# Endpoints take one model_registry.current() snapshot per request, waiting
+# for the initial load if it is still running. MODEL_BACKGROUND_LOAD=0 loads
+# before the app finishes importing instead.
 try:
     # Get the directory where app.py is located
     app_dir = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(app_dir, 'ml_assets', 'fraud_detection_model.pkl')
-    metrics_path = os.path.join(app_dir, 'ml_assets', 'model_metrics.pkl')
-    scaler_path = os.path.join(app_dir, 'ml_assets', 'scaler.pkl')
-
-    fraud_model = joblib.load(model_path)
-    metrics_data = joblib.load(metrics_path)
-    
-    # Convert numpy types to Python native types for JSON serialization
-    for key, value in metrics_data.items():
-        if hasattr(value, 'item'):  # Check if it's a numpy type with item() method
-            metrics_data[key] = value.item()
-    
-    scaler = joblib.load(scaler_path)
-    print("✅ Model, metrics, and scaler loaded successfully.")
+    model_registry = ModelRegistry(os.path.join(app_dir, 'ml_assets'))
+    model_registry.start(background=os.getenv('MODEL_BACKGROUND_LOAD', '1') != '0')
 except FileNotFoundError as e:
     print(f"❌ Error loading .pkl files: {e}")
     print("Please ensure you have run 'train_model.py' and the files are in the 'ml_assets' directory.")
@@ -68,21 +156,60 @@ def perform_expenditure_analysis(df):
     
     total_spend = df['Amount'].sum()
     spend_by_category = df.groupby('Category')['Amount'].sum().round(2).to_dict()
-    
-    # Simple Savings Plan Logic
-    savings_plan = {}
-    non_essential = ['Dining', 'Entertainment', 'Shopping', 'Travel'] # Example categories
-    for category, amount in spend_by_category.items():
-        if category in non_essential and amount > 50: # Set a threshold
-            potential_savings = amount * 0.15 # Suggest saving 15%
-            savings_plan[category] = f"You could save ${potential_savings:.2f}/month by reducing spending on {category} by 15%."
 
     return {
         "total_spend": round(total_spend, 2),
         "spend_by_category": spend_by_category,
-        "savings_plan": savings_plan
+        "savings_plan": build_savings_plan(spend_by_category)
     }
 
+# Each upload is stored under its own dataset ID (CSV plus a typed columnar copy
+# that /query and /simulate memory-map instead of re-parsing the CSV). Point
+# UPLOADS_DIR at shared storage to let several workers serve the same uploads.
+UPLOADS_DIR = os.getenv('UPLOADS_DIR', os.path.join(app_dir, 'uploads'))
+upload_registry = UploadRegistry(UPLOADS_DIR)
+
+# Streaming uploads of PARALLEL_SCORING_MIN_BYTES or more are parsed and scored
+# in shards by SCORING_WORKERS processes (see parallel_scoring.py).
+scoring_executor = ScoringExecutor()
+
+# A generated large_test_data.csv is still used when nothing has been uploaded yet.
+DATA_CSV_PATH = os.path.join(app_dir, 'large_test_data.csv')
+legacy_dataset_store = DatasetStore(DATA_CSV_PATH)
+
+def load_dataset(dataset_id=None):
+    """Returns the requested upload, the most recent one, or the demo CSV."""
+    dataset_id = dataset_id or upload_registry.latest_id()
+    if dataset_id:
+        return upload_registry.load(dataset_id)
+    if not legacy_dataset_store.exists():
+        raise FileNotFoundError("No uploaded dataset")
+    return legacy_dataset_store.load()
+
+def load_aggregates(dataset_id=None):
+    """Returns the precomputed AggregateIndex for the same dataset load_dataset picks."""
+    dataset_id = dataset_id or upload_registry.latest_id()
+    if dataset_id:
+        return upload_registry.load_aggregates(dataset_id)
+    if not legacy_dataset_store.exists():
+        raise FileNotFoundError("No uploaded dataset")
+    return legacy_dataset_store.load_aggregates()
+
+def load_time_index(dataset_id=None):
+    """Returns the sorted TimeIndex for the same dataset load_dataset picks."""
+    dataset_id = dataset_id or upload_registry.latest_id()
+    if dataset_id:
+        return upload_registry.load_time_index(dataset_id)
+    if not legacy_dataset_store.exists():
+        raise FileNotFoundError("No uploaded dataset")
+    return legacy_dataset_store.load_time_index()
+
+def needs_time_index(query_requirements):
+    """True if answering the query needs per-period totals rather than all-time ones."""
+    period = query_requirements.get('time_period')
+    return (query_requirements.get('comparison') == 'month_over_month' or
+            (period in TIME_PERIODS and period != 'all_time'))
+
 # --- 2. Define the API Endpoint ---
 # This endpoint will handle the file uploads and return the analysis.
 @app.route('/analyze', methods=['POST'])
@@ -94,62 +221,123 @@ def analyze_transactions():
     if file.filename == '':
         return jsonify({"error": "No file selected"}), 400
 
+    model = model_registry.current()
+
+    # The header and size are checked from the first block of the upload,
+    # so a wrong file is refused before it is saved or parsed.
+    try:
+        with span('upload_validate'):
+            header, _, _ = validate_csv_upload(file.stream, model.kernel.columns)
+    except MissingColumnsError:
+        return missing_columns_response()
+
+    # ?format=columnar|ndjson, ?fields=Time,Amount,Category,score and
+    # ?offset=/?limit= shape user_anomalies (see responses.py).
+    try:
+        anomaly_format, anomaly_fields, offset, limit = parse_options(request.args, columns=header)
+    except ResponseFormatError as e:
+        return jsonify({"error": "Invalid anomaly response options", "details": str(e)}), 400
 
     try:
         # Save uploaded file for later use by other endpoints
-        app_dir = os.path.dirname(os.path.abspath(__file__))
-        save_path = os.path.join(app_dir, 'large_test_data.csv')
-        file.seek(0)  # Reset file pointer
-        with open(save_path, 'wb') as f:
-            f.write(file.read())
-        print(f"[UPLOAD] Saved uploaded CSV to: {save_path}")
-        file.seek(0)  # Reset again for pandas
-        user_df = pd.read_csv(file)
-
-        # --- Part A: Expenditure Analysis on raw data ---
-        analysis_results = perform_expenditure_analysis(user_df.copy())
-
-        # --- Part B: Anomaly Detection using the trained model ---
-        # IMPORTANT: The model requires the user's CSV to have the same structure
-        # as the training data ('Time', 'V1'-'V28', 'Amount').
-        # We will check for the essential columns.
-        required_cols = ['Time', 'Amount'] + [f'V{i}' for i in range(1, 29)]
-        if not all(col in user_df.columns for col in required_cols):
-            return jsonify({
-                "error": "CSV is missing required columns for anomaly detection.",
-                "details": "The model requires 'Time', 'Amount', and 'V1' through 'V28' columns."
-            }), 400
-
-        user_df_processed = user_df.copy()
-        user_df_processed['scaled_amount'] = scaler.transform(user_df_processed['Amount'].values.reshape(-1, 1))
-        user_df_processed['scaled_time'] = scaler.transform(user_df_processed['Time'].values.reshape(-1, 1))
-        user_df_processed = user_df_processed.drop(['Time', 'Amount'], axis=1)
-
-        # Reorder columns to match the model's training data
-        model_features = list(fraud_model.feature_names_in_)
-        user_df_processed = user_df_processed[model_features]
-
-        # Predict anomalies
-        predictions = fraud_model.predict(user_df_processed)
-        user_df['is_anomaly'] = predictions
-
-        anomalies = user_df[user_df['is_anomaly'] == 1].to_dict(orient='records')
+        with span('upload_write'):
+            dataset_id, save_path = upload_registry.save_upload(file, save_upload)
+        upload_size = os.path.getsize(save_path)
+        print(f"[UPLOAD] Saved uploaded CSV ({upload_size} bytes) to: {save_path}")
+        dataset_store = upload_registry.store(dataset_id)
+
+        # Large uploads are parsed and scored in fixed-size chunks so peak memory
+        # depends on the chunk size rather than the file size. Very large uploads
+        # are also split into shards scored by a process pool. ?mode=stream,
+        # ?mode=parallel or ?mode=memory overrides the size-based choice.
+        mode = request.args.get('mode')
+        if mode is None:
+            mode = 'stream' if upload_size > STREAMING_THRESHOLD_BYTES else 'memory'
+            if mode == 'stream' and scoring_executor.should_parallelize(upload_size):
+                mode = 'parallel'
+
+        if mode in ('stream', 'parallel'):
+            try:
+                writer = dataset_store.writer()
+                if mode == 'parallel':
+                    anomalies, analysis_results = scoring_executor.analyze_csv(save_path, model.kernel, writer=writer)
+                else:
+                    anomalies, analysis_results = analyze_csv_streaming(save_path, model.kernel, writer=writer)
+                with span('store_write'):
+                    writer.close(save_path)
+            except MissingColumnsError:
+                upload_registry.discard(dataset_id)
+                return missing_columns_response()
+        else:
+            with span('csv_parse'):
+                user_df = pd.read_csv(save_path)
+
+            # --- Part A: Expenditure Analysis on raw data ---
+            with span('aggregation'):
+                analysis_results = perform_expenditure_analysis(user_df)
+
+            # --- Part B: Anomaly Detection using the trained model ---
+            # IMPORTANT: The model requires the user's CSV to have the same structure
+            # as the training data ('Time', 'V1'-'V28', 'Amount').
+            # We will check for the essential columns.
+            if not all(col in user_df.columns for col in REQUIRED_MODEL_COLUMNS):
+                upload_registry.discard(dataset_id)
+                return missing_columns_response()
+
+            # Predict anomalies (sets user_df['is_anomaly'])
+            anomalies = flag_anomalies(user_df, model.kernel)
+
+            with span('store_write'):
+                writer = dataset_store.writer()
+                writer.append(user_df)
+                writer.close(save_path)
+
+        upload_registry.save_anomalies(dataset_id, anomalies.index.to_numpy(), anomalies['score'].to_numpy())
+        upload_registry.mark_latest(dataset_id)
 
         # --- Part C: Combine all results into a single response ---
+        page = select_page(anomalies.reset_index(drop=True), anomaly_fields, offset, limit)
         response_data = {
-            "model_performance": metrics_data, # From the loaded .pkl file
-            "user_anomalies": anomalies,       # From the user's data
-            "expenditure_analysis": analysis_results # Also from the user's data
+            "dataset_id": dataset_id,          # Pass to /query and /simulate
+            "model_version": model.version,
+            "model_performance": model.metrics, # From the loaded .pkl file
+            "expenditure_analysis": analysis_results, # Also from the user's data
+            "anomalies_total": len(anomalies),
         }
-
+        if limit is not None:
+            next_offset = offset + len(page)
+            response_data["anomalies_next_offset"] = next_offset if next_offset < len(anomalies) else None
+        if anomaly_format == 'ndjson':
+            # Summary object on the first line, then one anomaly per line
+            return Response(iter_ndjson(response_data, page), mimetype=NDJSON_MIMETYPE)
+        response_data["user_anomalies"] = encode_rows(page, anomaly_format)  # From the user's data
         return jsonify(response_data)
 
+    except ResponseFormatError as e:
+        return jsonify({"error": "Invalid anomaly response options", "details": str(e)}), 400
     except Exception as e:
         # Generic error handler for issues like malformed CSVs
         return jsonify({"error": "An error occurred during processing", "details": str(e)}), 500
 
+def parse_llm_json(response_text):
+    """Parses an LLM reply as JSON, tolerating a surrounding markdown code block."""
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text.replace("```json", "").replace("```", "").strip()
+    elif response_text.startswith("```"):
+        response_text = response_text.replace("```", "").strip()
+    return json.loads(response_text)
+
 def parse_natural_language_query(query):
     """Use Groq to parse natural language query and extract data requirements."""
+    # Common phrasings are parsed locally in microseconds; only ambiguous
+    # queries pay for the LLM round-trip.
+    with span('query_parse'):
+        local_result, confidence = parse_query_locally(query)
+    if confidence >= LOCAL_PARSER_MIN_CONFIDENCE:
+        return local_result
+
+    groq_client = get_groq_client()
     if not groq_client:
         return {"error": "Groq API not configured"}
     
@@ -172,34 +360,24 @@ def parse_natural_language_query(query):
     """
     
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.3-70b-versatile",  # Latest fast and accurate model
-            temperature=0.1,
-        )
-        
-        response_text = chat_completion.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
-        elif response_text.startswith("```"):
-            response_text = response_text.replace("```", "").strip()
-        
-        # Parse the JSON response
-        import json
-        result = json.loads(response_text)
-        return result
+        with span('llm_call'):
+            response_text = cached_chat_completion(
+                groq_client, llm_cache, prompt, model=LLM_MODEL, temperature=0.1, key_text=query,
+                validate=parse_llm_json, executor=llm_executor
+            )
+        return parse_llm_json(response_text)
+    except (LLMOverloadedError, LLMTimeoutError):
+        raise
     except Exception as e:
         return {"error": f"Failed to parse query: {str(e)}"}
 
-def analyze_query_with_data(query_requirements, df):
-    """Analyze the data based on parsed query requirements."""
+def analyze_query_with_data(query_requirements, aggregates, time_index=None):
+    """Analyze the data based on parsed query requirements.
+
+    All-time answers come from the dataset's precomputed AggregateIndex
+    (O(categories)); answers for a time period come from its TimeIndex
+    (O(log n) per category). Neither scans the rows.
+    """
     if 'error' in query_requirements:
         return query_requirements
     
@@ -207,23 +385,14 @@ def analyze_query_with_data(query_requirements, df):
     category = query_requirements.get('category')
     time_period = query_requirements.get('time_period')
     comparison = query_requirements.get('comparison')
-    
-    # For simplicity, let's assume Time represents days (1-30 for a month)
-    # We'll simulate month separation
-    current_month_data = df[df['Time'] <= 30]  # First 30 days as current month
-    last_month_data = df[(df['Time'] > 30) & (df['Time'] <= 60)]  # Next 30 days as last month
+    # Unknown periods from the LLM fall back to all-time totals.
+    period = time_period if time_period in TIME_PERIODS and time_period != 'all_time' else None
+    period_text = f" {period.replace('_', ' ')}" if period else ""
     
     if query_type == 'spending_comparison' and comparison == 'month_over_month' and category:
-        # Filter by category (case insensitive partial match)
-        current_month_cat = current_month_data[
-            current_month_data['Category'].str.contains(category, case=False, na=False)
-        ]
-        last_month_cat = last_month_data[
-            last_month_data['Category'].str.contains(category, case=False, na=False)
-        ]
-        
-        current_spend = current_month_cat['Amount'].sum()
-        last_spend = last_month_cat['Amount'].sum()
+        # Category match is case insensitive and partial, like str.contains
+        current_spend = time_index.spending('this_month', category)
+        last_spend = time_index.spending('last_month', category)
         
         return {
             "response": f"You spent ${last_spend:.2f} last month and ${current_spend:.2f} this month on {category}.",
@@ -235,28 +404,44 @@ def analyze_query_with_data(query_requirements, df):
         }
     
     elif query_type == 'total_spending':
-        total = df['Amount'].sum()
+        total = time_index.spending(period) if period else aggregates.total_spending()
         return {
-            "response": f"Your total spending is ${total:.2f}.",
-            "data": {"total_spending": round(total, 2)}
+            "response": f"Your total spending{period_text} is ${total:.2f}.",
+            "data": {"total_spending": round(total, 2), "time_period": period or "all_time"}
         }
     
     elif query_type == 'category_spending' and category:
-        category_data = df[df['Category'].str.contains(category, case=False, na=False)]
-        total = category_data['Amount'].sum()
+        total = time_index.spending(period, category) if period else aggregates.category_spending(category)
         return {
-            "response": f"You spent ${total:.2f} on {category}.",
-            "data": {"category_spending": round(total, 2), "category": category}
+            "response": f"You spent ${total:.2f} on {category}{period_text}.",
+            "data": {"category_spending": round(total, 2), "category": category, "time_period": period or "all_time"}
         }
     
     elif query_type == 'anomaly_count':
-        anomalies = df[df['is_anomaly'] == 1] if 'is_anomaly' in df.columns else pd.DataFrame()
-        count = len(anomalies)
+        count = aggregates.anomaly_count()
         return {
             "response": f"You have {count} detected anomalous transactions.",
             "data": {"anomaly_count": count}
         }
     
+    elif query_type == 'savings_analysis':
+        # The same plan /analyze returns, built from the aggregate index.
+        spend_by_category, total = spending_inputs(aggregates)
+        if category:
+            matching = {aggregates.categories[i] for i in aggregates.matching_rows(category)}
+            spend_by_category = {name: amount for name, amount in spend_by_category.items() if name in matching}
+        savings_plan = build_savings_plan(spend_by_category)
+        if savings_plan:
+            response = " ".join(savings_plan.values())
+        else:
+            scope = f" for {category}" if category else ""
+            response = (f"There are no savings suggestions{scope}: only non-essential categories "
+                        f"({', '.join(NON_ESSENTIAL_CATEGORIES)}) with more than $50 of spending get one.")
+        return {
+            "response": response,
+            "data": {"savings_plan": savings_plan, "total_spending": round(total, 2)}
+        }
+    
     else:
         return {"response": "I'm sorry, I couldn't understand that query. Please try asking about spending amounts, categories, or anomalies."}
 
@@ -272,186 +457,566 @@ def natural_language_query():
     # For now, we'll need the user to upload data first. In a real app, you'd store this in a database.
     # For this demo, we'll check if there's a recent upload or use sample data
     try:
-        # Try to load the large_test_data.csv as sample data
-        app_dir = os.path.dirname(os.path.abspath(__file__))
-        sample_data_path = os.path.join(app_dir, 'large_test_data.csv')
-        print(f"[QUERY] Looking for CSV at: {sample_data_path}")
-        if not os.path.exists(sample_data_path):
-            print("[QUERY] CSV file not found!")
-            return jsonify({"error": "No data available. Please upload a CSV file first using the /analyze endpoint."}), 400
-        sample_df = pd.read_csv(sample_data_path)
-        print(f"[QUERY] Loaded CSV with shape: {sample_df.shape}")
-        sample_df['is_anomaly'] = 0  # Add anomaly column for demo
+        # Load the dataset named in the request, or the most recent upload
+        with span('dataset_load'):
+            aggregates = load_aggregates(data.get('dataset_id'))
+        print(f"[QUERY] Loaded aggregates for {len(aggregates.categories)} categories")
 
         # Parse the query
         query_requirements = parse_natural_language_query(query)
 
+        time_index = None
+        if needs_time_index(query_requirements):
+            with span('dataset_load'):
+                time_index = load_time_index(data.get('dataset_id'))
+
         # Analyze with data
-        result = analyze_query_with_data(query_requirements, sample_df)
+        with span('aggregation'):
+            result = analyze_query_with_data(query_requirements, aggregates, time_index)
 
         return jsonify(result)
 
+    except (LLMOverloadedError, LLMTimeoutError) as e:
+        return llm_unavailable_response(e)
+    except UnknownDatasetError:
+        return jsonify({"error": "Unknown dataset_id. Upload the CSV again using the /analyze endpoint."}), 404
     except FileNotFoundError:
-        print("[QUERY] FileNotFoundError for CSV!")
+        print("[QUERY] No uploaded dataset found!")
         return jsonify({"error": "No data available. Please upload a CSV file first using the /analyze endpoint."}), 400
     except Exception as e:
         print(f"[QUERY] Exception: {str(e)}")
         return jsonify({"error": "An error occurred during query processing", "details": str(e)}), 500
 
-def simulate_financial_decision(scenario, df):
-    """Simulate the impact of financial decisions."""
+def scenario_from_llm(scenario_text, categories):
+    """Asks Groq to translate a free-text scenario into structured changes (no arithmetic)."""
+    groq_client = get_groq_client()
     if not groq_client:
-        return {"error": "Groq API not configured"}
-    
-    # Calculate current metrics
-    total_spend = df['Amount'].sum()
-    spend_by_category = df.groupby('Category')['Amount'].sum().to_dict()
-    
-    # Assume a 6-month savings plan with 15% monthly savings
-    monthly_savings_rate = 0.15
-    months = 6
-    
+        raise ScenarioError("The scenario was not recognized and the Groq API is not configured; "
+                            "send structured 'changes' instead")
+
     prompt = f"""
-    Analyze this financial scenario and provide a realistic simulation.
-    Current data:
-    - Total spending: ${total_spend:.2f}
-    - Monthly spending categories: {spend_by_category}
-    - Current savings plan: {monthly_savings_rate*100}% of spending per month for {months} months
-    
-    Scenario: "{scenario}"
-    
+    Translate this personal-finance what-if scenario into structured changes.
+    Return ONLY a valid JSON object (no markdown, no extra text) of the form:
+    {{"changes": [ ... ]}}
+    where each change is one of:
+    - {{"type": "cut_category", "category": one of {list(categories)}, "percent": number (negative to increase)}}
+    - {{"type": "recurring_expense", "amount": monthly dollars, "start_month": 1-{DEFAULT_MONTHS}}}
+    - {{"type": "one_time_expense", "amount": dollars, "month": 1-{DEFAULT_MONTHS}}}
+    - {{"type": "income_change", "amount": monthly dollars (negative for a drop), "start_month": 1-{DEFAULT_MONTHS}}}
+    - {{"type": "extra_savings", "amount": monthly dollars, "start_month": 1-{DEFAULT_MONTHS}}}
+    Do not compute any totals.
+
+    Scenario: "{scenario_text}"
+    """
+    with span('llm_call'):
+        response_text = cached_chat_completion(
+            groq_client, llm_cache, prompt, model=LLM_MODEL, temperature=0.0,
+            key_text=scenario_text, context=f"scenario-changes|{sorted(categories)}",
+            validate=parse_llm_json, executor=llm_executor
+        )
+    return parse_llm_json(response_text)
+
+def narrate_simulation(scenario_text, result):
+    """Impact description and recommendations for computed results.
+
+    Groq only phrases the narrative; the figures come from the simulation
+    engine and are passed in, never recomputed. Falls back to a template when
+    the LLM is not configured, busy or returns something unusable.
+    """
+    groq_client = get_groq_client()
+    if groq_client:
+        figures = {key: result[key] for key in ('changes', 'months', 'original_6month_savings',
+                                                'new_6month_savings', 'monthly_change')}
+        prompt = f"""
+    Write a short explanation of this savings simulation for the user.
+    Scenario: "{scenario_text}"
+    Computed results (use these figures exactly; do not recalculate): {json.dumps(figures)}
+
     Provide ONLY a valid JSON response (no markdown, no extra text) with:
     {{
-        "impact_description": "description of the impact",
-        "original_6month_savings": "calculated amount",
-        "new_6month_savings": "adjusted amount after scenario",
-        "monthly_change": "amount saved/lost per month",
+        "impact_description": "one or two sentences describing the impact",
         "recommendations": ["list", "of", "recommendations"]
     }}
     """
-    
-    try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.3-70b-versatile",  # Latest fast and accurate model
-            temperature=0.3,
-        )
-        
-        response_text = chat_completion.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
-        elif response_text.startswith("```"):
-            response_text = response_text.replace("```", "").strip()
-        
-        import json
-        result = json.loads(response_text)
-        return result
-    except Exception as e:
-        return {"error": f"Failed to simulate scenario: {str(e)}"}
+        try:
+            with span('llm_call'):
+                response_text = cached_chat_completion(
+                    groq_client, llm_cache, prompt, model=LLM_MODEL, temperature=0.3,
+                    key_text=scenario_text, context=f"scenario-narrative|{json.dumps(figures, sort_keys=True)}",
+                    validate=parse_llm_json, executor=llm_executor
+                )
+            narrative = parse_llm_json(response_text)
+            if isinstance(narrative.get("impact_description"), str) and isinstance(narrative.get("recommendations"), list):
+                return {"impact_description": narrative["impact_description"],
+                        "recommendations": narrative["recommendations"], "narrative_source": "llm"}
+        except Exception as e:
+            print(f"[SIMULATE] Narrative fell back to template: {str(e)}")
+    return {**template_narrative(result), "narrative_source": "template"}
 
 # --- 5. What-If Simulation Endpoint ---
 @app.route('/simulate', methods=['POST'])
 def what_if_simulation():
+    """Projects savings under what-if scenarios with the local simulation engine.
+
+    {"scenario": text or {"changes": [...]}} returns one result with a
+    narrative; {"scenarios": [{"changes": [...]}, ...]} projects many
+    structured scenarios at once and returns the figures only.
+    """
     data = request.get_json()
-    if not data or 'scenario' not in data:
+    if not data or ('scenario' not in data and 'scenarios' not in data):
         return jsonify({"error": "No scenario provided"}), 400
-    
-    scenario = data['scenario']
-    
+
     try:
-        # Load sample data
-        app_dir = os.path.dirname(os.path.abspath(__file__))
-        sample_data_path = os.path.join(app_dir, 'large_test_data.csv')
-        print(f"[SIMULATE] Looking for CSV at: {sample_data_path}")
-        if not os.path.exists(sample_data_path):
-            print("[SIMULATE] CSV file not found!")
-            return jsonify({"error": "No data available. Please upload a CSV file first."}), 400
-        sample_df = pd.read_csv(sample_data_path)
-        print(f"[SIMULATE] Loaded CSV with shape: {sample_df.shape}")
-        
-        # Run simulation
-        result = simulate_financial_decision(scenario, sample_df)
-        
+        months = data.get('months', DEFAULT_MONTHS)
+        if not isinstance(months, int) or isinstance(months, bool) or not 1 <= months <= MAX_MONTHS:
+            raise ScenarioError(f"months must be an integer between 1 and {MAX_MONTHS}")
+
+        # Load the dataset named in the request, or the most recent upload
+        with span('dataset_load'):
+            aggregates = load_aggregates(data.get('dataset_id'))
+        spend_by_category, total_spend = spending_inputs(aggregates)
+        print(f"[SIMULATE] Loaded aggregates for {len(spend_by_category)} categories")
+
+        if 'scenarios' in data:
+            if not isinstance(data['scenarios'], list) or not 1 <= len(data['scenarios']) <= MAX_SCENARIOS:
+                raise ScenarioError(f"scenarios must be a list of 1 to {MAX_SCENARIOS} scenarios")
+            scenarios = [normalize_scenario(scenario, spend_by_category, months) for scenario in data['scenarios']]
+            with span('simulation'):
+                results = scenario_results(scenarios, simulate(spend_by_category, total_spend, scenarios, months))
+            return jsonify({"months": months, "results": results})
+
+        scenario = data['scenario']
+        scenario_text = scenario if isinstance(scenario, str) else json.dumps(scenario, sort_keys=True)
+        if isinstance(scenario, str):
+            with span('query_parse'):
+                scenario = parse_scenario_text(scenario_text, spend_by_category)
+            if scenario is None:
+                scenario = scenario_from_llm(scenario_text, list(spend_by_category))
+        scenario = normalize_scenario(scenario, spend_by_category, months)
+        with span('simulation'):
+            result = scenario_results([scenario], simulate(spend_by_category, total_spend, [scenario], months))[0]
+        result.update(narrate_simulation(scenario_text, result))
         return jsonify(result)
 
+    except ScenarioError as e:
+        return jsonify({"error": "Invalid scenario", "details": str(e)}), 400
+    except (LLMOverloadedError, LLMTimeoutError) as e:
+        return llm_unavailable_response(e)
+    except UnknownDatasetError:
+        return jsonify({"error": "Unknown dataset_id. Upload the CSV again using the /analyze endpoint."}), 404
     except FileNotFoundError:
-        print("[SIMULATE] FileNotFoundError for CSV!")
+        print("[SIMULATE] No uploaded dataset found!")
         return jsonify({"error": "No data available. Please upload a CSV file first."}), 400
     except Exception as e:
         print(f"[SIMULATE] Exception: {str(e)}")
         return jsonify({"error": "An error occurred during simulation", "details": str(e)}), 500
 
+@app.route('/llm-cache/stats', methods=['GET'])
+def llm_cache_stats():
+    """Hit/miss counters for the Groq response cache and the LLM executor's queue."""
+    return jsonify({**llm_cache.snapshot(), "executor": llm_executor.snapshot()})
+
 # --- 6. Confusion Matrix Endpoint ---
+# Results are cached per (model version, upload content hash), so identical
+# uploads are neither re-scored nor re-rendered.
+confusion_cache = ConfusionReportCache()
+
 @app.route('/confusion-matrix', methods=['POST'])
 def confusion_matrix_api():
+    """Confusion matrix of the model against the uploaded file's labels.
+
+    ?format=json returns the 2x2 counts and derived metrics for the client to
+    render; the default returns {"image": <base64 PNG>}.
+    """
+    model = model_registry.current()
+    # Get uploaded file
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
     try:
-        # Load the latest test data and predictions
-        app_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(app_dir, 'ml_assets', 'fraud_detection_model.pkl')
-        scaler_path = os.path.join(app_dir, 'ml_assets', 'scaler.pkl')
-        model = joblib.load(model_path)
-        scaler = joblib.load(scaler_path)
-
-        # Get uploaded file
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file uploaded'}), 400
-        file = request.files['file']
-        df = pd.read_csv(file)
-
-        # Check required columns
-        required_cols = ['Time', 'Amount'] + [f'V{i}' for i in range(1, 29)]
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            return jsonify({'error': f'Missing required columns: {missing_cols}'}), 400
-
-        # Preprocess
-        # Save Class column before preprocessing
-        y_true = df['Class'].values if 'Class' in df.columns else [0]*len(df)
-
-        df['scaled_amount'] = scaler.transform(df['Amount'].values.reshape(-1, 1))
-        df['scaled_time'] = scaler.transform(df['Time'].values.reshape(-1, 1))
-        X = df.drop(['Time', 'Amount', 'Category', 'Class'], axis=1, errors='ignore')
-        if hasattr(model, 'feature_names_in_'):
-            X = X[model.feature_names_in_]
-        y_pred = model.predict(X)
-
-        # Confusion matrix
-        print('y_true:', y_true[:20])
-        print('y_pred:', y_pred[:20])
-        cm = confusion_matrix(y_true, y_pred)
-        print('Confusion matrix:\n', cm)
-        if cm.shape != (2, 2):
-            print('Confusion matrix is not 2x2, returning error message.')
-            return jsonify({'error': f'Confusion matrix shape is {cm.shape}. Not enough class variety in data or predictions.'}), 400
-        import matplotlib
-        matplotlib.use('Agg')  # Ensure non-interactive backend
-        import matplotlib.pyplot as plt
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['Not Fraud', 'Fraud'], yticklabels=['Not Fraud', 'Fraud'], ax=ax)
-        ax.set_xlabel('Predicted')
-        ax.set_ylabel('Actual')
-        ax.set_title('Confusion Matrix')
-        fig.tight_layout()
-        buf = BytesIO()
-        fig.savefig(buf, format='png')
-        plt.close(fig)
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        print('Returning confusion matrix image with values:', cm)
-        return jsonify({'image': img_base64})
+        with span('upload_validate'):
+            validate_csv_upload(request.files['file'].stream, model.kernel.columns)
+    except MissingColumnsError as e:
+        return jsonify({'error': f'Missing required columns: {e.args[0]}'}), 400
+    try:
+        with span('upload_read'):
+            payload = request.files['file'].read()
+        cache_key = upload_digest(payload, model.version)
+
+        entry = confusion_cache.get(cache_key)
+        if entry is None:
+            with span('csv_parse'):
+                df = pd.read_csv(BytesIO(payload))
+
+            # Scaling is folded into the scoring kernel
+            y_true = df['Class'].values if 'Class' in df.columns else [0]*len(df)
+            if not np.isin(y_true, (0, 1)).all():
+                # Labels other than 0/1 cannot fill a 2x2 matrix.
+                return jsonify({'error': 'Confusion matrix shape is not 2x2. Class must be 0 or 1 on every row.'}), 400
+            y_pred = predict_anomalies(df, model.kernel)
+
+            with span('aggregation'):
+                cm = confusion_counts(y_true, y_pred)
+            print('Confusion matrix:\n', cm)
+            if cm.shape != (2, 2):
+                print('Confusion matrix is not 2x2, returning error message.')
+                return jsonify({'error': f'Confusion matrix shape is {cm.shape}. Not enough class variety in data or predictions.'}), 400
+            entry = confusion_cache.put(cache_key, cm)
+
+        if request.args.get('format') == 'json':
+            return jsonify({'model_version': model.version, 'matrix': entry['cm'].tolist(), **derived_metrics(entry['cm'])})
+        with span('plot_render'):
+            image = confusion_cache.image(entry)
+        return jsonify({'image': image})
     except Exception as e:
         print(f"Error in confusion_matrix_api: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+# --- 7. Batch Scoring Endpoint ---
+@app.route('/score', methods=['POST'])
+def score_batch():
+    """Scores a batch of raw feature rows and returns only those above a threshold.
+
+    Accepts either JSON {"columns": {"Time": [...], "V1": [...], ..., "Amount": [...]},
+    "threshold": 0.5} or a binary .npy array of shape (n, 30) in RAW_FEATURE_COLUMNS
+    order sent as application/x-npy with ?threshold= in the query string.
+    """
+    model = model_registry.current()
+    try:
+        if request.mimetype in ('application/x-npy', 'application/octet-stream'):
+            with span('payload_parse'):
+                features = features_from_npy(request.get_data())
+            threshold = parse_threshold(request.args.get('threshold'))
+        else:
+            data = request.get_json(silent=True)
+            if not data or 'columns' not in data:
+                return jsonify({"error": "No columns provided",
+                                "details": f"Send JSON column arrays for {RAW_FEATURE_COLUMNS} or an application/x-npy body."}), 400
+            with span('payload_parse'):
+                features = features_from_columns(data['columns'])
+            threshold = parse_threshold(data.get('threshold', request.args.get('threshold')))
+
+        with span('predict'):
+            scores = model.kernel.predict_proba(features)
+            indices, selected_scores = select_above_threshold(scores, threshold)
+        return jsonify({
+            "num_rows": int(len(scores)),
+            "threshold": threshold,
+            "indices": indices.tolist(),
+            "scores": selected_scores.tolist(),
+        })
+    except ScoringInputError as e:
+        return jsonify({"error": "Invalid scoring payload", "details": str(e)}), 400
+    except Exception as e:
+        print(f"[SCORE] Exception: {str(e)}")
+        return jsonify({"error": "An error occurred during scoring", "details": str(e)}), 500
+
+# --- 8. Model Info Endpoint ---
+@app.route('/model-info', methods=['GET'])
+def model_info():
+    """Active model version, when it was loaded and how many hot-swaps happened."""
+    return jsonify(model_registry.snapshot())
+
+# --- 9. Readiness Endpoint ---
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """200 once the model artifacts are loaded, 503 before (for load balancers and autoscalers)."""
+    status = model_registry.snapshot()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# --- 10. Request Instrumentation ---
+# Every request gets a Server-Timing header with its stage spans, and the
+# spans feed the histograms at GET /metrics. With REQUEST_PROFILING=1, a
+# request sent with "X-Profile: 1" is also sampled by a stack profiler; the
+# response's X-Profile-Id header names a folded-stack profile (flamegraph.pl
+# or speedscope input) that GET /profiles/<id> returns.
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', '0') == '1'
+request_metrics = RequestMetrics()
+profile_store = ProfileStore()
+
+@app.before_request
+def start_request_trace():
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.trace, g.trace_token = begin_trace(endpoint)
+    if REQUEST_PROFILING and request.headers.get('X-Profile') == '1':
+        g.profiler = SamplingProfiler().start()
+
+@app.after_request
+def finish_request_trace(response):
+    trace = g.get('trace')
+    if trace is None:
+        return response
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        response.headers['X-Profile-Id'] = profile_store.put(profiler.folded())
+        response.headers['X-Profile-Samples'] = str(profiler.num_samples)
+    request_metrics.record(trace, request.method, response.status_code)
+    response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def clear_request_trace(error=None):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+    token = g.pop('trace_token', None)
+    if token is not None:
+        end_trace(token)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request counts, latency and per-stage histograms in the Prometheus text format."""
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """A recent request profile in the collapsed-stack format."""
+    folded = profile_store.get(profile_id)
+    if folded is None:
+        return jsonify({"error": "Unknown or expired profile id."}), 404
+    return Response(folded, mimetype='text/plain')
+
+# --- 11. Anomaly Pages Endpoint ---
+@app.route('/datasets/<dataset_id>/anomalies', methods=['GET'])
+def dataset_anomalies(dataset_id):
+    """Pages through the rows /analyze flagged in an upload, without re-uploading it.
+
+    Query parameters: format=columnar (default)|records|ndjson, fields=
+    (e.g. Time,Amount,Category,score), offset= and limit= (default
+    ANOMALY_PAGE_SIZE; ndjson streams every remaining row unless limited).
+    """
+    try:
+        fmt = request.args.get('format', 'columnar')
+        fmt, fields, offset, limit = parse_options(
+            request.args, default_format='columnar', default_limit=None if fmt == 'ndjson' else DEFAULT_PAGE_SIZE,
+            columns=upload_registry.meta(dataset_id)["columns"])
+        positions, scores = upload_registry.load_anomalies(dataset_id)
+        stop = None if limit is None else offset + limit
+        with span('dataset_load'):
+            rows = load_dataset(dataset_id).iloc[positions[offset:stop]].reset_index(drop=True)
+        rows['is_anomaly'] = 1
+        rows['score'] = scores[offset:stop]
+        page = select_page(rows, fields)
+        next_offset = offset + len(page)
+        header = {
+            "dataset_id": dataset_id,
+            "total": int(len(positions)),
+            "offset": offset,
+            "next_offset": next_offset if next_offset < len(positions) else None,
+        }
+        if fmt == 'ndjson':
+            return Response(iter_ndjson(header, page), mimetype=NDJSON_MIMETYPE)
+        return jsonify({**header, "anomalies": encode_rows(page, fmt)})
+    except ResponseFormatError as e:
+        return jsonify({"error": "Invalid anomaly response options", "details": str(e)}), 400
+    except UnknownDatasetError:
+        return jsonify({"error": "Unknown dataset_id. Upload the CSV again using the /analyze endpoint."}), 404
+
+# --- 12. Incremental Append Endpoint ---
+@app.route('/datasets/<dataset_id>/append', methods=['POST'])
+def append_transactions(dataset_id):
+    """Adds new transactions to an analyzed upload, scoring and storing only the delta.
+
+    Rows whose content hash is already stored (or repeated within the file)
+    are skipped. The expenditure totals and savings plan come from the
+    dataset's aggregate index, so the cost depends on the new rows, not on
+    the history. The first append to an upload hashes its existing rows once.
+    Accepts the same format/fields/offset/limit options as /analyze for the
+    newly flagged rows.
+    """
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({"error": "No file selected"}), 400
+
+    model = model_registry.current()
+    try:
+        with span('upload_validate'):
+            header, _, _ = validate_csv_upload(request.files['file'].stream, model.kernel.columns)
+    except MissingColumnsError:
+        return missing_columns_response()
+    try:
+        anomaly_format, anomaly_fields, offset, limit = parse_options(request.args, columns=header)
+        if anomaly_format == 'ndjson':
+            raise ResponseFormatError("format must be records or columnar for appends")
+    except ResponseFormatError as e:
+        return jsonify({"error": "Invalid anomaly response options", "details": str(e)}), 400
+
+    try:
+        with upload_registry.dataset_lock(dataset_id):
+            dataset_store = upload_registry.store(dataset_id)
+            csv_path = upload_registry.csv_path(dataset_id)
+            with span('csv_parse'):
+                delta = pd.read_csv(request.files['file'])
+            if not all(col in delta.columns for col in REQUIRED_MODEL_COLUMNS):
+                return missing_columns_response()
+
+            with span('dedupe'):
+                if not upload_registry.has_row_hashes(dataset_id):
+                    upload_registry.save_row_hashes(dataset_id, csv_row_hashes(csv_path))
+                hashes = row_hashes(delta)
+                fresh = ~upload_registry.known_row_hashes(dataset_id, hashes) & ~pd.Series(hashes).duplicated().to_numpy()
+            rows_received = len(delta)
+            delta = delta[fresh]
+            hashes = hashes[fresh]
+
+            appender = dataset_store.appender()
+            delta.index = pd.RangeIndex(appender.num_rows, appender.num_rows + len(delta))
+            anomalies = flag_anomalies(delta, model.kernel)
+            with span('store_write'):
+                meta = dataset_store.append(appender, delta, append_csv_rows)
+                upload_registry.save_row_hashes(dataset_id, hashes)
+                upload_registry.append_anomalies(dataset_id, anomalies.index.to_numpy(), anomalies['score'].to_numpy())
+            with span('aggregation'):
+                analysis_results = expenditure_from_aggregates(appender.aggregates)
+            print(f"[APPEND] Dataset {dataset_id}: {len(delta)} of {rows_received} rows appended, "
+                  f"{len(anomalies)} new anomalies")
+
+        page = select_page(anomalies.reset_index(drop=True), anomaly_fields, offset, limit)
+        response_data = {
+            "dataset_id": dataset_id,
+            "model_version": model.version,
+            "rows_received": rows_received,
+            "rows_appended": len(delta),
+            "duplicates_skipped": rows_received - len(delta),
+            "num_rows": meta["num_rows"],
+            "new_anomalies_total": len(anomalies),
+            "new_anomalies": encode_rows(page, anomaly_format),
+            "expenditure_analysis": analysis_results,
+        }
+        if limit is not None:
+            next_offset = offset + len(page)
+            response_data["new_anomalies_next_offset"] = next_offset if next_offset < len(anomalies) else None
+        return jsonify(response_data)
+
+    except ResponseFormatError as e:
+        return jsonify({"error": "Invalid anomaly response options", "details": str(e)}), 400
+    except UnknownDatasetError:
+        return jsonify({"error": "Unknown dataset_id. Upload the CSV again using the /analyze endpoint."}), 404
+    except Exception as e:
+        print(f"[APPEND] Exception: {str(e)}")
+        return jsonify({"error": "An error occurred while appending transactions", "details": str(e)}), 500
+
+# --- 13. Model Evaluation Endpoints ---
+# Candidate models live in ml_assets/candidates/<name>/ (see train_model.py
+# --output-dir). /models/evaluate scores labeled data with the served model and
+# every candidate in one pass; each model's results are cached per
+# (model version, dataset key), so replaying the same data is instant.
+model_catalog = ModelCatalog(os.path.join(app_dir, 'ml_assets'))
+evaluation_cache = EvaluationCache()
+EVAL_RANKED_METRICS = ('f1_score', 'roc_auc', 'average_precision')
+
+def registered_models():
+    """(name, version, kernel) of the served model ("active"), then of each candidate with another version."""
+    active = model_registry.current()
+    models = [('active', active.version, active.kernel)]
+    models += [(c.name, c.version, c.kernel) for c in model_catalog.candidates() if c.version != active.version]
+    return models
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    """The served model and the registered candidates."""
+    return jsonify({
+        "models": [{"name": name, "version": version, "active": name == 'active'}
+                   for name, version, _ in registered_models()],
+        "evaluation_cache": evaluation_cache.stats,
+    })
+
+@app.route('/models/evaluate', methods=['POST'])
+def evaluate_models_api():
+    """Compares the registered models on a labeled CSV upload or a stored dataset.
+
+    Send multipart/form-data with a `file` (Class column required), or JSON
+    {"dataset_id": ...} for an analyzed upload (the latest by default).
+    ?models=name,... limits the comparison and ?curves=0 drops the curves.
+    """
+    models = registered_models()
+    data = request.get_json(silent=True) or {}
+    names = request.args.get('models') or data.get('models')
+    if names:
+        names = names.split(',') if isinstance(names, str) else list(names)
+        unknown = [name for name in names if name not in {model[0] for model in models}]
+        if unknown:
+            return jsonify({"error": "Unknown model", "details": f"{unknown}; registered: {[m[0] for m in models]}"}), 400
+        models = [model for model in models if model[0] in names]
+
+    payload = None
+    if 'file' in request.files:
+        try:
+            with span('upload_validate'):
+                validate_csv_upload(request.files['file'].stream, models[0][2].columns + ['Class'])
+        except MissingColumnsError as e:
+            return jsonify({"error": "Missing required columns", "details": f"{e.args[0]}"}), 400
+        with span('upload_read'):
+            payload = request.files['file'].read()
+        dataset_key = hashlib.sha256(payload).hexdigest()
+    else:
+        try:
+            dataset_id = data.get('dataset_id') or upload_registry.latest_id()
+            if not dataset_id:
+                return jsonify({"error": "No data available. Upload a labeled CSV or analyze one first."}), 400
+            with span('dataset_load'):
+                meta = upload_registry.meta(dataset_id)
+        except UnknownDatasetError:
+            return jsonify({"error": "Unknown dataset_id. Upload the CSV again using the /analyze endpoint."}), 404
+        if 'Class' not in meta["columns"]:
+            return jsonify({"error": "Missing required columns", "details": "The dataset has no Class labels."}), 400
+        # Uploads only grow by appends, so the row count identifies their content.
+        dataset_key = f"{dataset_id}:{meta['num_rows']}"
+
+    try:
+        entries = {version: evaluation_cache.get(version, dataset_key) for _, version, _ in models}
+        cached = {version for version, entry in entries.items() if entry is not None}
+        missing = [(version, kernel) for _, version, kernel in models if version not in cached]
+        if missing:
+            if payload is not None:
+                with span('csv_parse'):
+                    df = pd.read_csv(BytesIO(payload))
+            else:
+                with span('dataset_load'):
+                    df = upload_registry.load(dataset_id)
+            labels = pd.to_numeric(df['Class'], errors='coerce').to_numpy()
+            # Rows without a label (an empty Class, or UNLABELED in a stored
+            # dataset, e.g. appended without a Class column) are left out.
+            labeled = ~np.isnan(labels) & (labels != UNLABELED)
+            if not labeled.all():
+                df, labels = df[labeled], labels[labeled]
+            if not len(labels):
+                return jsonify({"error": "Missing required columns", "details": "No row has a Class label."}), 400
+            if not np.isin(labels, (0, 1)).all():
+                return jsonify({"error": "Invalid labels", "details": "Class must be 0 or 1 on every labeled row."}), 400
+            with span('evaluate'):
+                results = evaluate_models(df, labels, [kernel for _, kernel in missing])
+            positives = int(labels.sum())
+            for (version, _), result in zip(missing, results):
+                entries[version] = evaluation_cache.put(
+                    version, dataset_key, {"num_rows": len(labels), "positives": positives, **result})
+            print(f"[EVAL] Scored {len(missing)} of {len(models)} models on {len(labels)} rows")
+
+        include_curves = request.args.get('curves', '1') != '0'
+        first = entries[models[0][1]]
+        response_models = []
+        for name, version, _ in models:
+            entry = {key: value for key, value in entries[version].items() if key not in ('num_rows', 'positives')}
+            if not include_curves:
+                entry.pop('roc')
+                entry.pop('pr')
+            response_models.append({"name": name, "version": version, "cached": version in cached, **entry})
+        best = {}
+        for metric in EVAL_RANKED_METRICS:
+            scored = [model for model in response_models if model[metric] is not None]
+            best[metric] = max(scored, key=lambda model: model[metric])["name"] if scored else None
+        return jsonify({
+            "dataset_key": dataset_key,
+            "num_rows": first["num_rows"],
+            "positives": first["positives"],
+            "models": response_models,
+            "best": best,
+        })
+    except Exception as e:
+        print(f"[EVAL] Exception: {str(e)}")
+        return jsonify({"error": "An error occurred during model evaluation", "details": str(e)}), 500
+
 # --- 3. Run the App ---
 if __name__ == '__main__':
     # Runs the Flask server on http://127.0.0.1:5000
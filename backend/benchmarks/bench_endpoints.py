@@ -0,0 +1,298 @@
+"""End-to-end benchmark of /analyze, /query, /simulate and /confusion-matrix.
+
+Drives each endpoint through Flask's test client, with the local stub server
+(stub_llm_server.py, no delay) standing in for Groq, on datasets produced by
+generate_data.py. For every (endpoint, rows) pair it records latency
+percentiles, throughput, the peak RSS while the endpoint ran, and the
+tracemalloc peak and retained blocks of one extra traced request.
+
+Results are written as JSON and compared against a stored baseline; any
+latency or memory figure worse than the baseline by more than the tolerance
+is reported as a regression and the script exits 1. Baselines are
+machine-specific: record one with --update-baseline on the machine that
+runs the comparison.
+
+/simulate uses a new scenario per request and /confusion-matrix runs with an
+empty result cache, so neither measures cache hits; /query alternates a
+locally parsed question with one that falls through to the (stub) LLM.
+
+Usage (from the backend directory):
+    python benchmarks/bench_endpoints.py [--sizes 1000 100000 1000000]
+    python benchmarks/bench_endpoints.py --sizes 1000 100000 1000000 10000000 --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+from stub_llm_server import start_stub_server
+
+DATASETS_DIR = os.path.join(BENCH_DIR, '.datasets')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, '.results', 'endpoints.json')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline_endpoints.json')
+ENDPOINTS = ('/analyze', '/query', '/simulate', '/confusion-matrix')
+# Metrics compared against the baseline, and the tolerance each is checked with.
+LATENCY_METRICS = ('p50_ms', 'p95_ms')
+MEMORY_METRICS = ('peak_rss_mb', 'traced_peak_mb')
+LOCAL_QUERIES = ("What's my total spending?", "How much did I spend on dining last month vs this month?",
+                 "How many anomalies were detected?")
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), or the process peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler:
+    """Samples RSS on a background thread; .peak_mb is the maximum seen inside the with block."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+def dataset_path(rows, seed):
+    """Generates (once) and returns a CSV of `rows` rows from generate_data.py."""
+    from generate_data import build_options, generate_dataset
+    path = os.path.join(DATASETS_DIR, f'transactions_{rows}_seed{seed}.csv')
+    if not os.path.exists(path):
+        os.makedirs(DATASETS_DIR, exist_ok=True)
+        print(f"generating {rows:,} rows -> {path}")
+        # 0.5% fraud, so /analyze and the anomaly listing have realistic work at every size.
+        generate_dataset(build_options(rows, path, seed=seed, fraud_rate=0.005), os.cpu_count() or 1)
+    return path
+
+
+class EndpointDriver:
+    """Builds one request per call for each endpoint against a given dataset."""
+
+    def __init__(self, backend, client, csv_path):
+        self.backend = backend
+        self.client = client
+        self.csv_path = csv_path
+        self.dataset_id = None
+        self.calls = 0
+
+    def upload(self, url):
+        with open(self.csv_path, 'rb') as f:
+            return self.client.post(url, data={'file': (f, os.path.basename(self.csv_path))})
+
+    def analyze(self):
+        response = self.upload('/analyze')
+        if response.status_code == 200:
+            self.dataset_id = response.get_json()['dataset_id']
+        return response
+
+    def query(self):
+        self.calls += 1
+        if self.calls % 2:
+            question = LOCAL_QUERIES[self.calls // 2 % len(LOCAL_QUERIES)]
+        else:
+            question = f"benchmark question {self.calls} {time.time_ns()}: am I doing ok?"
+        return self.client.post('/query', json={'query': question, 'dataset_id': self.dataset_id})
+
+    def simulate(self):
+        self.calls += 1
+        scenario = f"benchmark scenario {self.calls} {time.time_ns()}: cut dining by 20%"
+        return self.client.post('/simulate', json={'scenario': scenario, 'dataset_id': self.dataset_id})
+
+    def confusion_matrix(self):
+        from confusion_report import ConfusionReportCache
+        self.backend.confusion_cache = ConfusionReportCache()
+        return self.upload('/confusion-matrix?format=json')
+
+    def request_for(self, endpoint):
+        return {'/analyze': self.analyze, '/query': self.query, '/simulate': self.simulate,
+                '/confusion-matrix': self.confusion_matrix}[endpoint]
+
+
+def measure(send, rows, requests, time_budget):
+    """Runs send() at least 3 and at most `requests` times (stopping after time_budget seconds)."""
+    # Warm-up (twice, so /query takes both its local and LLM paths): first-use
+    # imports, page cache, dataset LRU.
+    for _ in range(2):
+        send()
+    latencies = []
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        while len(latencies) < requests and (len(latencies) < 3 or time.perf_counter() - start < time_budget):
+            request_start = time.perf_counter()
+            response = send()
+            latencies.append(time.perf_counter() - request_start)
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:500]}")
+        elapsed = time.perf_counter() - start
+
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        send()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "rows_per_second": round(rows * len(latencies) / elapsed),
+        "peak_rss_mb": round(rss.peak_mb, 1),
+        "traced_peak_mb": round(traced_peak / 2 ** 20, 2),
+        "retained_blocks": retained_blocks,
+    }
+
+
+def compare(results, baseline, args):
+    """Returns (lines, regressions) comparing each result with its baseline entry."""
+    previous = {(r["endpoint"], r["rows"]): r for r in baseline.get("results", [])}
+    lines, regressions = [], []
+    for result in results:
+        base = previous.get((result["endpoint"], result["rows"]))
+        if base is None:
+            lines.append(f"  {result['endpoint']:18} {result['rows']:>10,}  (no baseline)")
+            continue
+        checks = [(m, args.latency_tolerance, args.min_latency_delta_ms) for m in LATENCY_METRICS]
+        checks += [(m, args.memory_tolerance, args.min_memory_delta_mb) for m in MEMORY_METRICS]
+        notes = []
+        for metric, tolerance, min_delta in checks:
+            old, new = base.get(metric), result[metric]
+            if old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            if new > old * (1 + tolerance) and new - old > min_delta:
+                regressions.append(f"{result['endpoint']} @ {result['rows']:,} rows: {metric} {old} -> {new} "
+                                   f"(+{change:.0%}, tolerance {tolerance:.0%})")
+                notes.append(f"{metric} +{change:.0%} REGRESSION")
+            elif metric in ('p50_ms', 'peak_rss_mb'):
+                notes.append(f"{metric} {change:+.0%}")
+        lines.append(f"  {result['endpoint']:18} {result['rows']:>10,}  " + ', '.join(notes))
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100_000, 1_000_000])
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=20, help='timed requests per endpoint and size')
+    parser.add_argument('--time-budget', type=float, default=20.0,
+                        help='seconds per endpoint and size after which no new request starts (min 3 requests)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=0.5)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--min-latency-delta-ms', type=float, default=25.0,
+                        help='latency increases smaller than this never count as regressions')
+    parser.add_argument('--min-memory-delta-mb', type=float, default=16.0,
+                        help='memory increases smaller than this never count as regressions')
+    args = parser.parse_args()
+
+    datasets = {rows: dataset_path(rows, args.seed) for rows in args.sizes}
+
+    _, stub_url = start_stub_server(delay=0)
+    uploads_dir = tempfile.mkdtemp(prefix='bench_uploads_')
+    os.environ.update({'GROQ_API_KEY': 'stub', 'GROQ_BASE_URL': stub_url, 'UPLOADS_DIR': uploads_dir,
+                       'MODEL_BACKGROUND_LOAD': '0', 'MODEL_RELOAD_INTERVAL_SECONDS': '0'})
+    warnings.filterwarnings('ignore')
+    import app as backend
+    client = backend.app.test_client()
+
+    results = []
+    try:
+        for rows, csv_path in datasets.items():
+            driver = EndpointDriver(backend, client, csv_path)
+            # /query and /simulate need the dataset uploaded first.
+            endpoints = sorted(args.endpoints, key=lambda e: e != '/analyze')
+            if '/analyze' not in endpoints:
+                driver.analyze()
+            for endpoint in endpoints:
+                result = {"endpoint": endpoint, "rows": rows,
+                          **measure(driver.request_for(endpoint), rows, args.requests, args.time_budget)}
+                results.append(result)
+                print(f"{endpoint:18} {rows:>10,} rows  p50 {result['p50_ms']:10.1f} ms  "
+                      f"p95 {result['p95_ms']:10.1f} ms  {result['rows_per_second']:>13,} rows/s  "
+                      f"rss {result['peak_rss_mb']:7.0f} MB  traced {result['traced_peak_mb']:8.1f} MB")
+    finally:
+        shutil.rmtree(uploads_dir, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("machine", {}).get("cpu_count") != os.cpu_count():
+        print("warning: the baseline was recorded on a machine with a different CPU count")
+    lines, regressions = compare(results, baseline, args)
+    print("\ncompared with baseline:")
+    print('\n'.join(lines))
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("no regressions")
+
+
+if __name__ == '__main__':
+    main()
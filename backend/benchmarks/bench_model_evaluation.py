@@ -0,0 +1,72 @@
+"""Cost of evaluating k models on one labeled dataset (model_evaluation.py).
+
+Compares evaluate_models (one (n, 30) @ (30, k) product, one sort and one
+cumulative sum over (n, k)) against evaluating the models one at a time,
+and checks that both agree. The product's float32 sums are ordered
+differently from a single matrix-vector product, so AUC and average
+precision are compared to 1e-6. Candidates are the served
+kernel with randomly perturbed weights, so no retraining is needed.
+
+Usage (from the backend directory):
+    python benchmarks/bench_model_evaluation.py [--rows 1000000] [--models 1 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from bench_endpoints import dataset_path
+from model_evaluation import evaluate_models
+from scoring_kernel import ScoringKernel, load_or_compile_kernel
+
+
+def candidate_kernels(kernel, count, seed):
+    rng = np.random.default_rng(seed)
+    kernels = [kernel]
+    for _ in range(count - 1):
+        noise = rng.normal(1.0, 0.2, kernel.weights.shape).astype('float32')
+        kernels.append(ScoringKernel(kernel.weights * noise, kernel.bias, kernel.columns))
+    return kernels
+
+
+def same_results(together, separately):
+    for a, b in zip(together, separately):
+        if a["matrix"] != b["matrix"]:
+            return False
+        for key in ("roc_auc", "average_precision"):
+            if (a[key] is None) != (b[key] is None) or (a[key] is not None and abs(a[key] - b[key]) > 1e-6):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--models', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    kernel = load_or_compile_kernel(os.path.join(BACKEND_DIR, 'ml_assets'))
+    df = pd.read_csv(dataset_path(args.rows, args.seed))
+    labels = df['Class'].to_numpy()
+    print(f"{len(df):,} rows, {int(labels.sum()):,} positives")
+    for count in args.models:
+        kernels = candidate_kernels(kernel, count, args.seed)
+        start = time.perf_counter()
+        together = evaluate_models(df, labels, kernels)
+        together_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        separately = [evaluate_models(df, labels, [k])[0] for k in kernels]
+        separate_seconds = time.perf_counter() - start
+        if not same_results(together, separately):
+            sys.exit(f"{count} models: one-pass results differ from per-model results")
+        print(f"  {count:2d} models  one pass {together_seconds:6.2f} s  one at a time {separate_seconds:6.2f} s  "
+              f"{separate_seconds / together_seconds:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Scaling of sharded /analyze scoring (parallel_scoring.py) from 1 to N worker processes.
+
+Times the serial streaming path (analyze_csv_streaming) and then
+ScoringExecutor.analyze_csv with 1, 2, ... --max-workers processes on the
+same generated CSV. Each run also writes the columnar store, as /analyze
+does, and every run's anomalies and expenditure totals are checked against
+the serial result.
+
+Usage (from the backend directory):
+    python benchmarks/bench_parallel_scoring.py [--rows 1000000] [--max-workers 8]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from bench_endpoints import dataset_path
+from dataset_store import ColumnarWriter
+from ingest import analyze_csv_streaming
+from parallel_scoring import SCORING_SHARD_BYTES, ScoringExecutor
+from scoring_kernel import load_or_compile_kernel
+
+
+def timed_run(analyze, csv_path, kernel):
+    """Runs analyze(csv_path, kernel, writer) into a throwaway store; returns (seconds, result)."""
+    store_dir = tempfile.mkdtemp(prefix='bench-store-')
+    try:
+        start = time.perf_counter()
+        writer = ColumnarWriter(store_dir)
+        result = analyze(csv_path, kernel, writer=writer)
+        writer.close()
+        return time.perf_counter() - start, result
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard-bytes', type=int, default=SCORING_SHARD_BYTES)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    csv_path = dataset_path(args.rows, args.seed)
+    kernel = load_or_compile_kernel(os.path.join(BACKEND_DIR, 'ml_assets'))
+    size_mb = os.path.getsize(csv_path) / 2 ** 20
+    print(f"{args.rows:,} rows ({size_mb:.0f} MB), {os.cpu_count()} CPUs, shards of {args.shard_bytes / 2 ** 20:.0f} MB")
+
+    serial_seconds, (serial_anomalies, serial_analysis) = timed_run(analyze_csv_streaming, csv_path, kernel)
+    print(f"  {'serial':>10} {serial_seconds:8.2f} s  {args.rows / serial_seconds:12,.0f} rows/s  {1.0:5.2f}x")
+    for workers in range(1, args.max_workers + 1):
+        executor = ScoringExecutor(workers=workers, shard_bytes=args.shard_bytes)
+        try:
+            # The first, untimed run starts the pool's processes.
+            timed_run(executor.analyze_csv, csv_path, kernel)
+            seconds, (anomalies, analysis) = timed_run(executor.analyze_csv, csv_path, kernel)
+        finally:
+            executor.shutdown()
+        if not (anomalies.index.equals(serial_anomalies.index) and analysis == serial_analysis):
+            sys.exit(f"{workers} workers: results differ from the serial path")
+        label = f"{workers} worker{'s' if workers > 1 else ''}"
+        print(f"  {label:>10} {seconds:8.2f} s  {args.rows / seconds:12,.0f} rows/s  {serial_seconds / seconds:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
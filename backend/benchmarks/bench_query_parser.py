@@ -0,0 +1,91 @@
+"""Benchmarks the local rule-based query parser on a corpus of sample questions.
+
+Reports per-query latency and the share of queries answered without Groq.
+
+Usage (from the backend directory):
+    python benchmarks/bench_query_parser.py [--repeat 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from query_parser import MIN_CONFIDENCE, parse_query_locally
+
+SAMPLE_QUERIES = [
+    "How much did I spend on coffee last month vs this month?",
+    "What's my total spending?",
+    "How much did I spend on dining?",
+    "How much have I spent in total?",
+    "What is my overall spending?",
+    "How much did I spend last month?",
+    "How much did I spend this week?",
+    "How much did I spend on shopping?",
+    "How much did I spend on groceries this month?",
+    "How much did I pay for travel?",
+    "What did I spend on utilities?",
+    "How much went to entertainment last week?",
+    "How much did I spend on restaurants?",
+    "How much did I spend on flights?",
+    "Spending on health this month",
+    "How much did I spend on dinning?",
+    "Compare my dining last month vs this month",
+    "Did I spend more on shopping this month than last month?",
+    "Groceries last month versus this month",
+    "How many anomalies were detected?",
+    "Do I have any fraudulent transactions?",
+    "Show me suspicious transactions",
+    "How many unusual charges were flagged?",
+    "How can I save more money?",
+    "Where can I cut back to save?",
+    "Help me build a budget",
+    "What are my savings options?",
+    "How much did I spend on Netflix?",
+    "Is my spending on shopping higher than on travel?",
+    "Which category do I spend the most on?",
+    "What was my biggest purchase?",
+    "Tell me about my finances",
+    "How much did I spend on gas?",
+    "What's the total I spent on services?",
+    "How much did I spend on the gym?",
+    "Total expenses all time",
+    "How much money did I spend?",
+    "anomaly count",
+    "entertainment spending",
+    "Am I spending too much?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000, help='parses per query when timing')
+    args = parser.parse_args()
+
+    latencies_us = []
+    served_locally = 0
+    for query in SAMPLE_QUERIES:
+        result, confidence = parse_query_locally(query)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            parse_query_locally(query)
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+        local = confidence >= MIN_CONFIDENCE
+        served_locally += local
+        route = 'local' if local else 'groq '
+        print(f"{route} {confidence:.2f}  {query!r:70} -> {result['query_type']}, {result['category']}, "
+              f"{result['time_period']}, {result['comparison']}")
+
+    latencies_us.sort()
+    print()
+    print(f"queries:          {len(SAMPLE_QUERIES)}")
+    print(f"served locally:   {served_locally} ({served_locally / len(SAMPLE_QUERIES):.0%}) "
+          f"at confidence >= {MIN_CONFIDENCE}")
+    print(f"latency p50:      {statistics.median(latencies_us):.1f} us")
+    print(f"latency p95:      {latencies_us[int(len(latencies_us) * 0.95) - 1]:.1f} us")
+    print(f"latency max:      {latencies_us[-1]:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Encoding time of the /analyze anomaly list in each response format.
+
+Compares the legacy path (DataFrame.to_dict(orient='records') encoded by
+Flask's default JSON provider) with responses.py's records, columnar,
+projected-columnar and NDJSON encodings on the same flagged rows.
+
+Usage (from the backend directory):
+    python benchmarks/bench_responses.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+import numpy as np
+import pandas as pd
+from flask import Flask
+from generate_data import build_options, generate_shard
+from responses import columnar, dumps, iter_ndjson, orjson, records
+
+PROJECTION = ['Time', 'Amount', 'Category', 'score']
+
+
+def anomaly_frame(rows, seed):
+    """rows flagged transactions shaped like flag_anomalies() output."""
+    opts = build_options(rows, output=None, seed=seed)
+    columns = generate_shard(np.random.default_rng(seed), rows, opts)
+    frame = pd.DataFrame({**columns, 'Category': np.asarray(opts['categories'], dtype=object)[columns['Category']]})
+    # Values as parsed from an upload: float64 features and an int Time.
+    frame = frame.astype({f'V{i}': 'float64' for i in range(1, 29)}).astype({'Time': 'int64', 'Class': 'int64'})
+    frame['is_anomaly'] = 1
+    frame['score'] = np.random.default_rng(seed + 1).uniform(0.5, 1.0, rows)
+    return frame
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    frame = anomaly_frame(args.rows, args.seed)
+    flask_json = Flask(__name__).json
+    cases = [
+        ("legacy to_dict + Flask json", lambda: flask_json.dumps(frame.to_dict(orient='records'))),
+        ("records", lambda: dumps(records(frame))),
+        ("columnar", lambda: dumps(columnar(frame))),
+        (f"columnar, fields={','.join(PROJECTION)}", lambda: dumps(columnar(frame[PROJECTION]))),
+        ("ndjson", lambda: b''.join(iter_ndjson({}, frame))),
+    ]
+    print(f"{args.rows:,} anomaly rows, encoder: {'orjson' if orjson else 'json (stdlib)'}")
+    baseline = None
+    for name, fn in cases:
+        seconds, size = best_of(args.repeat, fn)
+        baseline = baseline or seconds
+        print(f"  {name:40} {seconds * 1000:9.1f} ms  {size / 2 ** 20:8.1f} MB  {baseline / seconds:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Parity check and rows/sec microbenchmark for the compiled scoring kernel.
+
+Compares ScoringKernel.predict against the scikit-learn path it replaces
+(preprocessing into a feature DataFrame + fraud_model.predict) and exits
+non-zero if the labels disagree on more than --max-mismatch-rate of rows.
+
+Usage (from the backend directory):
+    python benchmarks/bench_scoring_kernel.py [--sizes 1000 100000 10000000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+import joblib
+import numpy as np
+import pandas as pd
+from generate_data import REAL_ANOMALIES
+from preprocessing import load_preprocessor
+from scoring import RAW_FEATURE_COLUMNS
+from scoring_kernel import compile_kernel
+
+# Larger inputs are generated and scored in blocks of this many rows.
+BLOCK_ROWS = 1_000_000
+
+
+def synthetic_features(rng, n):
+    """Raw (n, 30) float32 rows shaped like generate_data.py output."""
+    features = np.empty((n, len(RAW_FEATURE_COLUMNS)), dtype='float32')
+    features[:, 0] = rng.integers(1, 172000, n)
+    features[:, 1:29] = rng.uniform(-3, 3, (n, 28))
+    features[:, 29] = np.round(rng.exponential(40.0, n), 2)
+    return features
+
+
+def sklearn_predict(model, preprocessor, features):
+    """The pre-kernel path: preprocess into a feature DataFrame, then model.predict."""
+    df = pd.DataFrame(preprocessor.transform(features), columns=preprocessor.feature_names)
+    return model.predict(df)
+
+
+def rows_per_second(fn, rng, n):
+    elapsed = 0.0
+    for start in range(0, n, BLOCK_ROWS):
+        block = synthetic_features(rng, min(BLOCK_ROWS, n - start))
+        t0 = time.perf_counter()
+        fn(block)
+        elapsed += time.perf_counter() - t0
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 10_000_000])
+    parser.add_argument('--sklearn-max-rows', type=int, default=1_000_000,
+                        help='skip the scikit-learn baseline above this size')
+    parser.add_argument('--parity-rows', type=int, default=200_000)
+    parser.add_argument('--max-mismatch-rate', type=float, default=1e-4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=UserWarning)
+    assets_dir = os.path.join(BACKEND_DIR, 'ml_assets')
+    model = joblib.load(os.path.join(assets_dir, 'fraud_detection_model.pkl'))
+    preprocessor = load_preprocessor(assets_dir)
+    kernel = compile_kernel(model, preprocessor)
+    rng = np.random.default_rng(args.seed)
+
+    # --- Parity against fraud_model.predict ---
+    anomalies = np.array([row[:30] for row in REAL_ANOMALIES], dtype='float32')
+    features = np.vstack([synthetic_features(rng, args.parity_rows), anomalies])
+    expected = sklearn_predict(model, preprocessor, features)
+    actual = kernel.predict(features)
+    mismatches = int((expected != actual).sum())
+    mismatch_rate = mismatches / len(features)
+    print(f"parity: {mismatches} of {len(features)} labels differ ({mismatch_rate:.2e}), "
+          f"{int(expected.sum())} rows flagged by scikit-learn")
+
+    # --- Throughput ---
+    print(f"{'rows':>12} {'kernel rows/s':>16} {'sklearn rows/s':>16} {'speedup':>8}")
+    for n in args.sizes:
+        kernel_rate = rows_per_second(kernel.predict, rng, n)
+        if n <= args.sklearn_max_rows:
+            sklearn_rate = rows_per_second(lambda block: sklearn_predict(model, preprocessor, block), rng, n)
+            print(f"{n:>12,} {kernel_rate:>16,.0f} {sklearn_rate:>16,.0f} {kernel_rate / sklearn_rate:>7.1f}x")
+        else:
+            print(f"{n:>12,} {kernel_rate:>16,.0f} {'-':>16} {'-':>8}")
+
+    if mismatch_rate > args.max_mismatch_rate:
+        print(f"FAIL: mismatch rate above {args.max_mismatch_rate:.0e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Measures backend cold start: import time per module and time-to-first-request.
+
+Each measurement runs in a fresh Python process. The per-module breakdown
+comes from `python -X importtime` with MODEL_BACKGROUND_LOAD=0, because the
+interpreter's import-depth bookkeeping is shared between threads and the
+background loader's imports would scramble the tree; the model load's own
+imports therefore show up there too. Time-to-first-request starts a server on
+a free port and polls it, with the model loading in the background (the
+default) and with MODEL_BACKGROUND_LOAD=0.
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.uploads')
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)')
+# Modules that should only load on first use, not during `import app`.
+HEAVY_MODULES = ('matplotlib', 'seaborn', 'sklearn', 'scipy', 'groq')
+
+SERVER_SCRIPT = """
+import sys
+sys.path.insert(0, {backend!r})
+import app
+app.app.run(port={port}, debug=False, use_reloader=False)
+"""
+
+
+def child_env(**overrides):
+    env = dict(os.environ, UPLOADS_DIR=UPLOADS_DIR, PYTHONWARNINGS='ignore', **overrides)
+    return env
+
+
+def import_seconds(background):
+    """Wall-clock time of `import app` in a fresh process, and the heavy modules it loaded."""
+    code = ('import sys, time; start = time.perf_counter(); import app; '
+            'elapsed = time.perf_counter() - start; '
+            f'print("IMPORT", elapsed, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])')
+    env = child_env(MODEL_BACKGROUND_LOAD='1' if background else '0')
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    fields = result.stdout.split('IMPORT')[-1].split()
+    return float(fields[0]), fields[1:]
+
+
+def module_import_times():
+    """Cumulative import time (seconds) of each module app.py imports directly."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR, env=child_env(MODEL_BACKGROUND_LOAD='0'), capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Lines nested one level under `app` are app.py's own imports.
+        if match and len(match.group(3)) == 3:
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+    return modules
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(background, timeout=120.0):
+    """Seconds from process start to the first HTTP response and to GET /ready returning 200."""
+    port = free_port()
+    script = SERVER_SCRIPT.format(backend=BACKEND_DIR, port=port)
+    env = child_env(MODEL_BACKGROUND_LOAD='1' if background else '0')
+    with tempfile.TemporaryFile() as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        first_response = ready = None
+        try:
+            while ready is None:
+                if time.perf_counter() - start > timeout or proc.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f"server did not become ready:\n{log.read().decode(errors='replace')}")
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=5) as response:
+                        status = response.status
+                except urllib.error.HTTPError as e:
+                    status = e.code
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.005)
+                    continue
+                now = time.perf_counter() - start
+                if first_response is None:
+                    first_response = now
+                if status == 200:
+                    ready = now
+                else:
+                    time.sleep(0.005)
+        finally:
+            proc.terminate()
+            proc.wait()
+    return first_response, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='fresh processes per measurement')
+    parser.add_argument('--top', type=int, default=15, help='modules to list')
+    args = parser.parse_args()
+
+    for background in (True, False):
+        samples = [import_seconds(background) for _ in range(args.runs)]
+        seconds = statistics.median(s[0] for s in samples)
+        heavy = sorted({name for s in samples for name in s[1]})
+        label = 'background model load' if background else 'eager model load'
+        print(f"import app ({label}): {seconds * 1000:.0f} ms (median of {args.runs}), "
+              f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+    per_module = {}
+    for _ in range(args.runs):
+        for name, seconds in module_import_times().items():
+            per_module.setdefault(name, []).append(seconds)
+    ranked = sorted(((statistics.median(v), k) for k, v in per_module.items()), reverse=True)
+    print("slowest imports under app (eager model load):")
+    for seconds, name in ranked[:args.top]:
+        print(f"  {name:30} {seconds * 1000:8.1f} ms")
+
+    print()
+    print(f"{'model load':12} {'first response':>16} {'ready':>10}")
+    for background in (True, False):
+        samples = [time_to_first_request(background) for _ in range(args.runs)]
+        first = statistics.median(s[0] for s in samples)
+        ready = statistics.median(s[1] for s in samples)
+        label = 'background' if background else 'eager'
+        print(f"{label:12} {first * 1000:13.0f} ms {ready * 1000:7.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
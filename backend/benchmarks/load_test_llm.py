@@ -0,0 +1,113 @@
+"""Load test for the LLM-bound /simulate endpoint against the local stub server.
+
+Serves app.py once with a single-threaded WSGI server (one sync worker) and
+once with a threaded server (how gunicorn's gthread workers run it), fires
+the same concurrent load at both and reports throughput, latency and how
+many requests were shed: answered 503, or with the template narrative
+because the LLM queue was full.
+
+Usage (from the backend directory):
+    python benchmarks/load_test_llm.py [--requests 200] [--concurrency 32] [--delay 0.25]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_llm_server import start_stub_server
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    body = {}
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            status = response.status
+            body = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start, body
+
+
+def run_phase(app, threaded, args, run_id):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=threaded)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/simulate'
+
+    # Unique scenarios so every request misses the response cache.
+    payloads = [{"scenario": f"load test {run_id} scenario {i}: buy a ${i} gadget"} for i in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda p: post_json(url, p), payloads))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    ok = [latency for status, latency, _ in results if status == 200]
+    shed = sum(1 for status, _, _ in results if status == 503)
+    # /simulate computes its figures locally and only falls back to a template
+    # narrative when the LLM executor sheds the call.
+    degraded = sum(1 for status, _, body in results if status == 200 and body.get('narrative_source') == 'template')
+    ok.sort()
+    return {
+        "server": "threaded" if threaded else "single-threaded",
+        "requests": len(results),
+        "ok": len(ok),
+        "shed_503": shed,
+        "template_narrative": degraded,
+        "other_errors": len(results) - len(ok) - shed,
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        "latency_p50_s": round(statistics.median(ok), 3) if ok else None,
+        "latency_p95_s": round(ok[max(int(len(ok) * 0.95) - 1, 0)], 3) if ok else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--delay', type=float, default=0.25, help='stub LLM latency in seconds')
+    parser.add_argument('--max-concurrency', type=int, default=16, help='LLM_MAX_CONCURRENCY for the app')
+    parser.add_argument('--max-pending', type=int, default=64, help='LLM_MAX_PENDING for the app')
+    args = parser.parse_args()
+
+    _, base_url = start_stub_server(delay=args.delay)
+    os.environ.update({
+        'GROQ_API_KEY': 'stub', 'GROQ_BASE_URL': base_url,
+        'LLM_MAX_CONCURRENCY': str(args.max_concurrency), 'LLM_MAX_PENDING': str(args.max_pending),
+        'UPLOADS_DIR': os.path.join(BACKEND_DIR, 'benchmarks', '.uploads'),
+    })
+    import app as backend
+    from generate_data import HEADERS, build_options, format_csv_rows, generate_shard
+
+    opts = build_options(500, None, fraud_rate=0)
+    columns = generate_shard(np.random.default_rng(0), 500, opts)
+    csv_bytes = ','.join(HEADERS).encode() + b'\n' + format_csv_rows(columns, opts['categories'])
+    client = backend.app.test_client()
+    client.post('/analyze', data={'file': (io.BytesIO(csv_bytes), 'load_test.csv')})
+
+    results = [run_phase(backend.app, threaded, args, run_id) for run_id, threaded in enumerate([False, True])]
+    for result in results:
+        print(json.dumps(result))
+    single, threaded = results
+    if single["throughput_rps"]:
+        print(f"throughput gain: {threaded['throughput_rps'] / single['throughput_rps']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Local stand-in for the Groq chat completions API, for load tests and benchmarks.
+
+Answers every POST .../chat/completions after a fixed delay with a canned,
+valid JSON reply so app.py can run end to end without network access.
+
+Usage (from the backend directory):
+    python benchmarks/stub_llm_server.py --port 8099 --delay 0.5
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8099 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUERY_REPLY = {"query_type": "total_spending", "category": None, "time_period": None, "comparison": None}
+SCENARIO_CHANGES_REPLY = {"changes": [{"type": "one_time_expense", "amount": 100, "month": 1}]}
+SIMULATION_REPLY = {
+    "impact_description": "Stubbed simulation result.",
+    "original_6month_savings": "$0.00",
+    "new_6month_savings": "$0.00",
+    "monthly_change": "$0.00",
+    "recommendations": ["This reply comes from the local stub server."],
+}
+
+
+def make_handler(delay):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not self.path.endswith('/chat/completions'):
+                self.send_error(404)
+                return
+            time.sleep(delay)
+            prompt = body.get('messages', [{}])[-1].get('content', '')
+            if 'Translate this' in prompt:
+                reply = SCENARIO_CHANGES_REPLY
+            else:
+                reply = SIMULATION_REPLY if 'Scenario:' in prompt else QUERY_REPLY
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get('model', 'stub'),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": json.dumps(reply)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=0, delay=0.5):
+    """Starts the stub in a daemon thread and returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds before each reply')
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.port, args.delay)
+    print(f"Stub LLM server listening on {base_url} (delay {args.delay}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
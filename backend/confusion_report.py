@@ -0,0 +1,114 @@
+"""Confusion matrix counts, derived metrics and a cached PNG rendering.
+
+matplotlib and seaborn are imported only when a PNG is actually rendered,
+so they stay off the server's startup path.
+"""
+import base64
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+import numpy as np
+
+CONFUSION_CACHE_MAX_ENTRIES = int(os.getenv('CONFUSION_CACHE_MAX_ENTRIES', 64))
+
+
+def upload_digest(payload, model_version):
+    """Cache key for an uploaded CSV: its content hash plus the model that scored it."""
+    return f"{model_version}:{hashlib.sha256(payload).hexdigest()}"
+
+
+def confusion_counts(y_true, y_pred):
+    """Returns the 2x2 matrix [[tn, fp], [fn, tp]] for binary labels.
+
+    Like sklearn.metrics.confusion_matrix, labels absent from both arrays
+    are dropped, so a single-class input yields a smaller matrix.
+    """
+    y_true = np.asarray(y_true, dtype='int64')
+    y_pred = np.asarray(y_pred, dtype='int64')
+    cm = np.bincount(y_true * 2 + y_pred, minlength=4).reshape(2, 2)
+    present = np.union1d(np.unique(y_true), np.unique(y_pred))
+    return cm[np.ix_(present, present)]
+
+
+def derived_metrics(cm):
+    """Counts and the metrics the frontend shows, computed from a 2x2 matrix."""
+    tn, fp, fn, tp = (int(v) for v in cm.ravel())
+
+    def ratio(num, den):
+        return num / den if den else 0.0
+
+    precision = ratio(tp, tp + fp)
+    recall = ratio(tp, tp + fn)
+    mcc_den = math.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+    return {
+        "tn": tn, "fp": fp, "fn": fn, "tp": tp,
+        "accuracy": ratio(tp + tn, tn + fp + fn + tp),
+        "precision": precision,
+        "recall": recall,
+        "f1_score": ratio(2 * precision * recall, precision + recall),
+        "specificity": ratio(tn, tn + fp),
+        "mcc": ratio(tp * tn - fp * fn, mcc_den),
+    }
+
+
+def render_png_base64(cm):
+    """Draws the confusion matrix heatmap and returns it as base64 PNG."""
+    import matplotlib
+    matplotlib.use('Agg')  # Ensure non-interactive backend
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['Not Fraud', 'Fraud'], yticklabels=['Not Fraud', 'Fraud'], ax=ax)
+    ax.set_xlabel('Predicted')
+    ax.set_ylabel('Actual')
+    ax.set_title('Confusion Matrix')
+    fig.tight_layout()
+    buf = BytesIO()
+    fig.savefig(buf, format='png')
+    plt.close(fig)
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+class ConfusionReportCache:
+    """LRU of per-upload results keyed by upload_digest().
+
+    Each entry holds the 2x2 counts and, once requested, the rendered PNG,
+    so identical uploads are neither re-scored nor re-rendered.
+    """
+
+    def __init__(self, max_entries=CONFUSION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "renders": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key, cm):
+        entry = {"cm": cm, "image": None}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def image(self, entry):
+        """Returns the entry's PNG, rendering it on first use."""
+        if entry["image"] is None:
+            entry["image"] = render_png_base64(entry["cm"])
+            with self._lock:
+                self.stats["renders"] += 1
+        return entry["image"]
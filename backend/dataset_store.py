@@ -0,0 +1,401 @@
+"""Typed columnar storage for uploaded transaction datasets.
+
+Each upload is converted once into one raw binary file per column (float32
+V1-V28, float64 Time/Amount, int8 Class and int32 category codes) plus a
+meta.json describing the schema. A Class of UNLABELED (-1) marks a row
+stored without a label, e.g. one appended from a file with no Class column. Readers memory-map those files instead of
+re-parsing the CSV on every request.
+"""
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; locks then only hold within one process
+    fcntl = None
+from aggregate_index import AggregateIndex
+from time_index import TimeIndex
+
+FORMAT_VERSION = 2
+DEFAULT_CHUNK_ROWS = int(os.getenv('DATASET_CHUNK_ROWS', 50000))
+
+V_COLUMNS = [f'V{i}' for i in range(1, 29)]
+COLUMN_DTYPES = {'Time': 'float64', **{col: 'float32' for col in V_COLUMNS}, 'Amount': 'float64', 'Class': 'int8'}
+CATEGORY_COLUMN = 'Category'
+CATEGORY_CODE_DTYPE = 'int32'
+META_FILE = 'meta.json'
+AGGREGATES_FILE = 'aggregates.json'
+TIME_INDEX_PREFIX = 'time_index_'
+PUBLISH_LOCK_FILE = '.publish.lock'
+UNLABELED = -1
+
+
+@contextmanager
+def file_lock(path):
+    """Holds an exclusive flock on path (created if needed), serializing processes and threads alike."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _source_stat(csv_path):
+    stat = os.stat(csv_path)
+    return {"source_mtime_ns": stat.st_mtime_ns, "source_size": stat.st_size}
+
+
+def read_meta(store_dir):
+    """Returns the store's metadata, or None if nothing has been written yet."""
+    try:
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(store_dir, meta):
+    # Written to a temporary file and renamed so readers never see a partial file.
+    tmp_path = os.path.join(store_dir, f'.{META_FILE}.{os.getpid()}.{threading.get_ident()}')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(store_dir, META_FILE))
+
+
+def new_version_dir(store_dir):
+    """Creates an empty directory for the store's next version; returns (version, path)."""
+    previous = read_meta(store_dir)
+    version = (previous["version"] + 1) if previous else 1
+    data_dir = os.path.join(store_dir, f'v{version}')
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+    return version, data_dir
+
+
+def publish_version(store_dir, version, num_rows, columns, categories, aggregates, csv_path=None):
+    """Writes the version's aggregates and meta.json, then removes older versions.
+
+    columns maps each stored column to its dtype. Returns the new meta.
+    """
+    aggregates_path = os.path.join(store_dir, f'v{version}', AGGREGATES_FILE)
+    tmp_path = f'{aggregates_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(aggregates.to_json())
+    os.replace(tmp_path, aggregates_path)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "num_rows": num_rows,
+        "columns": columns,
+        "categories": list(categories),
+    }
+    if csv_path:
+        meta.update(_source_stat(csv_path))
+    _write_meta(store_dir, meta)
+
+    # Older versions are no longer referenced by meta.json. Readers that
+    # already mapped them keep working because unlinked files stay mapped.
+    for name in os.listdir(store_dir):
+        if name.startswith('v') and name != f'v{version}':
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+    return meta
+
+
+def _missing_values(col, num_rows):
+    """Stored values for a column the written rows lack: no category, an UNLABELED Class, NaN otherwise."""
+    if col == CATEGORY_COLUMN:
+        return np.full(num_rows, -1, dtype=CATEGORY_CODE_DTYPE)
+    return np.full(num_rows, UNLABELED if col == 'Class' else np.nan, dtype=COLUMN_DTYPES[col])
+
+
+class ColumnarWriter:
+    """Appends DataFrame chunks to a new version of a columnar store.
+
+    With append=True the rows are added to the end of the current version
+    instead, and the schema, category codes and aggregates carry on from it.
+    Readers that memory-mapped the shorter files keep seeing the old rows
+    until the new meta.json is published. Callers must not append to one
+    store from two writers at once.
+    """
+
+    def __init__(self, store_dir, append=False):
+        self.store_dir = store_dir
+        self._files = {}
+        meta = read_meta(store_dir) if append else None
+        if meta is None:
+            self.version, self.data_dir = new_version_dir(store_dir)
+            self.columns = None
+            self.categories = {}
+            self.num_rows = 0
+            self.aggregates = AggregateIndex()
+            return
+        self.version = meta["version"]
+        self.data_dir = os.path.join(store_dir, f'v{self.version}')
+        self.columns = list(meta["columns"])
+        self.categories = {name: code for code, name in enumerate(meta["categories"])}
+        self.num_rows = meta["num_rows"]
+        self.aggregates = read_aggregates(store_dir, meta)
+        for col in self.columns:
+            # Bytes left past num_rows by an append that failed partway are
+            # cut off, so every column continues from the same row.
+            f = open(os.path.join(self.data_dir, f'{col}.bin'), 'r+b')
+            f.truncate(self.num_rows * np.dtype(meta["columns"][col]).itemsize)
+            f.seek(0, os.SEEK_END)
+            self._files[col] = f
+
+    def append(self, chunk):
+        """Writes one chunk; the first chunk fixes the stored schema."""
+        if self.columns is None:
+            self.columns = [col for col in list(COLUMN_DTYPES) + [CATEGORY_COLUMN] if col in chunk.columns]
+            for col in self.columns:
+                self._files[col] = open(os.path.join(self.data_dir, f'{col}.bin'), 'wb')
+
+        for col in self.columns:
+            if col not in chunk.columns:
+                # Appended rows may lack optional columns the store has.
+                values = _missing_values(col, len(chunk))
+            elif col == CATEGORY_COLUMN:
+                values = self._encode_categories(chunk[col])
+            elif col == 'Class':
+                values = pd.to_numeric(chunk[col], errors='coerce').fillna(UNLABELED).to_numpy(COLUMN_DTYPES[col])
+            else:
+                values = chunk[col].to_numpy(COLUMN_DTYPES[col])
+            self._files[col].write(np.ascontiguousarray(values).tobytes())
+        self.aggregates.update(chunk)
+        self.num_rows += len(chunk)
+
+    def append_store(self, other_dir, block_rows=DEFAULT_CHUNK_ROWS):
+        """Copies every row of another store (e.g. one shard of an upload) to the end of this one.
+
+        The other store's columns are memory-mapped and copied block by
+        block; its category codes are remapped onto this store's vocabulary
+        and its aggregates are merged rather than recomputed.
+        """
+        meta = read_meta(other_dir)
+        if meta is None or meta["num_rows"] == 0:
+            return
+        other = open_columnar(other_dir, meta)
+        if self.columns is None:
+            self.columns = list(meta["columns"])
+            for col in self.columns:
+                self._files[col] = open(os.path.join(self.data_dir, f'{col}.bin'), 'wb')
+        for start in range(0, meta["num_rows"], block_rows):
+            block = other.iloc[start:start + block_rows]
+            for col in self.columns:
+                if col == CATEGORY_COLUMN and col in block.columns:
+                    values = self._encode_categories(block[col])
+                elif col in block.columns:
+                    values = block[col].to_numpy(COLUMN_DTYPES[col])
+                else:
+                    values = _missing_values(col, len(block))
+                self._files[col].write(np.ascontiguousarray(values).tobytes())
+        self.aggregates.merge(read_aggregates(other_dir, meta))
+        self.num_rows += meta["num_rows"]
+
+    def _encode_categories(self, series):
+        # Factorize the chunk, then map its local codes onto the store-wide vocabulary.
+        local_codes, uniques = pd.factorize(series)
+        if len(uniques) == 0:
+            return np.full(len(series), -1, dtype=CATEGORY_CODE_DTYPE)
+        mapping = np.array(
+            [self.categories.setdefault(str(value), len(self.categories)) for value in uniques],
+            dtype=CATEGORY_CODE_DTYPE,
+        )
+        return np.where(local_codes >= 0, mapping[local_codes], -1).astype(CATEGORY_CODE_DTYPE)
+
+    def close(self, csv_path=None):
+        """Flushes the column files and atomically publishes the new version."""
+        for f in self._files.values():
+            f.close()
+        columns = {
+            col: CATEGORY_CODE_DTYPE if col == CATEGORY_COLUMN else COLUMN_DTYPES[col]
+            for col in (self.columns or [])
+        }
+        return publish_version(self.store_dir, self.version, self.num_rows, columns,
+                               self.categories, self.aggregates, csv_path)
+
+
+def convert_csv(csv_path, store_dir, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Converts a CSV file into a new columnar version, chunk by chunk."""
+    os.makedirs(store_dir, exist_ok=True)
+    writer = ColumnarWriter(store_dir)
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        writer.append(chunk)
+    return writer.close(csv_path)
+
+
+def open_columnar(store_dir, meta):
+    """Builds a DataFrame backed by read-only memory maps of the stored columns."""
+    data_dir = os.path.join(store_dir, f'v{meta["version"]}')
+    num_rows = meta["num_rows"]
+    columns = {}
+    for col, dtype in meta["columns"].items():
+        path = os.path.join(data_dir, f'{col}.bin')
+        values = np.memmap(path, dtype=dtype, mode='r', shape=(num_rows,)) if num_rows else np.empty(0, dtype=dtype)
+        if col == CATEGORY_COLUMN:
+            values = pd.Categorical.from_codes(values, categories=meta["categories"])
+        columns[col] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_aggregates(store_dir, meta):
+    """Loads the aggregate index written alongside a columnar version."""
+    with open(os.path.join(store_dir, f'v{meta["version"]}', AGGREGATES_FILE)) as f:
+        return AggregateIndex.from_json(f.read())
+
+
+def load_time_index(store_dir, meta):
+    """Loads the version's TimeIndex, building and saving it first if needed.
+
+    The index is built on first use rather than at upload time, so appends
+    stay cheap: it is keyed by num_rows and rebuilt once after the rows change.
+    """
+    data_dir = os.path.join(store_dir, f'v{meta["version"]}')
+    index_dir = os.path.join(data_dir, f'{TIME_INDEX_PREFIX}{meta["num_rows"]}')
+    if not os.path.isdir(index_dir):
+        num_rows = meta["num_rows"]
+        columns = {}
+        for col in ('Time', 'Amount', CATEGORY_COLUMN):
+            path = os.path.join(data_dir, f'{col}.bin')
+            if col in meta["columns"] and num_rows:
+                columns[col] = np.memmap(path, dtype=meta["columns"][col], mode='r', shape=(num_rows,))
+            else:
+                columns[col] = _missing_values(col, num_rows) if col != 'Time' else np.full(num_rows, np.nan)
+        index = TimeIndex.build(columns['Time'], columns['Amount'], columns[CATEGORY_COLUMN], meta["categories"])
+        # Built aside and renamed so readers never see a partial index.
+        tmp_dir = os.path.join(data_dir, f'.{TIME_INDEX_PREFIX}{num_rows}.{os.getpid()}.{threading.get_ident()}')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        index.save(tmp_dir)
+        try:
+            os.rename(tmp_dir, index_dir)
+        except OSError:  # built concurrently by another worker
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        for name in os.listdir(data_dir):
+            if name.startswith(TIME_INDEX_PREFIX) and name != os.path.basename(index_dir):
+                shutil.rmtree(os.path.join(data_dir, name), ignore_errors=True)
+    return TimeIndex.load(index_dir)
+
+
+def is_stale(meta, csv_path):
+    """True if meta is missing, from an older format, or out of date with the CSV."""
+    if meta is None or meta.get("format_version") != FORMAT_VERSION:
+        return True
+    if not os.path.exists(csv_path):
+        return False
+    return any(meta.get(key) != value for key, value in _source_stat(csv_path).items())
+
+
+class DatasetStore:
+    """Serves a CSV-backed dataset from its columnar copy, rebuilding it when stale."""
+
+    def __init__(self, csv_path, store_dir=None):
+        self.csv_path = csv_path
+        self.store_dir = store_dir or os.path.splitext(csv_path)[0] + '.columnar'
+        self._lock = threading.Lock()
+        self._cached_version = None
+        self._cached_df = None
+        self._cached_aggregates = None
+        self._cached_time_index = None
+
+    def cached_nbytes(self):
+        """Bytes held by the cached DataFrame, or 0 when nothing is loaded."""
+        df = self._cached_df
+        return int(df.memory_usage(index=False).sum()) if df is not None else 0
+
+    def unload(self):
+        """Drops the cached DataFrame; the columnar files stay on disk."""
+        with self._lock:
+            self._cached_df = None
+            self._cached_aggregates = None
+            self._cached_time_index = None
+            self._cached_version = None
+
+    def exists(self):
+        return os.path.exists(self.csv_path) or read_meta(self.store_dir) is not None
+
+    def writer(self):
+        """Returns a writer for a new version; call close(csv_path) when done."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        return ColumnarWriter(self.store_dir)
+
+    def appender(self):
+        """Returns a writer that adds rows to the current version; finish it with append()."""
+        with self._lock:
+            self._refresh()
+        return ColumnarWriter(self.store_dir, append=True)
+
+    def append(self, appender, rows, append_csv):
+        """Adds rows to the source CSV (append_csv(csv_path, rows)) and to appender, then publishes them.
+
+        The lock and the store's publish file lock are held throughout, so
+        a reader in this or another process never finds the longer CSV next
+        to the old meta.json and rebuilds the copy under the appender.
+        Returns the new meta.
+        """
+        with self._lock, file_lock(os.path.join(self.store_dir, PUBLISH_LOCK_FILE)):
+            if len(rows):
+                append_csv(self.csv_path, rows)
+                appender.append(rows)
+            return appender.close(self.csv_path)
+
+    def _refresh(self):
+        # Caller holds self._lock. Rebuilds a stale copy and drops cached
+        # objects that belong to an older version.
+        meta = read_meta(self.store_dir)
+        if is_stale(meta, self.csv_path):
+            # An append publishing under the file lock may be what looks
+            # stale; check again once it is done before rebuilding.
+            with file_lock(os.path.join(self.store_dir, PUBLISH_LOCK_FILE)):
+                meta = read_meta(self.store_dir)
+                if is_stale(meta, self.csv_path):
+                    if not os.path.exists(self.csv_path):
+                        raise FileNotFoundError(self.csv_path)
+                    print(f"[STORE] Converting {self.csv_path} to columnar format")
+                    meta = convert_csv(self.csv_path, self.store_dir)
+        # Appends keep the version number but change num_rows.
+        cache_key = (meta["version"], meta["num_rows"])
+        if cache_key != self._cached_version:
+            self._cached_df = None
+            self._cached_aggregates = None
+            self._cached_time_index = None
+            self._cached_version = cache_key
+        return meta
+
+    def meta(self):
+        """The current version's metadata (version, num_rows, columns), without loading any rows."""
+        with self._lock:
+            return self._refresh()
+
+    def load(self):
+        """Returns the current dataset as a memory-mapped DataFrame."""
+        with self._lock:
+            meta = self._refresh()
+            if self._cached_df is None:
+                self._cached_df = open_columnar(self.store_dir, meta)
+            # Shallow copy so callers can add columns without touching the cached frame.
+            return self._cached_df.copy(deep=False)
+
+    def load_aggregates(self):
+        """Returns the precomputed AggregateIndex for the current version."""
+        with self._lock:
+            meta = self._refresh()
+            if self._cached_aggregates is None:
+                self._cached_aggregates = read_aggregates(self.store_dir, meta)
+            return self._cached_aggregates
+
+    def load_time_index(self):
+        """Returns the TimeIndex for the current version (built on first use)."""
+        with self._lock:
+            meta = self._refresh()
+            if self._cached_time_index is None:
+                self._cached_time_index = load_time_index(self.store_dir, meta)
+            return self._cached_time_index
@@ -1,9 +1,42 @@
+"""Generates synthetic transaction data for demos and load tests.
+
+Usage (from the backend directory):
+    python generate_data.py                       # ~1,000-row demo CSV
+    python generate_data.py --rows 100000000 --fraud-rate 0.002 --workers 8 \
+        --format columnar --output big.columnar --seed 7
+
+Rows are generated with vectorized NumPy in shards of --shard-rows; shard i
+always uses the generator seeded with (seed, i), so the output depends only
+on the seed and the options, not on --workers. Shards run in parallel
+processes. Columnar output (the dataset_store format, servable without a
+CSV) is written by the workers straight into the final column files; CSV
+shards are concatenated behind a single header.
+
+Every dataset contains the REAL_ANOMALIES rows, spread over the first
+shard. Their V features are stored as float32 and written with 6 decimals,
+so they match the listed values to within 1e-6 rather than exactly.
+--fraud-rate (default 0) adds jittered copies of them on top.
+"""
+import argparse
 import csv
-import random
+import io
+import multiprocessing
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
 
 # --- Configuration ---
 NUM_NORMAL_TRANSACTIONS = 1000
 OUTPUT_FILE = 'large_test_data.csv'
+DEFAULT_FRAUD_RATE = 0.0
+DEFAULT_SHARD_ROWS = 1_000_000
+CSV_BLOCK_ROWS = 100_000
+# Decimal places written to CSV; V features get 6.
+CSV_DECIMALS = {'Time': 0, 'Amount': 2, 'Class': 0}
+# Amount mixture of uniform low-high ranges with weights.
+DEFAULT_AMOUNTS = '1-50:0.85,51-150:0.10,151-500:0.05'
 # ---------------------
 
 CATEGORIES = ['Shopping', 'Dining', 'Groceries', 'Travel', 'Utilities', 'Entertainment', 'Health', 'Services']
@@ -19,44 +52,263 @@ REAL_ANOMALIES = [
     [8408, -4.13283733, 5.181314815, -6.113898032, 5.869904212, -3.243557022, -1.810303357, -3.103934968, 1.442340156, -3.424422247, -5.20163158, 4.41235336, -5.889547522, 1.09249713, -6.643886259, 0.69752932, -4.10266408, -5.539129548, -4.331532135, 0.21830006, 0.496863339, 0.584611442, -0.213233215, -0.08353934, 0.08447817, 0.224345228, 0.03770487, 0.463230559, 0.18357908, 1.00, 'Utilities', 1]
 ]
 
-# THIS IS THE FUNCTION THAT WAS ACCIDENTALLY DELETED. IT IS NOW RESTORED.
-def generate_random_v_features():
-    """Generates a list of 28 random float values simulating the V features."""
-    return [random.uniform(-3, 3) for _ in range(28)]
-
-def generate_normal_transaction():
-    """Generates a single row for a normal transaction."""
-    features = generate_random_v_features()
-    amount = round(random.choices(
-        population=[random.uniform(1, 50), random.uniform(51, 150), random.uniform(151, 500)],
-        weights=[0.85, 0.1, 0.05],
-        k=1
-    )[0], 2)
-    time_step = random.randint(1, 172000)
-    category = random.choice(CATEGORIES)
-    return [time_step] + features + [amount, category, 0]  # 0 for normal
+# --- Vectorized, sharded generation ---
+def parse_weighted(spec, parse_key):
+    """Parses "key:weight,key:weight" into ([keys], normalized weights)."""
+    keys, weights = [], []
+    for item in spec.split(','):
+        key, _, weight = item.strip().rpartition(':')
+        if not key:
+            key, weight = weight, '1'
+        keys.append(parse_key(key.strip()))
+        weights.append(float(weight))
+    weights = np.asarray(weights, dtype='float64')
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise argparse.ArgumentTypeError(f"weights in '{spec}' must be non-negative and not all zero")
+    return keys, weights / weights.sum()
+
+
+def parse_amount_range(text):
+    low, _, high = text.partition('-')
+    low, high = float(low), float(high)
+    if not 0 <= low <= high:
+        raise argparse.ArgumentTypeError(f"amount range '{text}' must be low-high with 0 <= low <= high")
+    return low, high
+
+
+def _fixed_point(values, decimals):
+    """Formats numbers as ASCII fixed-point, one row per value in an (n, width) uint8
+    matrix; unused leading positions hold NUL bytes that format_csv_rows strips."""
+    values = np.asarray(values, dtype='float64')
+    scaled = np.round(np.abs(values) * 10 ** decimals).astype('int64')
+    num_digits = max(len(str(int(scaled.max(initial=0)))), decimals + 1)
+    width = 1 + num_digits + (1 if decimals else 0)
+    out = np.zeros((len(values), width), dtype='uint8')
+    out[:, 0] = np.where((values < 0) & (scaled > 0), ord('-'), 0)
+    remaining = scaled.copy()
+    position = width - 1
+    for k in range(num_digits):
+        if decimals and k == decimals:
+            out[:, position] = ord('.')
+            position -= 1
+        digit = (remaining % 10).astype('uint8') + ord('0')
+        remaining //= 10
+        # Digits above the units place are leading zeros once the value is below 10**k.
+        out[:, position] = digit if k <= decimals else np.where(scaled >= 10 ** k, digit, 0)
+        position -= 1
+    return out
+
+
+def format_csv_rows(columns, categories):
+    """Encodes a block of generated rows as CSV bytes (without a header).
+
+    pandas' to_csv formats floats one value at a time; building fixed-width
+    byte matrices with NumPy and dropping the padding is about 10x faster.
+    """
+    encoded_names = []
+    for name in categories:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='').writerow([name])
+        encoded_names.append(buffer.getvalue().encode())
+    names = np.array(encoded_names)
+    num_rows = len(columns['Class'])
+    parts = []
+    for col in HEADERS:
+        values = columns[col]
+        if col == 'Category':
+            width = names.dtype.itemsize
+            parts.append(names[values].view('uint8').reshape(num_rows, width))
+        else:
+            parts.append(_fixed_point(values, CSV_DECIMALS.get(col, 6)))
+        parts.append(np.full((num_rows, 1), ord(','), dtype='uint8'))
+    parts[-1] = np.full((num_rows, 1), ord('\n'), dtype='uint8')
+    rows = np.hstack(parts)
+    return rows[rows != 0].tobytes()
+
+
+def generate_shard(rng, num_rows, opts):
+    """Returns a dict of column arrays for num_rows rows (Category as int codes)."""
+    is_fraud = rng.random(num_rows) < opts['fraud_rate']
+    time_col = rng.integers(1, 172001, num_rows).astype('float64')
+    v = rng.uniform(-3, 3, (num_rows, 28)).astype('float32')
+    ranges = np.asarray(opts['amount_ranges'], dtype='float64')
+    component = rng.choice(len(ranges), num_rows, p=opts['amount_weights'])
+    amount = np.round(rng.uniform(ranges[component, 0], ranges[component, 1]), 2)
+    category = rng.choice(len(opts['category_weights']), num_rows, p=opts['category_weights']).astype('int32')
+
+    # Fraud rows are REAL_ANOMALIES templates with Gaussian jitter: added to
+    # the V features, multiplicative on Time and Amount.
+    fraud_rows = np.flatnonzero(is_fraud)
+    if len(fraud_rows):
+        templates = opts['templates']
+        pick = rng.integers(0, len(templates['time']), len(fraud_rows))
+        jitter = opts['jitter']
+        v[fraud_rows] = templates['v'][pick] + rng.normal(0, jitter, (len(fraud_rows), 28)).astype('float32')
+        time_col[fraud_rows] = np.maximum(np.round(templates['time'][pick] * (1 + rng.normal(0, jitter, len(fraud_rows)))), 0)
+        amount[fraud_rows] = np.maximum(np.round(templates['amount'][pick] * (1 + rng.normal(0, jitter, len(fraud_rows))), 2), 0)
+        category[fraud_rows] = templates['category'][pick]
+
+    columns = {'Time': time_col}
+    columns.update({f'V{i}': v[:, i - 1] for i in range(1, 29)})
+    columns.update({'Amount': amount, 'Category': category, 'Class': is_fraud.astype('int8')})
+    return columns
 
-def main():
-    """Main function to generate the data and write to a CSV file."""
-    all_transactions = []
 
-    print(f"Generating {NUM_NORMAL_TRANSACTIONS} normal transactions...")
-    for _ in range(NUM_NORMAL_TRANSACTIONS):
-        all_transactions.append(generate_normal_transaction())
+def insert_real_anomalies(columns, opts):
+    """Overwrites evenly spaced rows of a shard with the REAL_ANOMALIES rows (as many as fit)."""
+    templates = opts['templates']
+    num_rows = len(columns['Class'])
+    count = min(len(templates['time']), num_rows)
+    if not count:
+        return
+    positions = np.linspace(0, num_rows - 1, count).round().astype('int64')
+    columns['Time'][positions] = templates['time'][:count]
+    for i in range(1, 29):
+        columns[f'V{i}'][positions] = templates['v'][:count, i - 1]
+    columns['Amount'][positions] = templates['amount'][:count]
+    columns['Category'][positions] = templates['category'][:count]
+    columns['Class'][positions] = 1
 
-    print(f"Adding {len(REAL_ANOMALIES)} real anomalies...")
-    all_transactions.extend(REAL_ANOMALIES)
 
-    print("Shuffling transactions...")
-    random.shuffle(all_transactions)
+def _generate_shard_job(args):
+    """Worker: generates shard `index` and writes it. Returns (index, rows, frauds, aggregate sums/counts)."""
+    from aggregate_index import AggregateIndex
+    from dataset_store import CATEGORY_COLUMN, CATEGORY_CODE_DTYPE, COLUMN_DTYPES
+
+    index, opts = args
+    start_row = index * opts['shard_rows']
+    num_rows = min(opts['shard_rows'], opts['rows'] - start_row)
+    columns = generate_shard(np.random.default_rng([opts['seed'], index]), num_rows, opts)
+    if index == 0:
+        insert_real_anomalies(columns, opts)
+    categories = opts['categories']
+
+    if opts['format'] == 'columnar':
+        for col, values in columns.items():
+            dtype = np.dtype(CATEGORY_CODE_DTYPE if col == CATEGORY_COLUMN else COLUMN_DTYPES[col])
+            with open(os.path.join(opts['data_dir'], f'{col}.bin'), 'r+b') as f:
+                f.seek(start_row * dtype.itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    else:
+        with open(os.path.join(opts['parts_dir'], f'part-{index:05d}.csv'), 'wb') as f:
+            for block in range(0, num_rows, CSV_BLOCK_ROWS):
+                f.write(format_csv_rows({col: values[block:block + CSV_BLOCK_ROWS]
+                                         for col, values in columns.items()}, categories))
+
+    aggregates = AggregateIndex(categories)
+    aggregates.update(pd.DataFrame({
+        'Time': columns['Time'], 'Amount': columns['Amount'],
+        'Category': pd.Categorical.from_codes(columns['Category'], categories=categories),
+    }))
+    return index, num_rows, int(columns['Class'].sum()), aggregates.sums, aggregates.counts
+
+
+def generate_dataset(opts, workers):
+    """Generates opts['rows'] rows into opts['output']. Returns the number of fraud rows."""
+    from aggregate_index import AggregateIndex
+    from dataset_store import (
+        CATEGORY_COLUMN, CATEGORY_CODE_DTYPE, COLUMN_DTYPES, new_version_dir, publish_version,
+    )
+
+    num_shards = -(-opts['rows'] // opts['shard_rows'])
+    output = opts['output']
+    if opts['format'] == 'columnar':
+        os.makedirs(output, exist_ok=True)
+        version, opts['data_dir'] = new_version_dir(output)
+        stored = {col: CATEGORY_CODE_DTYPE if col == CATEGORY_COLUMN else COLUMN_DTYPES[col]
+                  for col in ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount', 'Category', 'Class']}
+        # Pre-size every column file so workers can write their shards in place.
+        for col, dtype in stored.items():
+            with open(os.path.join(opts['data_dir'], f'{col}.bin'), 'wb') as f:
+                f.truncate(opts['rows'] * np.dtype(dtype).itemsize)
+    else:
+        opts['parts_dir'] = output + '.parts'
+        shutil.rmtree(opts['parts_dir'], ignore_errors=True)
+        os.makedirs(opts['parts_dir'])
+
+    aggregates = AggregateIndex(opts['categories'])
+    frauds = done = 0
+    jobs = [(index, opts) for index in range(num_shards)]
+    with multiprocessing.Pool(min(workers, num_shards)) as pool:
+        for index, num_rows, shard_frauds, sums, counts in pool.imap_unordered(_generate_shard_job, jobs):
+            aggregates.sums += sums
+            aggregates.counts += counts
+            frauds += shard_frauds
+            done += num_rows
+            print(f"  shard {index + 1}/{num_shards}: {done:,}/{opts['rows']:,} rows")
+
+    if opts['format'] == 'columnar':
+        publish_version(output, version, opts['rows'], stored, opts['categories'], aggregates)
+    else:
+        with open(output + '.tmp', 'w', newline='') as out:
+            csv.writer(out).writerow(HEADERS)
+            for index in range(num_shards):
+                with open(os.path.join(opts['parts_dir'], f'part-{index:05d}.csv'), newline='') as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+        os.replace(output + '.tmp', output)
+        shutil.rmtree(opts['parts_dir'], ignore_errors=True)
+    return frauds
+
+
+def build_options(rows, output, fmt='csv', seed=42, fraud_rate=DEFAULT_FRAUD_RATE, jitter=0.05,
+                  categories=','.join(CATEGORIES), amounts=DEFAULT_AMOUNTS, shard_rows=DEFAULT_SHARD_ROWS):
+    """Resolves the distribution specs into the options dict generate_dataset() takes."""
+    categories, category_weights = parse_weighted(categories, str)
+    amount_ranges, amount_weights = parse_weighted(amounts, parse_amount_range)
+    # Template categories outside the chosen ones are appended with zero weight.
+    template_categories = [row[30] for row in REAL_ANOMALIES]
+    extra = [name for name in dict.fromkeys(template_categories) if name not in categories]
+    categories += extra
+    category_weights = np.concatenate([category_weights, np.zeros(len(extra))])
+    return {
+        'rows': rows, 'seed': seed, 'shard_rows': shard_rows, 'format': fmt, 'output': output,
+        'fraud_rate': fraud_rate, 'jitter': jitter,
+        'categories': categories, 'category_weights': category_weights,
+        'amount_ranges': amount_ranges, 'amount_weights': amount_weights,
+        'templates': {
+            'time': np.array([row[0] for row in REAL_ANOMALIES], dtype='float64'),
+            'v': np.array([row[1:29] for row in REAL_ANOMALIES], dtype='float32'),
+            'amount': np.array([row[29] for row in REAL_ANOMALIES], dtype='float64'),
+            'category': np.array([categories.index(name) for name in template_categories], dtype='int32'),
+        },
+    }
+
+
+def main():
+    """Parses the CLI options and writes the dataset."""
+    parser = argparse.ArgumentParser(description="Generate synthetic transaction data.")
+    parser.add_argument('--rows', type=int, default=NUM_NORMAL_TRANSACTIONS + len(REAL_ANOMALIES))
+    parser.add_argument('--fraud-rate', type=float, default=DEFAULT_FRAUD_RATE,
+                        help='share of rows drawn from jittered REAL_ANOMALIES templates, '
+                             'on top of the template rows every dataset contains (default 0)')
+    parser.add_argument('--jitter', type=float, default=0.05,
+                        help='std of the noise applied to anomaly templates')
+    parser.add_argument('--categories', default=','.join(CATEGORIES),
+                        help='category weights, e.g. "Shopping:3,Dining:2,Travel:1"')
+    parser.add_argument('--amounts', default=DEFAULT_AMOUNTS,
+                        help='amount mixture of uniform ranges, e.g. "1-50:0.85,51-150:0.1,151-500:0.05"')
+    parser.add_argument('--format', choices=['csv', 'columnar'], default='csv')
+    parser.add_argument('--output', help=f"defaults to {OUTPUT_FILE} (or its .columnar directory)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard-rows', type=int, default=DEFAULT_SHARD_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if args.rows < 1 or args.shard_rows < 1 or args.workers < 1:
+        parser.error("--rows, --shard-rows and --workers must be positive")
+    if not 0 <= args.fraud_rate <= 1:
+        parser.error("--fraud-rate must be between 0 and 1")
+
+    output = args.output or (os.path.splitext(OUTPUT_FILE)[0] + '.columnar' if args.format == 'columnar' else OUTPUT_FILE)
+    opts = build_options(args.rows, output, args.format, seed=args.seed, fraud_rate=args.fraud_rate,
+                         jitter=args.jitter, categories=args.categories, amounts=args.amounts,
+                         shard_rows=args.shard_rows)
 
-    print(f"Writing {len(all_transactions)} total transactions to '{OUTPUT_FILE}'...")
-    with open(OUTPUT_FILE, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(HEADERS)
-        writer.writerows(all_transactions)
-    
-    print("\nDone! Your guaranteed-to-work test CSV file is ready.")
+    print(f"Generating {args.rows:,} transactions ({args.fraud_rate:.2%} fraud) with {args.workers} worker(s)...")
+    start = time.perf_counter()
+    frauds = generate_dataset(opts, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"\nDone! Wrote {args.rows:,} rows ({frauds:,} fraud) to '{opts['output']}' "
+          f"in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s).")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
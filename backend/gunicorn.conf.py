@@ -0,0 +1,11 @@
+# Gunicorn settings for the Flask backend: `gunicorn -c gunicorn.conf.py app:app`
+# gthread workers let each process keep many LLM-bound /query and /simulate
+# requests in flight while they wait on Groq; LLM_MAX_CONCURRENCY and
+# LLM_MAX_PENDING in app.py bound how many of those calls run or queue.
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
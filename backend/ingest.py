@@ -0,0 +1,216 @@
+"""Chunked CSV ingestion and scoring for large transaction uploads."""
+import csv
+import os
+import numpy as np
+import pandas as pd
+from instrumentation import span
+from scoring_kernel import sigmoid
+
+# Uploads are copied to disk in blocks of this many bytes.
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+# Number of CSV rows parsed, scaled and scored at a time in streaming mode.
+DEFAULT_CHUNK_ROWS = int(os.getenv('ANALYZE_CHUNK_ROWS', 50000))
+# Uploads larger than this many bytes are analyzed in streaming mode.
+STREAMING_THRESHOLD_BYTES = int(os.getenv('ANALYZE_STREAMING_THRESHOLD_BYTES', 16 * 1024 * 1024))
+
+REQUIRED_MODEL_COLUMNS = ['Time', 'Amount'] + [f'V{i}' for i in range(1, 29)]
+NON_ESSENTIAL_CATEGORIES = ['Dining', 'Entertainment', 'Shopping', 'Travel'] # Example categories
+
+
+class MissingColumnsError(ValueError):
+    """Raised when an upload lacks the columns the fraud model needs."""
+
+
+def save_upload(file, save_path, block_size=UPLOAD_BLOCK_SIZE):
+    """Copies an uploaded file to disk without reading it into memory at once."""
+    file.seek(0)
+    file.save(save_path, buffer_size=block_size)
+    return os.path.getsize(save_path)
+
+
+def build_savings_plan(spend_by_category):
+    """Simple Savings Plan Logic shared by the in-memory and streaming paths."""
+    savings_plan = {}
+    for category, amount in spend_by_category.items():
+        if category in NON_ESSENTIAL_CATEGORIES and amount > 50: # Set a threshold
+            potential_savings = amount * 0.15 # Suggest saving 15%
+            savings_plan[category] = f"You could save ${potential_savings:.2f}/month by reducing spending on {category} by 15%."
+    return savings_plan
+
+
+def anomaly_margins(df, kernel):
+    """The compiled scoring kernel's decision values for df; positive means fraud."""
+    # Scaling is folded into the kernel's weights; 'features' is the gather
+    # of the raw columns into one float32 matrix.
+    with span('features'):
+        features = kernel.as_matrix(df)
+    with span('predict'):
+        return kernel.decision_function(features)
+
+
+def predict_anomalies(df, kernel):
+    """Returns the fraud model's hard predictions for df via the compiled scoring kernel."""
+    return (anomaly_margins(df, kernel) > 0).astype('int64')
+
+
+def flag_anomalies(df, kernel):
+    """Sets df['is_anomaly'] and returns the flagged rows with a 'score' column (P(fraud)).
+
+    The returned frame keeps df's index, so with a RangeIndex it holds each
+    anomaly's row position in the upload.
+    """
+    margins = anomaly_margins(df, kernel)
+    df['is_anomaly'] = (margins > 0).astype('int64')
+    flagged = np.flatnonzero(margins > 0)
+    anomalies = df.iloc[flagged].copy()
+    anomalies['score'] = sigmoid(margins[flagged].astype('float64'))
+    return anomalies
+
+
+class SpendTotals:
+    """Running total and per-category sums of Amount, added chunk by chunk or merged from shards."""
+
+    def __init__(self):
+        self.total_spend = 0.0
+        self.spend_by_category = pd.Series(dtype='float64')
+        self.has_spending_columns = None
+
+    def add(self, chunk):
+        if self.has_spending_columns is None:
+            self.has_spending_columns = 'Category' in chunk.columns and 'Amount' in chunk.columns
+        if self.has_spending_columns:
+            self.total_spend += chunk['Amount'].sum()
+            self.spend_by_category = self.spend_by_category.add(
+                chunk.groupby('Category')['Amount'].sum(), fill_value=0
+            )
+
+    def merge(self, other):
+        if other.has_spending_columns is None:
+            return
+        self.has_spending_columns = other.has_spending_columns
+        self.total_spend += other.total_spend
+        self.spend_by_category = self.spend_by_category.add(other.spend_by_category, fill_value=0)
+
+    def expenditure_analysis(self):
+        """The same shape perform_expenditure_analysis returns for the in-memory path."""
+        if not self.has_spending_columns:
+            return {
+                "error": "CSV must contain 'Category' and 'Amount' columns for analysis.",
+                "total_spend": 0,
+                "spend_by_category": {},
+                "savings_plan": {}
+            }
+        spend_by_category = self.spend_by_category.sort_index().round(2).to_dict()
+        return {
+            "total_spend": round(self.total_spend, 2),
+            "spend_by_category": spend_by_category,
+            "savings_plan": build_savings_plan(spend_by_category)
+        }
+
+
+def score_chunks(reader, kernel, writer=None):
+    """Scores the DataFrame chunks of a chunked pd.read_csv reader.
+
+    Each chunk is also passed to writer.append() when a columnar writer is
+    given. Returns (anomalies, totals): anomalies is a DataFrame (see
+    flag_anomalies) indexed by row position in the reader's input, totals a
+    SpendTotals.
+    """
+    anomaly_frames = []
+    num_rows = 0
+    totals = SpendTotals()
+    while True:
+        with span('csv_parse'):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+        chunk.index = pd.RangeIndex(num_rows, num_rows + len(chunk))
+        if num_rows == 0:
+            missing_cols = [col for col in REQUIRED_MODEL_COLUMNS if col not in chunk.columns]
+            if missing_cols:
+                raise MissingColumnsError(missing_cols)
+        num_rows += len(chunk)
+
+        with span('aggregation'):
+            totals.add(chunk)
+        anomaly_frames.append(flag_anomalies(chunk, kernel))
+        if writer is not None:
+            with span('store_write'):
+                writer.append(chunk)
+
+    anomalies = pd.concat(anomaly_frames) if anomaly_frames else pd.DataFrame({'score': pd.Series(dtype='float64')})
+    return anomalies, totals
+
+
+def analyze_csv_streaming(csv_path, kernel, chunk_rows=DEFAULT_CHUNK_ROWS, writer=None):
+    """Scores a saved CSV chunk by chunk and accumulates per-category totals.
+
+    Peak memory is bounded by chunk_rows (plus the flagged rows) rather than
+    the size of the file. Each chunk is also passed to writer.append() when a
+    columnar writer is given. Returns (anomalies, expenditure_analysis) in the
+    same shape as the in-memory path of /analyze: anomalies is a DataFrame
+    (see flag_anomalies) indexed by row position in the file.
+    """
+    anomalies, totals = score_chunks(pd.read_csv(csv_path, chunksize=chunk_rows), kernel, writer)
+    return anomalies, totals.expenditure_analysis()
+
+
+def row_hashes(df):
+    """A 64-bit content hash per row over the model columns and Category.
+
+    Values are compared as float64 and Category as text, so the same
+    transaction hashes the same whether Time was parsed as int or float.
+    The Class label is not part of a transaction's identity.
+    """
+    columns = {col: df[col].astype('float64') for col in REQUIRED_MODEL_COLUMNS}
+    if 'Category' in df.columns:
+        columns['Category'] = df['Category'].astype(object).where(df['Category'].notna(), '').astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def csv_row_hashes(csv_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """row_hashes() for every row of a saved CSV, read chunk by chunk."""
+    parts = [row_hashes(chunk) for chunk in pd.read_csv(csv_path, chunksize=chunk_rows)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype='uint64')
+
+
+def append_csv_rows(csv_path, df):
+    """Appends df's rows to a saved CSV in the order of its existing header."""
+    with open(csv_path, newline='') as f:
+        header = next(csv.reader(f), [])
+    # A file saved without a trailing newline would merge its last row with the first new one.
+    with open(csv_path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(-1, os.SEEK_END)
+        needs_newline = size > 0 and f.read(1) not in (b'\n', b'\r')
+    with open(csv_path, 'a', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        df.reindex(columns=header).to_csv(f, header=False, index=False)
+
+
+def expenditure_from_aggregates(aggregates):
+    """perform_expenditure_analysis() results, computed from a dataset's AggregateIndex.
+
+    O(categories) instead of a pass over every row, so appends can refresh
+    the totals and the savings plan without re-reading the history.
+    """
+    if not aggregates.categories:
+        return {
+            "error": "CSV must contain 'Category' and 'Amount' columns for analysis.",
+            "total_spend": 0,
+            "spend_by_category": {},
+            "savings_plan": {}
+        }
+    totals = aggregates.sums
+    present = aggregates.counts > 0
+    spend_by_category = {
+        name: round(float(totals[i]), 2)
+        for i, name in sorted(enumerate(aggregates.categories), key=lambda item: item[1]) if present[i]
+    }
+    return {
+        "total_spend": round(aggregates.total_spending(), 2),
+        "spend_by_category": spend_by_category,
+        "savings_plan": build_savings_plan(spend_by_category)
+    }
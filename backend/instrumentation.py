@@ -0,0 +1,218 @@
+"""Per-request timing spans, Prometheus-style histograms and an opt-in sampling profiler.
+
+Handlers and helpers wrap their stages in `with span('csv_parse'):`. The
+time spent in each stage is summed per request (a stage may run once per
+chunk), reported in the response's Server-Timing header and observed into
+the `request_stage_duration_seconds` histogram that GET /metrics exposes.
+Outside a request, span() only costs two clock reads.
+"""
+import bisect
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Seconds; the last bucket (+Inf) is implicit.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5)) / 1000
+PROFILE_MAX_ENTRIES = int(os.getenv('PROFILE_MAX_ENTRIES', 32))
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(s["counts"]), s["sum"]) for labels, s in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            lines.append(f'{self.name}{{{label_text}}} {value}')
+        return lines
+
+
+class RequestMetrics:
+    """The metrics /metrics exposes. Values are per process: with several
+    gunicorn workers, each one reports its own."""
+
+    def __init__(self):
+        self.requests = Counter('http_requests_total', 'Requests handled, by endpoint, method and status.',
+                                ('endpoint', 'method', 'status'))
+        self.duration = Histogram('http_request_duration_seconds', 'Wall time of each request.',
+                                  ('endpoint', 'method'))
+        self.stages = Histogram('request_stage_duration_seconds',
+                                'Time spent in each stage of a request, summed per request.',
+                                ('endpoint', 'stage'))
+
+    def record(self, trace, method, status):
+        self.requests.inc((trace.endpoint, method, str(status)))
+        self.duration.observe((trace.endpoint, method), trace.elapsed())
+        for stage, seconds in trace.stages.items():
+            self.stages.observe((trace.endpoint, stage), seconds)
+
+    def render(self):
+        lines = self.requests.render() + self.duration.render() + self.stages.render()
+        return '\n'.join(lines) + '\n'
+
+
+class RequestTrace:
+    """Stage timings of one request, in the order the stages first ran."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value (durations in milliseconds)."""
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ', '.join(parts)
+
+
+def begin_trace(endpoint):
+    """Starts timing a request on the current thread; returns (trace, token for end_trace)."""
+    trace = RequestTrace(endpoint)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """Adds the block's wall time to the current request's `stage` total."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, time.perf_counter() - start)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread.
+
+    folded() returns the samples in the collapsed-stack format ("root;...;leaf
+    count" per line) read by flamegraph.pl, speedscope and inferno. Time spent
+    in NumPy or pandas C code shows up in the Python frame that called it.
+    """
+
+    def __init__(self, thread_id=None, interval=PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = {}
+        self.num_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ';'.join(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+            self.num_samples += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+class ProfileStore:
+    """The most recent request profiles, by id, for GET /profiles/<id>."""
+
+    def __init__(self, max_entries=PROFILE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, folded):
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._profiles[profile_id] = folded
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
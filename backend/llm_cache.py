@@ -0,0 +1,172 @@
+"""Response cache with single-flight coalescing for Groq chat completions."""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1024))
+DEFAULT_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', 6 * 60 * 60))
+
+
+def normalize_prompt_text(text):
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return ' '.join(str(text).lower().split()).rstrip('?!. ')
+
+
+def make_cache_key(text, model, temperature, context=''):
+    """Cache key for a normalized query/scenario plus model settings and data context."""
+    raw = '\x1f'.join([normalize_prompt_text(text), model, f'{temperature:.3f}', context])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LLMResponseCache:
+    """In-memory LRU with TTL, optionally backed by a SQLite file.
+
+    Identical concurrent misses are coalesced: the first caller performs
+    the upstream request and the others wait for its result.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, sqlite_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            # Expired rows would otherwise stay in the file forever.
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        return cls(sqlite_path=os.getenv('LLM_CACHE_SQLITE_PATH') or None)
+
+    def _get_local(self, key, now):
+        # Caller holds self._lock.
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] > now:
+                self._put_memory(key, row[0], row[1])
+                self.stats["disk_hits"] += 1
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+        return None
+
+    def _put_memory(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, calling compute() at most once per miss."""
+        now = time.time()
+        with self._lock:
+            value = self._get_local(key, now)
+            if value is not None:
+                self.stats["hits"] += 1
+                return value
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    expires_at = time.time() + self.ttl_seconds
+                    self._put_memory(key, flight.value, expires_at)
+                    if self._db is not None:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                            (key, flight.value, expires_at),
+                        )
+                        self._db.commit()
+                del self._in_flight[key]
+            flight.done.set()
+        return flight.value
+
+    def snapshot(self):
+        """Counters plus current size, for the /llm-cache/stats endpoint."""
+        with self._lock:
+            # disk_hits are a subset of hits.
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            served = lookups - self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cached_chat_completion(client, cache, prompt, model, temperature, key_text, context='', validate=None,
+                           executor=None):
+    """Returns the completion text for prompt, served from cache when possible.
+
+    client is anything with a Groq-style chat.completions.create(), so a
+    local fake can stand in for the real SDK. If validate is given it is
+    called on fresh responses and anything it raises on is not cached.
+    Upstream calls go through executor.run() when an LLMExecutor is given.
+    """
+    def request():
+        return client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=model,
+            temperature=temperature,
+        )
+
+    def compute():
+        chat_completion = executor.run(request) if executor is not None else request()
+        response_text = chat_completion.choices[0].message.content.strip()
+        if validate is not None:
+            validate(response_text)
+        return response_text
+
+    key = make_cache_key(key_text, model, temperature, context)
+    return cache.get_or_compute(key, compute)
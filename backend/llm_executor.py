@@ -0,0 +1,65 @@
+"""Bounded thread pool for blocking LLM calls, with timeouts and backpressure."""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+DEFAULT_MAX_PENDING = int(os.getenv('LLM_MAX_PENDING', 64))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', 30))
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when the LLM queue is full; endpoints answer 503."""
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call does not finish within the timeout; endpoints answer 504."""
+
+
+class LLMExecutor:
+    """Runs LLM calls on at most max_concurrency threads.
+
+    At most max_pending calls may be running or queued at once; further
+    calls are rejected immediately instead of piling up behind a slow
+    upstream. Callers wait at most timeout seconds for their result.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_pending=DEFAULT_MAX_PENDING,
+                 timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "rejected": 0, "timed_out": 0, "pending": 0}
+
+    def _release(self, _future):
+        self._slots.release()
+        with self._lock:
+            self.stats["pending"] -= 1
+
+    def run(self, fn, *args, **kwargs):
+        """Runs fn in the pool and returns its result, re-raising its exceptions."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise LLMOverloadedError("Too many LLM requests in flight")
+        with self._lock:
+            self.stats["submitted"] += 1
+            self.stats["pending"] += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.stats["timed_out"] += 1
+            raise LLMTimeoutError(f"LLM call did not finish within {self.timeout:.0f}s")
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "max_pending": self.max_pending}
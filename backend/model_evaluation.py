@@ -0,0 +1,175 @@
+"""Side-by-side evaluation of the served model and candidate models on labeled data.
+
+A candidate is an asset directory under ml_assets/candidates/<name>/, as
+written by `python train_model.py --output-dir ml_assets/candidates/<name>`.
+Each model compiles to a linear ScoringKernel over the same raw columns, so
+k models score a dataset with one (n, 30) @ (30, k) product. The curves of
+all k models come from one sort and one cumulative sum over (n, k).
+
+For each model, an evaluation holds:
+- the confusion counts at the serving threshold (P(fraud) > 0.5) and the
+  metrics derived from them;
+- ROC AUC and average precision;
+- ROC and precision-recall curves, downsampled to EVAL_CURVE_POINTS
+  thresholds.
+
+Evaluations are cached per (model version, dataset key). A replay that
+was already scored comes back without parsing or scoring anything.
+"""
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from confusion_report import derived_metrics
+from model_registry import artifact_paths
+from scoring_kernel import load_or_compile_kernel, sigmoid, source_digest
+
+CANDIDATES_DIR = 'candidates'
+EVAL_CURVE_POINTS = int(os.getenv('EVAL_CURVE_POINTS', 101))
+EVAL_CACHE_MAX_ENTRIES = int(os.getenv('EVAL_CACHE_MAX_ENTRIES', 256))
+
+
+class CandidateModel:
+    """A registered candidate: its name, version (as ModelBundle.version) and scoring kernel."""
+
+    def __init__(self, name, version, kernel):
+        self.name = name
+        self.version = version
+        self.kernel = kernel
+
+
+class ModelCatalog:
+    """Candidate models found in ml_assets/candidates/, reloaded when their files change."""
+
+    def __init__(self, assets_dir):
+        self.candidates_dir = os.path.join(assets_dir, CANDIDATES_DIR)
+        self._loaded = {}  # name -> (signature, CandidateModel)
+        self._errors = {}  # name -> last load error, logged once
+        self._lock = threading.Lock()
+
+    def _signature(self, candidate_dir):
+        signature = []
+        for path in artifact_paths(candidate_dir)[:2]:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def candidates(self):
+        """Every candidate with a readable model and preprocessing file, by name."""
+        if not os.path.isdir(self.candidates_dir):
+            return []
+        models = []
+        with self._lock:
+            for name in sorted(os.listdir(self.candidates_dir)):
+                candidate_dir = os.path.join(self.candidates_dir, name)
+                try:
+                    signature = self._signature(candidate_dir)
+                    loaded = self._loaded.get(name)
+                    if loaded is None or loaded[0] != signature:
+                        digest = source_digest(candidate_dir)
+                        model = CandidateModel(name, digest[:12], load_or_compile_kernel(candidate_dir, digest))
+                        loaded = self._loaded[name] = (signature, model)
+                        print(f"[EVAL] Loaded candidate model {name} ({model.version})")
+                    self._errors.pop(name, None)
+                except Exception as e:
+                    if self._errors.get(name) != str(e):
+                        self._errors[name] = str(e)
+                        print(f"[EVAL] Skipping candidate {name}: {e}")
+                    continue
+                models.append(loaded[1])
+        return models
+
+
+def _curve_points(num_points, max_points):
+    """Indices of at most max_points evenly spaced points, always including both ends."""
+    return np.unique(np.linspace(0, num_points - 1, min(num_points, max_points)).round().astype('int64'))
+
+
+def evaluate_margins(margins, labels, curve_points=EVAL_CURVE_POINTS):
+    """Evaluations of k models from their (n, k) decision values on n labeled rows.
+
+    Returns one dict per model with the counts, derived metrics, roc_auc,
+    average_precision and the downsampled "roc" and "pr" curves. AUC and
+    average precision are None when the labels hold a single class.
+    """
+    margins = np.asarray(margins, dtype='float32')
+    labels = np.asarray(labels, dtype='int64')
+    num_rows, num_models = margins.shape
+    positives = int(labels.sum())
+    negatives = num_rows - positives
+
+    predicted = (margins > 0).astype('int64')
+    # All k confusion matrices from one bincount: model j's cells are 4j..4j+3.
+    cells = labels[:, None] * 2 + predicted + 4 * np.arange(num_models)
+    counts = np.bincount(cells.ravel(), minlength=4 * num_models).reshape(num_models, 2, 2)
+
+    # Rows by descending score; running true/false positives at every cut.
+    # The order within tied scores does not matter (ties are cut together
+    # below), so the faster unstable sort is used.
+    order = np.argsort(-margins, axis=0)
+    sorted_margins = np.take_along_axis(margins, order, axis=0)
+    true_positives = np.cumsum(labels[order], axis=0)
+    false_positives = np.arange(1, num_rows + 1)[:, None] - true_positives
+
+    results = []
+    for j in range(num_models):
+        result = {"matrix": counts[j].tolist(), **derived_metrics(counts[j]),
+                  "roc_auc": None, "average_precision": None, "roc": None, "pr": None}
+        if num_rows and positives and negatives:
+            # One point per distinct score: the last row of each run of ties.
+            cuts = np.append(np.flatnonzero(np.diff(sorted_margins[:, j])), num_rows - 1)
+            tps = true_positives[cuts, j].astype('float64')
+            fps = false_positives[cuts, j].astype('float64')
+            tpr = np.concatenate([[0.0], tps / positives])
+            fpr = np.concatenate([[0.0], fps / negatives])
+            precision = tps / (tps + fps)
+            recall = tps / positives
+            thresholds = sigmoid(sorted_margins[cuts, j].astype('float64'))
+            result["roc_auc"] = float(np.trapezoid(tpr, fpr))
+            result["average_precision"] = float(np.sum(np.diff(np.concatenate([[0.0], recall])) * precision))
+            roc = _curve_points(len(tpr), curve_points)
+            pr = _curve_points(len(recall), curve_points)
+            result["roc"] = {"fpr": np.round(fpr[roc], 6).tolist(), "tpr": np.round(tpr[roc], 6).tolist()}
+            result["pr"] = {"recall": np.round(recall[pr], 6).tolist(), "precision": np.round(precision[pr], 6).tolist(),
+                            "threshold": np.round(thresholds[pr], 6).tolist()}
+        results.append(result)
+    return results
+
+
+def evaluate_models(df, labels, kernels, curve_points=EVAL_CURVE_POINTS):
+    """Scores df with every kernel in one product and evaluates each (see evaluate_margins)."""
+    columns = kernels[0].columns
+    if any(kernel.columns != columns for kernel in kernels):
+        raise ValueError("All models must score the same raw columns")
+    features = kernels[0].as_matrix(df)
+    weights = np.stack([kernel.weights for kernel in kernels], axis=1)
+    biases = np.array([kernel.bias for kernel in kernels], dtype='float32')
+    return evaluate_margins(features @ weights + biases, labels, curve_points)
+
+
+class EvaluationCache:
+    """LRU of evaluations keyed by (model version, dataset key)."""
+
+    def __init__(self, max_entries=EVAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, version, dataset_key):
+        with self._lock:
+            entry = self._entries.get((version, dataset_key))
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end((version, dataset_key))
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, version, dataset_key, entry):
+        with self._lock:
+            self._entries[(version, dataset_key)] = entry
+            self._entries.move_to_end((version, dataset_key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
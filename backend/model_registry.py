@@ -0,0 +1,177 @@
+"""Loads the fraud model artifacts once and hot-swaps them when ml_assets/ changes."""
+import os
+import threading
+import time
+from preprocessing import preprocessing_path
+from scoring_kernel import MODEL_FILE, load_or_compile_kernel, source_digest
+
+METRICS_FILE = 'model_metrics.pkl'
+MODEL_RELOAD_INTERVAL_SECONDS = float(os.getenv('MODEL_RELOAD_INTERVAL_SECONDS', 5))
+# How long a request waits for the initial background load before a 503.
+MODEL_READY_TIMEOUT_SECONDS = float(os.getenv('MODEL_READY_TIMEOUT_SECONDS', 30))
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised while the artifacts are still loading or failed to load; endpoints answer 503."""
+
+
+class ModelBundle:
+    """One immutable, fully loaded set of artifacts. Endpoints hold a reference
+    for the duration of a request, so a swap never mixes two versions."""
+
+    def __init__(self, metrics, kernel, version, loaded_at, load_seconds):
+        self.metrics = metrics
+        self.kernel = kernel
+        self.version = version
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
+def artifact_paths(assets_dir):
+    """Model, preprocessing and metrics files, in that order."""
+    return [os.path.join(assets_dir, MODEL_FILE), preprocessing_path(assets_dir),
+            os.path.join(assets_dir, METRICS_FILE)]
+
+
+def artifact_signature(assets_dir):
+    """(path, mtime_ns, size) of every artifact; any change means a new model was written."""
+    signature = []
+    for path in artifact_paths(assets_dir):
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def load_bundle(assets_dir):
+    """Loads the metrics and scoring kernel. Raises if any file is missing or unreadable.
+
+    The model and preprocessing files are only hashed, once, for the version
+    and to check the stored kernel is current; the model is unpickled (importing scikit-learn) only when the kernel must be
+    recompiled.
+    """
+    import joblib
+    start = time.perf_counter()
+    digest = source_digest(assets_dir)
+
+    metrics = joblib.load(os.path.join(assets_dir, METRICS_FILE))
+    # Convert numpy types to Python native types for JSON serialization
+    metrics = {key: value.item() if hasattr(value, 'item') else value for key, value in metrics.items()}
+    kernel = load_or_compile_kernel(assets_dir, digest)
+    return ModelBundle(metrics, kernel, version=digest[:12],
+                       loaded_at=time.time(), load_seconds=time.perf_counter() - start)
+
+
+class ModelRegistry:
+    """Holds the active ModelBundle and replaces it when the artifacts change.
+
+    The first load runs on a background thread so the server answers
+    (readiness checks included) while the artifacts load. A new bundle is
+    loaded completely before it is published with a single
+    reference assignment, so readers see either the old or the new version.
+    A change is only picked up once the files have stopped changing for one
+    poll interval, so a half-written retrain is never loaded; a bundle that
+    fails to load keeps the previous version active. While no bundle has
+    loaded, every poll retries the load.
+    """
+
+    def __init__(self, assets_dir, poll_interval=MODEL_RELOAD_INTERVAL_SECONDS):
+        self.assets_dir = assets_dir
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # Fail fast on missing files; the actual load happens in start().
+        self._signature = artifact_signature(assets_dir)
+        self._bundle = None
+        self._ready = threading.Event()
+        self._pending_signature = None
+        self._watcher = None
+        self.reloads = 0
+        self.last_error = None
+
+    def start(self, background=True):
+        """Loads the artifacts, then polls ml_assets/ for changes on a daemon thread.
+
+        With background=False the initial load finishes before this returns.
+        A poll_interval of 0 disables watching.
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._run, name='model-registry', daemon=True)
+        if not background:
+            self._initial_load()
+        self._watcher.start()
+
+    def _initial_load(self):
+        try:
+            self._bundle = load_bundle(self.assets_dir)
+            print(f"[MODEL] Loaded model {self._bundle.version} in {self._bundle.load_seconds * 1000:.0f} ms")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[MODEL] Failed to load artifacts: {e}")
+        finally:
+            self._ready.set()
+
+    def _run(self):
+        if not self._ready.is_set():
+            self._initial_load()
+        while self.poll_interval > 0:
+            time.sleep(self.poll_interval)
+            self.reload_if_changed()
+
+    def is_ready(self):
+        return self._bundle is not None
+
+    def current(self, timeout=MODEL_READY_TIMEOUT_SECONDS):
+        """The active bundle, waiting up to timeout seconds for the initial load."""
+        bundle = self._bundle
+        if bundle is not None:
+            return bundle
+        self._ready.wait(timeout)
+        bundle = self._bundle
+        if bundle is None:
+            raise ModelNotReadyError(self.last_error or "Model artifacts are still loading")
+        return bundle
+
+    def reload_if_changed(self):
+        """Swaps in the artifacts on disk if they changed and have settled. Returns True on swap."""
+        with self._lock:
+            try:
+                signature = artifact_signature(self.assets_dir)
+            except OSError as e:
+                self.last_error = str(e)
+                return False
+            # Until a bundle has loaded, every poll retries, changed files or not:
+            # the first load may have failed on a transient error.
+            if self._bundle is not None:
+                if signature == self._signature:
+                    self._pending_signature = None
+                    return False
+                if signature != self._pending_signature:
+                    # Seen for the first time: wait one more poll for writes to finish.
+                    self._pending_signature = signature
+                    return False
+            try:
+                bundle = load_bundle(self.assets_dir)
+            except Exception as e:
+                self.last_error = str(e)
+                active = self._bundle.version if self._bundle else 'none'
+                print(f"[MODEL] Failed to load new artifacts, keeping {active}: {e}")
+                return False
+            self._signature = signature
+            self._pending_signature = None
+            self._bundle = bundle
+            self.reloads += 1
+            self.last_error = None
+            print(f"[MODEL] Activated model {bundle.version} (loaded in {bundle.load_seconds * 1000:.0f} ms)")
+            return True
+
+    def snapshot(self):
+        bundle = self._bundle
+        return {
+            "ready": bundle is not None,
+            "version": bundle.version if bundle else None,
+            "loaded_at": bundle.loaded_at if bundle else None,
+            "load_seconds": bundle.load_seconds if bundle else None,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "poll_interval_seconds": self.poll_interval,
+        }
@@ -0,0 +1,142 @@
+"""Sharded, multi-process analysis of large saved uploads.
+
+CSV parsing dominates /analyze on big files and runs on one core. For
+uploads above PARALLEL_SCORING_MIN_BYTES the saved CSV is split into
+newline-aligned byte ranges. A process pool then parses, scores and
+aggregates each range. Workers read their range straight from the file on
+disk and write the parsed columns to a per-shard columnar store; the
+parent memory-maps those stores and appends them in order. No DataFrame
+crosses a process boundary except each shard's flagged rows.
+
+Byte-range splitting assumes no quoted field contains a newline, which
+holds for the transaction schema this app accepts.
+"""
+import csv
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from dataset_store import ColumnarWriter
+from ingest import DEFAULT_CHUNK_ROWS, REQUIRED_MODEL_COLUMNS, MissingColumnsError, SpendTotals, score_chunks
+from instrumentation import span
+
+# Worker processes; 1 (or a single-core machine) keeps every upload on the serial path.
+SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', os.cpu_count() or 1))
+# Streaming uploads at least this large are sharded across the workers.
+PARALLEL_SCORING_MIN_BYTES = int(os.getenv('PARALLEL_SCORING_MIN_BYTES', 128 * 1024 * 1024))
+# Bytes of CSV per shard; a worker holds about this much input at a time.
+SCORING_SHARD_BYTES = int(os.getenv('SCORING_SHARD_BYTES', 32 * 1024 * 1024))
+# How workers are started. The server runs request threads, and forking a
+# multi-threaded process can copy a lock some other thread holds, so workers
+# come from a forkserver (or spawn) instead. Either re-imports the main
+# module, so scripts that use the pool need an `if __name__ == '__main__'` guard.
+SCORING_START_METHOD = os.getenv(
+    'SCORING_START_METHOD', 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def csv_shard_ranges(csv_path, shard_bytes):
+    """Returns (header, [(start, stop), ...]): byte ranges of whole data lines, in file order."""
+    with open(csv_path, 'rb') as f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode('utf-8-sig')]))
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        ranges = []
+        while start < size:
+            f.seek(min(start + shard_bytes, size))
+            f.readline()  # move the boundary to the start of the next line
+            stop = min(f.tell(), size)
+            ranges.append((start, stop))
+            start = stop
+    return header, ranges
+
+
+def score_csv_shard(csv_path, start, stop, header, kernel, shard_dir, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Worker: parses, scores and stores one byte range of the CSV.
+
+    Returns (num_rows, anomalies, totals); anomaly positions are relative to
+    the start of the shard.
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    reader = pd.read_csv(io.BytesIO(data), names=header, header=None, chunksize=chunk_rows)
+    writer = ColumnarWriter(shard_dir)
+    anomalies, totals = score_chunks(reader, kernel, writer)
+    writer.close()
+    return writer.num_rows, anomalies, totals
+
+
+class ScoringExecutor:
+    """Runs score_csv_shard over a shared process pool and merges the shards in order."""
+
+    def __init__(self, workers=SCORING_WORKERS, min_bytes=PARALLEL_SCORING_MIN_BYTES,
+                 shard_bytes=SCORING_SHARD_BYTES):
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self.shard_bytes = shard_bytes
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def should_parallelize(self, upload_size):
+        return self.workers > 1 and upload_size >= self.min_bytes
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Started on first use and reused. Workers only run score_csv_shard,
+                # so they need nothing from the server beyond this module, which
+                # the forkserver imports once before forking each worker.
+                context = multiprocessing.get_context(SCORING_START_METHOD)
+                if SCORING_START_METHOD == 'forkserver':
+                    context.set_forkserver_preload([__name__])
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def analyze_csv(self, csv_path, kernel, writer=None):
+        """Sharded analyze_csv_streaming(): the same (anomalies, expenditure_analysis) result.
+
+        Shard stores are appended to writer when one is given.
+        """
+        header, ranges = csv_shard_ranges(csv_path, self.shard_bytes)
+        missing_cols = [col for col in REQUIRED_MODEL_COLUMNS if col not in header]
+        if missing_cols:
+            raise MissingColumnsError(missing_cols)
+
+        work_dir = tempfile.mkdtemp(prefix='.shards-', dir=os.path.dirname(os.path.abspath(csv_path)))
+        try:
+            with span('parallel_score'):
+                pool = self._get_pool()
+                futures = [
+                    pool.submit(score_csv_shard, csv_path, start, stop, header, kernel,
+                                os.path.join(work_dir, f'{index:05d}'))
+                    for index, (start, stop) in enumerate(ranges)
+                ]
+                results = [future.result() for future in futures]
+
+            anomaly_frames = []
+            totals = SpendTotals()
+            first_row = 0
+            for index, (num_rows, anomalies, shard_totals) in enumerate(results):
+                anomalies.index = anomalies.index + first_row
+                anomaly_frames.append(anomalies)
+                totals.merge(shard_totals)
+                if writer is not None:
+                    with span('store_write'):
+                        writer.append_store(os.path.join(work_dir, f'{index:05d}'))
+                first_row += num_rows
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        anomalies = pd.concat(anomaly_frames) if anomaly_frames else pd.DataFrame({'score': pd.Series(dtype='float64')})
+        return anomalies, totals.expenditure_analysis()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
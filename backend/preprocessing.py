@@ -0,0 +1,118 @@
+"""Per-column preprocessing artifact shared by training and serving.
+
+ml_assets/preprocessing.json records, for every model feature in the order
+the model was trained on, the raw CSV column it comes from and the mean and
+scale subtracted/divided from it. train_model.py fits and saves it; the
+scoring kernel folds it into the model's weights.
+"""
+import json
+import os
+import numpy as np
+from scoring import RAW_FEATURE_COLUMNS
+
+PREPROCESSING_FILE = 'preprocessing.json'
+LEGACY_SCALER_FILE = 'scaler.pkl'
+FORMAT_VERSION = 1
+# Model features in training order, and the raw column each is computed from.
+FEATURE_SOURCES = {**{f'V{i}': f'V{i}' for i in range(1, 29)}, 'scaled_amount': 'Amount', 'scaled_time': 'Time'}
+FEATURE_NAMES = list(FEATURE_SOURCES)
+SCALED_FEATURES = ('scaled_amount', 'scaled_time')
+
+
+class Preprocessor:
+    """Maps raw (n, 30) rows in RAW_FEATURE_COLUMNS order to model features."""
+
+    def __init__(self, mean, scale, feature_names=FEATURE_NAMES, input_columns=RAW_FEATURE_COLUMNS):
+        self.feature_names = list(feature_names)
+        self.input_columns = list(input_columns)
+        self.mean = np.asarray(mean, dtype='float64')
+        self.scale = np.asarray(scale, dtype='float64')
+        self.source_index = np.array([self.input_columns.index(FEATURE_SOURCES[name])
+                                      for name in self.feature_names])
+        self._mean32 = self.mean.astype('float32')
+        self._scale32 = self.scale.astype('float32')
+
+    @classmethod
+    def from_column_stats(cls, stats, feature_names=FEATURE_NAMES):
+        """stats maps each scaled feature to (mean, scale); other features pass through."""
+        mean = [stats[name][0] if name in stats else 0.0 for name in feature_names]
+        scale = [stats[name][1] if name in stats else 1.0 for name in feature_names]
+        return cls(mean, scale, feature_names)
+
+    @classmethod
+    def fit(cls, raw, feature_names=FEATURE_NAMES):
+        """Fits each scaled feature on its own raw column (population std, like StandardScaler)."""
+        raw = np.asarray(raw)
+        stats = {}
+        for name in SCALED_FEATURES:
+            column = raw[:, RAW_FEATURE_COLUMNS.index(FEATURE_SOURCES[name])].astype('float64')
+            std = float(column.std())
+            stats[name] = (float(column.mean()), std if std > 0 else 1.0)
+        return cls.from_column_stats(stats, feature_names)
+
+    def transform(self, raw, out=None):
+        """Returns float32 features in feature_names order.
+
+        Columns are gathered into out (allocated if not given; pass a buffer
+        to reuse it across chunks) and scaled there in place.
+        """
+        raw = np.asarray(raw)
+        if out is None:
+            out = np.empty((len(raw), len(self.feature_names)), dtype='float32')
+        for j, source in enumerate(self.source_index):
+            out[:, j] = raw[:, source]
+        out -= self._mean32
+        out /= self._scale32
+        return out
+
+    def to_json(self):
+        return {
+            "version": FORMAT_VERSION,
+            "input_columns": self.input_columns,
+            "features": [
+                {"name": name, "source": FEATURE_SOURCES[name], "mean": float(mean), "scale": float(scale)}
+                for name, mean, scale in zip(self.feature_names, self.mean, self.scale)
+            ],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        features = data["features"]
+        return cls([f["mean"] for f in features], [f["scale"] for f in features],
+                   [f["name"] for f in features], data["input_columns"])
+
+    def save(self, path):
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+
+def preprocessing_path(assets_dir):
+    """preprocessing.json, or the legacy scaler.pkl for asset directories trained before it existed."""
+    path = os.path.join(assets_dir, PREPROCESSING_FILE)
+    if os.path.exists(path) or not os.path.exists(os.path.join(assets_dir, LEGACY_SCALER_FILE)):
+        return path
+    return os.path.join(assets_dir, LEGACY_SCALER_FILE)
+
+
+def load_preprocessor(assets_dir):
+    """Loads preprocessing.json, falling back to a legacy scaler.pkl.
+
+    A legacy scaler.pkl only holds the statistics of the last column it was
+    fitted on (Time), and the old serving code applied it to both Amount and
+    Time; the fallback reproduces that so old asset directories keep scoring
+    as they did. Retrain to get correct per-column scaling.
+    """
+    path = preprocessing_path(assets_dir)
+    if path.endswith('.json'):
+        return Preprocessor.load(path)
+    import joblib
+    print(f"⚠️  {PREPROCESSING_FILE} not found in '{assets_dir}'; using legacy {LEGACY_SCALER_FILE} for both Amount and Time.")
+    scaler = joblib.load(path)
+    stats = (float(np.ravel(scaler.mean_)[0]), float(np.ravel(scaler.scale_)[0]))
+    return Preprocessor.from_column_stats({name: stats for name in SCALED_FEATURES})
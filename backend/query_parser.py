@@ -0,0 +1,130 @@
+"""Deterministic rule-based parser for common natural-language finance queries.
+
+Handles the phrasings that map cleanly onto the five query types understood
+by analyze_query_with_data, returning the same JSON schema as the Groq
+parser together with a confidence score. Low-confidence queries should
+still be sent to the LLM.
+"""
+import difflib
+import os
+import re
+from functools import lru_cache
+from generate_data import CATEGORIES
+
+MIN_CONFIDENCE = float(os.getenv('LOCAL_PARSER_MIN_CONFIDENCE', 0.8))
+
+# Words that point at a known category without naming it.
+CATEGORY_SYNONYMS = {
+    'shop': 'Shopping', 'shops': 'Shopping', 'clothes': 'Shopping', 'amazon': 'Shopping',
+    'dine': 'Dining', 'restaurant': 'Dining', 'restaurants': 'Dining', 'eating': 'Dining', 'takeout': 'Dining',
+    'grocery': 'Groceries', 'supermarket': 'Groceries',
+    'flight': 'Travel', 'flights': 'Travel', 'hotel': 'Travel', 'hotels': 'Travel', 'trip': 'Travel', 'trips': 'Travel',
+    'utility': 'Utilities', 'bills': 'Utilities', 'electricity': 'Utilities', 'internet': 'Utilities',
+    'movies': 'Entertainment', 'movie': 'Entertainment', 'streaming': 'Entertainment', 'concerts': 'Entertainment',
+    'medical': 'Health', 'doctor': 'Health', 'pharmacy': 'Health', 'gym': 'Health',
+    'service': 'Services', 'subscriptions': 'Services',
+}
+_CATEGORY_WORDS = {name.lower(): name for name in CATEGORIES}
+_FUZZY_VOCABULARY = list(_CATEGORY_WORDS) + list(CATEGORY_SYNONYMS)
+
+_TIME_PERIODS = [
+    ('last_month', re.compile(r'\b(last|previous|past) month\b')),
+    ('this_month', re.compile(r'\b(this|current) month\b')),
+    ('last_week', re.compile(r'\b(last|previous|past) week\b')),
+    ('this_week', re.compile(r'\b(this|current) week\b')),
+    ('all_time', re.compile(r'\b(all[- ]time|ever|overall|in total)\b')),
+]
+_ANOMALY = re.compile(r'\b(anomal\w*|fraud\w*|suspicious|unusual|flagged)\b')
+_SAVINGS = re.compile(r'\b(sav(e|es|ed|ing|ings)|budget\w*|cut back|reduce)\b')
+_RANKING = re.compile(r'\b(which|most|least|biggest|largest|top|highest|lowest)\b')
+_COMPARISON = re.compile(r'\b(vs\.?|versus|compared?|comparison|than|against)\b')
+_TOTAL = re.compile(r'\b(total|overall|altogether|in all|sum)\b')
+_SPENDING = re.compile(r'\b(spen[dt]\w*|cost\w*|paid|pay\w*|expens\w*|much)\b')
+_WORD = re.compile(r"[a-z]+")
+# "spend on X" / "for X": a target that is not a known category needs the LLM.
+_TARGET = re.compile(r'\b(?:on|for|at)\s+(?:my\s+|the\s+)?([a-z]+)')
+_NON_TARGETS = {'this', 'last', 'previous', 'past', 'current', 'all', 'average', 'everything', 'things', 'stuff', 'me', 'it', 'total'}
+# Words a plain "how much did I spend" question is made of; any other word may
+# name something (coffee, rent) that a total would silently drop.
+_FILLER_WORDS = {'how', 'what', 'whats', 'did', 'do', 'does', 'have', 'has', 'had', 'was', 'were', 'is', 'are', 'am',
+                 'been', 'i', 've', 'm', 's', 'my', 'me', 'we', 'our', 'us', 'the', 'a', 'an', 'in', 'on', 'for', 'so',
+                 'far', 'of', 'to', 'money', 'amount', 'week', 'month', 'please', 'tell', 'show', 'up', 'out'}
+
+
+@lru_cache(maxsize=4096)
+def _fuzzy_category(word):
+    # Catches typos such as "dinning"; memoized because vocabularies repeat.
+    match = difflib.get_close_matches(word, _FUZZY_VOCABULARY, n=1, cutoff=0.85)
+    if not match:
+        return None
+    return (_CATEGORY_WORDS.get(match[0]) or CATEGORY_SYNONYMS[match[0]]).lower()
+
+
+def _find_category(text):
+    """Returns (lowercase category, exact) for the first category-like word."""
+    words = _WORD.findall(text)
+    for word in words:
+        if word in _CATEGORY_WORDS:
+            return word, True
+        if word in CATEGORY_SYNONYMS:
+            return CATEGORY_SYNONYMS[word].lower(), True
+    for word in words:
+        category = _fuzzy_category(word) if len(word) >= 4 else None
+        if category:
+            return category, False
+    return None, False
+
+
+def _unrecognized_words(text):
+    """Words left after removing spending, total and time-period words and filler."""
+    for pattern in [_SPENDING, _TOTAL] + [pattern for _, pattern in _TIME_PERIODS]:
+        text = pattern.sub(' ', text)
+    return [word for word in _WORD.findall(text) if word not in _FILLER_WORDS]
+
+
+def parse_query_locally(query):
+    """Parses query without the LLM.
+
+    Returns (requirements, confidence) where requirements follows the same
+    schema as parse_natural_language_query and confidence is in [0, 1].
+    """
+    text = ' '.join(str(query).lower().split())
+    periods = [name for name, pattern in _TIME_PERIODS if pattern.search(text)]
+    category, exact_category = _find_category(text)
+    result = {"query_type": None, "category": category, "time_period": None, "comparison": None}
+    confidence = 0.9 if exact_category else 0.8
+
+    if _ANOMALY.search(text):
+        result.update(query_type='anomaly_count', category=None)
+        confidence = 0.95
+    elif _RANKING.search(text):
+        # Rankings and "biggest purchase" questions are left to the LLM.
+        return result, 0.0
+    elif _SAVINGS.search(text):
+        result["query_type"] = 'savings_analysis'
+        confidence = 0.85
+    elif category and ({'last_month', 'this_month'} <= set(periods) or
+                       (_COMPARISON.search(text) and 'month' in text)):
+        result.update(query_type='spending_comparison', comparison='month_over_month')
+    elif category and _COMPARISON.search(text):
+        # Comparing categories against each other is left to the LLM.
+        result.update(query_type='spending_comparison', comparison='category_comparison')
+        confidence = 0.5
+    elif category and _SPENDING.search(text):
+        result["query_type"] = 'category_spending'
+    elif not category and (_TOTAL.search(text) or _SPENDING.search(text)):
+        result["query_type"] = 'total_spending'
+        confidence = 0.9 if _TOTAL.search(text) else 0.8
+        target = _TARGET.search(text)
+        if target and target.group(1) not in _NON_TARGETS:
+            confidence = 0.3
+        elif _unrecognized_words(text):
+            confidence = 0.5
+    else:
+        return result, 0.0
+
+    if result["comparison"] is None and len(periods) == 1:
+        result["time_period"] = periods[0]
+    elif len(periods) > 1 and result["comparison"] is None:
+        confidence = min(confidence, 0.5)
+    return result, confidence
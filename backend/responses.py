@@ -0,0 +1,146 @@
+"""JSON encoding for large tabular responses (anomaly lists).
+
+Rows can be returned as the legacy list of records, as one array per
+column ("columnar", much cheaper to encode and to parse), or streamed as
+NDJSON. `fields` projects the output onto a subset of columns, and
+offset/limit page through it. orjson is used when it is installed; the
+standard-library encoder is the fallback.
+"""
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional speed-up (pip install orjson)
+    orjson = None
+
+ANOMALY_FORMATS = ('records', 'columnar', 'ndjson')
+# Page size for GET /datasets/<id>/anomalies when no limit is given, and the largest limit accepted.
+DEFAULT_PAGE_SIZE = int(os.getenv('ANOMALY_PAGE_SIZE', 1000))
+MAX_PAGE_SIZE = int(os.getenv('ANOMALY_MAX_PAGE_SIZE', 100000))
+NDJSON_BLOCK_ROWS = 10000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Columns added to every anomaly row besides the uploaded ones.
+ANOMALY_FIELDS = ('is_anomaly', 'score')
+
+
+class ResponseFormatError(ValueError):
+    """Raised for an unknown format or field, or an invalid offset/limit."""
+
+
+def _default(obj):
+    """Encodes the NumPy and pandas values the standard library rejects."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=False, default=None):
+    """Serializes obj to UTF-8 JSON bytes; NumPy scalars and arrays are encoded natively.
+
+    default, if given, handles any other type the encoder rejects (e.g. Flask's provider default).
+    """
+    def encode(value):
+        try:
+            return _default(value)
+        except TypeError:
+            if default is None:
+                raise
+            return default(value)
+
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=encode, option=option)
+    return json.dumps(obj, default=encode, sort_keys=sort_keys, separators=(',', ':')).encode()
+
+
+def parse_options(args, default_format='records', default_limit=None, columns=None):
+    """Reads format, fields, offset and limit from request args. Returns (format, fields, offset, limit).
+
+    When the data's columns are given, fields must name one of them or an
+    ANOMALY_FIELDS column, so a bad request fails before anything is stored.
+    """
+    fmt = args.get('format', default_format)
+    if fmt not in ANOMALY_FORMATS:
+        raise ResponseFormatError(f"format must be one of {', '.join(ANOMALY_FORMATS)}")
+    fields = [name.strip() for name in args.get('fields', '').split(',') if name.strip()] or None
+    if fields and columns is not None:
+        available = list(columns) + [name for name in ANOMALY_FIELDS if name not in columns]
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ResponseFormatError(f"Unknown fields {unknown}; available: {available}")
+    try:
+        offset = int(args.get('offset', 0))
+        limit = args.get('limit', default_limit)
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        raise ResponseFormatError("offset and limit must be integers")
+    if offset < 0 or (limit is not None and not 0 <= limit <= MAX_PAGE_SIZE):
+        raise ResponseFormatError(f"offset must be >= 0 and limit between 0 and {MAX_PAGE_SIZE}")
+    return fmt, fields, offset, limit
+
+
+def select_page(frame, fields=None, offset=0, limit=None):
+    """Projects frame onto fields (in the order given) and slices one page of rows."""
+    if fields and frame.empty:
+        # No rows were flagged; an empty frame may not carry every column.
+        frame = frame.reindex(columns=fields)
+    if fields:
+        unknown = [name for name in fields if name not in frame.columns]
+        if unknown:
+            raise ResponseFormatError(f"Unknown fields {unknown}; available: {list(frame.columns)}")
+        frame = frame[fields]
+    stop = None if limit is None else offset + limit
+    return frame.iloc[offset:stop]
+
+
+def column_values(series):
+    """A column as a list of native Python values (NaN and missing become None)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    values = series.to_numpy()
+    if values.dtype == np.float32:
+        # Rounded to the 6 decimals uploads are stored with, so 0.1 is sent as
+        # 0.1, not as its float64 widening 0.10000000149011612.
+        values = np.round(values.astype('float64'), 6)
+    if values.dtype.kind == 'f':
+        values = values.tolist()
+        return [None if math.isnan(v) else v for v in values] if series.hasnans else values
+    if values.dtype.kind == 'O':
+        return [None if (v is None or v != v) else v for v in values.tolist()]
+    return values.tolist()
+
+
+def columnar(frame):
+    """{"fields": [...], "columns": {name: [values]}}; one list per column instead of a dict per row."""
+    return {"fields": list(frame.columns), "columns": {name: column_values(frame[name]) for name in frame.columns}}
+
+
+def records(frame):
+    """The legacy list-of-dicts shape."""
+    names = list(frame.columns)
+    return [dict(zip(names, row)) for row in zip(*(column_values(frame[name]) for name in names))]
+
+
+def encode_rows(frame, fmt):
+    """The rows in the JSON shape for fmt ('records' or 'columnar')."""
+    return columnar(frame) if fmt == 'columnar' else records(frame)
+
+
+def iter_ndjson(header, frame, block_rows=NDJSON_BLOCK_ROWS):
+    """Yields the header object, then one JSON object per row, one per line, in blocks."""
+    yield dumps(header) + b'\n'
+    names = list(frame.columns)
+    for start in range(0, len(frame), block_rows):
+        block = frame.iloc[start:start + block_rows]
+        columns = [column_values(block[name]) for name in names]
+        yield b''.join(dumps(dict(zip(names, row))) + b'\n' for row in zip(*columns))
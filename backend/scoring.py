@@ -0,0 +1,77 @@
+"""Vectorized batch scoring helpers for the /score endpoint."""
+import io
+import os
+import numpy as np
+
+# Column order of raw feature arrays: the same order as the CSV schema.
+RAW_FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+DEFAULT_THRESHOLD = float(os.getenv('FRAUD_SCORE_THRESHOLD', 0.5))
+
+
+class ScoringInputError(ValueError):
+    """Raised for malformed /score payloads; endpoints answer 400."""
+
+
+def features_from_columns(columns):
+    """Builds an (n, 30) float64 matrix in RAW_FEATURE_COLUMNS order from JSON column arrays."""
+    if not isinstance(columns, dict):
+        raise ScoringInputError("'columns' must be an object mapping column names to arrays")
+    missing_cols = [col for col in RAW_FEATURE_COLUMNS if col not in columns]
+    if missing_cols:
+        raise ScoringInputError(f"Missing required columns: {missing_cols}")
+    try:
+        lengths = {len(columns[col]) for col in RAW_FEATURE_COLUMNS}
+    except TypeError:
+        raise ScoringInputError("Every column must be an array of numbers")
+    if len(lengths) != 1:
+        raise ScoringInputError("All columns must have the same length")
+    features = np.empty((lengths.pop(), len(RAW_FEATURE_COLUMNS)), dtype='float64')
+    try:
+        for j, col in enumerate(RAW_FEATURE_COLUMNS):
+            features[:, j] = columns[col]
+    except (TypeError, ValueError) as e:
+        raise ScoringInputError(f"Column '{col}' must contain only numbers: {e}")
+    return check_finite(features)
+
+
+def features_from_npy(payload):
+    """Loads an (n, 30) array in RAW_FEATURE_COLUMNS order from .npy bytes."""
+    try:
+        features = np.load(io.BytesIO(payload), allow_pickle=False)
+    except ValueError as e:
+        raise ScoringInputError(f"Body is not a valid .npy array: {e}")
+    if features.ndim != 2 or features.shape[1] != len(RAW_FEATURE_COLUMNS):
+        raise ScoringInputError(
+            f"Expected an array of shape (n, {len(RAW_FEATURE_COLUMNS)}) in the order {RAW_FEATURE_COLUMNS}"
+        )
+    if not np.issubdtype(features.dtype, np.number):
+        raise ScoringInputError("Array must be numeric")
+    return check_finite(features.astype('float64', copy=False))
+
+
+def check_finite(features):
+    if not np.isfinite(features).all():
+        raise ScoringInputError("Features must not contain NaN or infinite values")
+    return features
+
+
+def parse_threshold(value):
+    if value is None:
+        return DEFAULT_THRESHOLD
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        raise ScoringInputError("'threshold' must be a number")
+    if not 0.0 <= threshold <= 1.0:
+        raise ScoringInputError("'threshold' must be between 0 and 1")
+    return threshold
+
+
+def select_above_threshold(scores, threshold):
+    """Returns (row indices, scores) of the rows scoring above threshold.
+
+    The comparison is strict so a threshold of 0.5 flags the same rows as
+    model.predict().
+    """
+    indices = np.flatnonzero(scores > threshold)
+    return indices, scores[indices]
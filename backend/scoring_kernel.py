@@ -0,0 +1,143 @@
+"""Lean NumPy scoring kernel compiled from the LogisticRegression model and preprocessing.
+
+The per-column means/scales from preprocessing.json are folded into the
+model's coefficients, so scoring a
+raw (n, 30) feature matrix in RAW_FEATURE_COLUMNS order is a single
+matrix-vector product plus a bias - no DataFrame reordering, no separate
+scaling passes and no scikit-learn input validation.
+
+Usage (from the backend directory), to rebuild ml_assets/scoring_kernel.npz:
+    python scoring_kernel.py
+"""
+import hashlib
+import os
+import threading
+import numpy as np
+from scoring import RAW_FEATURE_COLUMNS
+from preprocessing import load_preprocessor, preprocessing_path
+
+KERNEL_FILE = 'scoring_kernel.npz'
+MODEL_FILE = 'fraud_detection_model.pkl'
+
+
+def sigmoid(margins):
+    """P(fraud) for decision values; exp only sees -|margin|, so large margins cannot overflow."""
+    decay = np.exp(-np.abs(margins))
+    return np.where(margins >= 0, 1.0 / (1.0 + decay), decay / (1.0 + decay))
+
+
+class ScoringKernel:
+    """Logistic regression over raw features with scaling folded into the weights."""
+
+    def __init__(self, weights, bias, columns=RAW_FEATURE_COLUMNS):
+        self.weights = np.ascontiguousarray(weights, dtype='float32')
+        self.bias = np.float32(bias)
+        self.columns = list(columns)
+        # Digest of the model and preprocessing files this kernel was compiled from.
+        self.source_digest = None
+
+    def as_matrix(self, df):
+        """Returns the DataFrame's feature columns as one contiguous float32 array."""
+        return np.ascontiguousarray(df[self.columns].to_numpy(dtype='float32'))
+
+    def decision_function(self, features):
+        features = np.asarray(features, dtype='float32')
+        return features @ self.weights + self.bias
+
+    def predict_proba(self, features):
+        """P(fraud) for each row."""
+        return sigmoid(self.decision_function(features))
+
+    def predict(self, features):
+        """Hard 0/1 labels; a positive margin is the same as P(fraud) > 0.5."""
+        return (self.decision_function(features) > 0).astype('int64')
+
+    def save(self, path):
+        # Written to a per-process temporary file and renamed, so a worker
+        # loading the kernel while another recompiles it never reads a partial file.
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz'
+        try:
+            np.savez(tmp_path, weights=self.weights, bias=self.bias, columns=np.array(self.columns),
+                     source_digest=np.array(self.source_digest or ''))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            kernel = cls(data['weights'], data['bias'], [str(col) for col in data['columns']])
+            if 'source_digest' in data.files:
+                kernel.source_digest = str(data['source_digest']) or None
+        return kernel
+
+
+def compile_kernel(model, preprocessor):
+    """Folds the preprocessor into model's coefficients.
+
+    For a feature f = (x - mean) / scale with coefficient c, the raw column x
+    gets weight c / scale and the bias absorbs -c * mean / scale. Folding is
+    done in float64 and only the result is stored as float32.
+    """
+    feature_names = list(getattr(model, 'feature_names_in_', preprocessor.feature_names))
+    if feature_names != preprocessor.feature_names:
+        raise ValueError(f"Model features {feature_names} do not match preprocessing {preprocessor.feature_names}")
+    coefs = np.asarray(model.coef_, dtype='float64').ravel() / preprocessor.scale
+    bias = float(np.asarray(model.intercept_, dtype='float64').ravel()[0]) - float(coefs @ preprocessor.mean)
+
+    weights = np.zeros(len(RAW_FEATURE_COLUMNS), dtype='float64')
+    np.add.at(weights, preprocessor.source_index, coefs)
+    return ScoringKernel(weights, bias)
+
+
+def source_digest(assets_dir):
+    """SHA-256 of the model and preprocessing files, the sources a kernel is compiled from."""
+    digest = hashlib.sha256()
+    for path in (os.path.join(assets_dir, MODEL_FILE), preprocessing_path(assets_dir)):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def compile_from_assets(assets_dir, digest=None):
+    """Unpickles the model and compiles it with its preprocessing. This imports scikit-learn."""
+    import joblib
+    kernel = compile_kernel(joblib.load(os.path.join(assets_dir, MODEL_FILE)), load_preprocessor(assets_dir))
+    kernel.source_digest = digest or source_digest(assets_dir)
+    return kernel
+
+
+def load_or_compile_kernel(assets_dir, digest=None):
+    """Loads ml_assets/scoring_kernel.npz, recompiling it unless it was compiled from the current files.
+
+    Freshness is decided by the source digest stored in the kernel, not by
+    file times, which a git checkout or copy does not preserve. A fresh
+    kernel loads with NumPy alone, so serving never unpickles the
+    scikit-learn objects unless the model was retrained. digest may be
+    passed when the caller has already computed source_digest().
+    """
+    kernel_path = os.path.join(assets_dir, KERNEL_FILE)
+    digest = digest or source_digest(assets_dir)
+    if os.path.exists(kernel_path):
+        try:
+            kernel = ScoringKernel.load(kernel_path)
+        except Exception as e:
+            print(f"⚠️  Could not read scoring kernel, recompiling: {e}")
+        else:
+            if kernel.source_digest == digest:
+                return kernel
+    kernel = compile_from_assets(assets_dir, digest)
+    try:
+        kernel.save(kernel_path)
+    except OSError as e:
+        print(f"⚠️  Could not save scoring kernel: {e}")
+    return kernel
+
+
+if __name__ == '__main__':
+    assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml_assets')
+    kernel = compile_from_assets(assets_dir)
+    kernel.save(os.path.join(assets_dir, KERNEL_FILE))
+    print(f"Saved {KERNEL_FILE} ({len(kernel.weights)} float32 weights) to '{assets_dir}/'.")
@@ -0,0 +1,257 @@
+"""Deterministic what-if projections of the savings plan, many scenarios at a time.
+
+The baseline is the plan /simulate has always described: the dataset's
+spending treated as one month's spending, and SAVINGS_RATE of it saved
+every month. A scenario is a list of changes applied to that baseline:
+
+    {"type": "cut_category", "category": "Dining", "percent": 50}
+    {"type": "recurring_expense", "amount": 120, "start_month": 1}
+    {"type": "one_time_expense", "amount": 1000, "month": 1}
+    {"type": "income_change", "amount": 300, "start_month": 1}
+    {"type": "extra_savings", "amount": 200, "start_month": 1}
+
+Money freed by a category cut goes to savings; expenses come out of it;
+income changes and extra savings add to it. All scenarios are projected
+together as (scenarios x months) NumPy arrays, so thousands take
+milliseconds. parse_scenario_text() turns common free-text phrasings into
+changes without an LLM.
+"""
+import os
+import re
+import numpy as np
+from query_parser import CATEGORY_SYNONYMS
+
+SAVINGS_RATE = 0.15
+DEFAULT_MONTHS = int(os.getenv('SIMULATION_MONTHS', 6))
+MAX_MONTHS = 120
+MAX_SCENARIOS = int(os.getenv('SIMULATION_MAX_SCENARIOS', 10000))
+CHANGE_TYPES = ('cut_category', 'recurring_expense', 'one_time_expense', 'income_change', 'extra_savings')
+
+_PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*(?:%|percent\b)')
+_MONEY = re.compile(r'\$\s*(\d[\d,]*(?:\.\d+)?)\s*(k\b)?|(\d[\d,]*(?:\.\d+)?)\s*(k\b)?\s*(?:dollars|usd)\b')
+_CUT = re.compile(r'\b(cut\w*|reduc\w*|lower\w*|decreas\w*|trim\w*|less)\b')
+_RAISE = re.compile(r'\b(increas\w*|rais\w*|more)\b')
+_MONTHLY = re.compile(r'\b(per|each|every) month\b|\bmonthly\b|/\s*mo(nth)?\b')
+# "a month" only means monthly right after the amount: "$50 a month", not "in a month I'll buy a $1000 TV".
+_A_MONTH = re.compile(r'\s*a month\b')
+_SAVE_MORE = re.compile(r'\bsav(e|ing)\b.*\bmore\b|\bmore\b.*\bsav(e|ing)s?\b|\b(in|into|to) (my )?savings\b')
+_INCOME = re.compile(r'\b(income|salary|raise|paycheck|earn\w*|pay rise|bonus)\b')
+_INCOME_DOWN = re.compile(r'\b(pay cut|lose|lost|losing|drop\w*|fall\w*|less)\b')
+# Cues that an amount stops being spent (the money goes to savings) or starts being spent.
+_FREED = re.compile(r'\b(cut\w*|reduc\w*|lower\w*|decreas\w*|trim\w*|less|cancel\w*|stop\w*|quit\w*|'
+                    r'drop\w*|skip\w*|refund\w*|sav(e|es|ed|ing))\b')
+_SPENT = re.compile(r'\b(add\w*|new|start\w*|subscrib\w*|buy\w*|more)\b')
+_CLAUSE = re.compile(r',|;|\band\b|\bthen\b')
+_WORD = re.compile(r"[a-z]+")
+
+
+class ScenarioError(ValueError):
+    """Raised for a malformed scenario or change; /simulate answers 400."""
+
+
+def spending_inputs(aggregates):
+    """(spend_by_category, total_spend) from a dataset's AggregateIndex, without touching its rows."""
+    sums = aggregates.sums
+    present = aggregates.counts > 0
+    spend_by_category = {name: float(sums[i]) for i, name in enumerate(aggregates.categories) if present[i]}
+    return spend_by_category, aggregates.total_spending()
+
+
+def _number(change, key, default=None):
+    value = change.get(key, default)
+    if value is None:
+        raise ScenarioError(f"{change.get('type')} needs '{key}'")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ScenarioError(f"'{key}' must be a number, got {value!r}")
+    if not np.isfinite(value):
+        raise ScenarioError(f"'{key}' must be finite")
+    return value
+
+
+def _month(change, key, months):
+    month = _number(change, key, 1)
+    if month != int(month) or not 1 <= month <= months:
+        raise ScenarioError(f"'{key}' must be a whole month between 1 and {months}")
+    return int(month)
+
+
+def normalize_scenario(scenario, categories, months=DEFAULT_MONTHS):
+    """Validates a scenario ({"name": ..., "changes": [...]} or a bare list of changes).
+
+    Category names are matched case-insensitively against the dataset's
+    categories. Returns {"name", "changes"} with every default filled in.
+    """
+    if isinstance(scenario, list):
+        scenario = {"changes": scenario}
+    if not isinstance(scenario, dict) or not isinstance(scenario.get("changes"), list) or not scenario["changes"]:
+        raise ScenarioError("A scenario needs a non-empty 'changes' list")
+    by_name = {str(name).lower(): name for name in categories}
+    changes = []
+    for change in scenario["changes"]:
+        if not isinstance(change, dict) or change.get("type") not in CHANGE_TYPES:
+            raise ScenarioError(f"Each change needs a 'type' in {', '.join(CHANGE_TYPES)}")
+        kind = change["type"]
+        if kind == 'cut_category':
+            category = by_name.get(str(change.get("category", '')).lower())
+            if category is None:
+                raise ScenarioError(f"Unknown category {change.get('category')!r}; available: {sorted(by_name.values())}")
+            percent = _number(change, "percent")
+            if percent > 100:
+                raise ScenarioError("'percent' cannot exceed 100")
+            changes.append({"type": kind, "category": category, "percent": percent})
+        elif kind == 'one_time_expense':
+            changes.append({"type": kind, "amount": _number(change, "amount"), "month": _month(change, "month", months)})
+        else:
+            changes.append({"type": kind, "amount": _number(change, "amount"),
+                            "start_month": _month(change, "start_month", months)})
+    return {"name": scenario.get("name"), "changes": changes}
+
+
+def simulate(spend_by_category, total_spend, scenarios, months=DEFAULT_MONTHS):
+    """Projects normalized scenarios month by month.
+
+    spend_by_category maps category -> monthly spend and total_spend also
+    counts uncategorized spending. Returns a dict of arrays:
+    "baseline" (months,) and "savings" (scenarios, months) hold each month's
+    savings, "cumulative_baseline"/"cumulative" their running totals.
+    """
+    names = list(spend_by_category)
+    positions = {name: i for i, name in enumerate(names)}
+    spend = np.array([spend_by_category[name] for name in names], dtype='float64')
+    cuts = np.zeros((len(scenarios), len(names)))
+    deltas = np.zeros((len(scenarios), months))
+    for row, scenario in enumerate(scenarios):
+        for change in scenario["changes"]:
+            kind = change["type"]
+            if kind == 'cut_category':
+                cuts[row, positions[change["category"]]] += change["percent"] / 100
+            elif kind == 'one_time_expense':
+                deltas[row, change["month"] - 1] -= change["amount"]
+            elif kind == 'recurring_expense':
+                deltas[row, change["start_month"] - 1:] -= change["amount"]
+            else:  # income_change, extra_savings
+                deltas[row, change["start_month"] - 1:] += change["amount"]
+
+    baseline = np.full(months, SAVINGS_RATE * float(total_spend))
+    # Several cuts to one category can add up past 100%; spending cannot go below zero.
+    savings = baseline + (np.minimum(cuts, 1.0) @ spend)[:, None] + deltas
+    return {
+        "baseline": baseline,
+        "savings": savings,
+        "cumulative_baseline": np.cumsum(baseline),
+        "cumulative": np.cumsum(savings, axis=1),
+    }
+
+
+def scenario_results(scenarios, projection):
+    """One JSON-ready summary per scenario, in the keys /simulate has always returned."""
+    months = len(projection["baseline"])
+    original = round(float(projection["cumulative_baseline"][-1]), 2)
+    month_numbers = list(range(1, months + 1))
+    baseline_curve = np.round(projection["cumulative_baseline"], 2).tolist()
+    # Rounded and converted once for all scenarios rather than row by row.
+    curves = np.round(projection["cumulative"], 2)
+    totals = curves[:, -1].tolist()
+    monthly_changes = np.round((curves[:, -1] - original) / months, 2).tolist()
+    results = []
+    for scenario, curve, new, monthly_change in zip(scenarios, curves.tolist(), totals, monthly_changes):
+        results.append({
+            "name": scenario["name"],
+            "changes": scenario["changes"],
+            "months": months,
+            "original_6month_savings": original,
+            "new_6month_savings": new,
+            "monthly_change": monthly_change,
+            "projection": {"month": month_numbers, "original_savings": baseline_curve, "new_savings": curve},
+        })
+    return results
+
+
+def _find_category(text, categories):
+    by_name = {str(name).lower(): name for name in categories}
+    for word in _WORD.findall(text):
+        for candidate in (word, word[:-1] if word.endswith('s') else None):
+            if candidate in by_name:
+                return by_name[candidate]
+        synonym = CATEGORY_SYNONYMS.get(word)
+        if synonym and synonym.lower() in by_name:
+            return by_name[synonym.lower()]
+    return None
+
+
+def _parse_money(match):
+    digits, thousands = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    amount = float(digits.replace(',', ''))
+    return amount * 1000 if thousands else amount
+
+
+def parse_scenario_text(text, categories):
+    """Turns common phrasings into a scenario, or returns None when none apply.
+
+    Recognizes a category cut or increase by a percentage, a one-time
+    purchase or expense, a recurring monthly expense, a monthly cost that is
+    cut, cancelled or stopped, an income change and saving more per month.
+    Anything else, including text whose direction is unclear, is left to the
+    LLM.
+    """
+    text = ' '.join(str(text).lower().split())
+    changes = []
+    percent = _PERCENT.search(text)
+    category = _find_category(text, categories)
+    if percent and category:
+        value = float(percent.group(1))
+        if _RAISE.search(text) and not _CUT.search(text):
+            value = -value
+        changes.append({"type": "cut_category", "category": category, "percent": value})
+
+    amounts = list(_MONEY.finditer(text))
+    if len(amounts) > 1:
+        return None  # several amounts need the LLM to pair them with their changes
+    money = amounts[0] if amounts else None
+    if money:
+        amount = _parse_money(money)
+        # Direction cues are read from the clause holding the amount, so "cut
+        # dining by 20% and add a $50 monthly gym" is a cut plus an expense.
+        starts = [0] + [m.end() for m in _CLAUSE.finditer(text) if m.end() <= money.start()]
+        ends = [m.start() for m in _CLAUSE.finditer(text) if m.start() >= money.end()] + [len(text)]
+        clause = text[starts[-1]:ends[0]]
+        freed, spent = _FREED.search(clause), _SPENT.search(clause)
+        if _MONTHLY.search(text) or _A_MONTH.match(text, money.end()):
+            if _SAVE_MORE.search(clause):
+                changes.append({"type": "extra_savings", "amount": amount})
+            elif _INCOME.search(text):
+                changes.append({"type": "income_change", "amount": -amount if _INCOME_DOWN.search(text) else amount})
+            elif freed and spent:
+                return None  # e.g. "switch to a $50 plan and cancel the old one": leave it to the LLM
+            elif freed:
+                # Cutting, cancelling or stopping a monthly cost frees it for savings.
+                changes.append({"type": "extra_savings", "amount": amount})
+            else:
+                changes.append({"type": "recurring_expense", "amount": amount})
+        elif freed:
+            return None  # one-off saving or a refund; the direction is unclear
+        else:
+            changes.append({"type": "one_time_expense", "amount": amount})
+    return {"name": None, "changes": changes} if changes else None
+
+
+def template_narrative(result):
+    """A plain description and recommendations built from the numbers alone (no LLM)."""
+    change = result["new_6month_savings"] - result["original_6month_savings"]
+    direction = "increase" if change >= 0 else "reduce"
+    description = (
+        f"This scenario would {direction} your {result['months']}-month savings by ${abs(change):,.2f}, "
+        f"from ${result['original_6month_savings']:,.2f} to ${result['new_6month_savings']:,.2f} "
+        f"({'-' if result['monthly_change'] < 0 else '+'}${abs(result['monthly_change']):,.2f} per month on average)."
+    )
+    recommendations = []
+    lowest = min(result["projection"]["new_savings"])
+    if lowest < 0:
+        recommendations.append("Savings go negative during the plan; spread the cost over more months or cut back first.")
+    if change < 0:
+        recommendations.append(f"Set aside ${-result['monthly_change']:,.2f} more per month to stay on your original plan.")
+    else:
+        recommendations.append("Move the difference into savings automatically so it is not spent elsewhere.")
+    return {"impact_description": description, "recommendations": recommendations}
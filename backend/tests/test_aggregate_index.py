@@ -0,0 +1,66 @@
+"""Per-category aggregate index: updates, merges, matching and persistence.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from aggregate_index import AggregateIndex, matching_positions
+
+
+def chunk(categories, amounts, anomalies=None):
+    df = pd.DataFrame({'Category': categories, 'Amount': amounts})
+    if anomalies is not None:
+        df['is_anomaly'] = anomalies
+    return df
+
+
+@pytest.fixture
+def index():
+    index = AggregateIndex()
+    index.update(chunk(['Dining', 'Travel', None, 'Dining'], [10.0, 200.0, 5.0, 15.0], [0, 1, 0, 1]))
+    return index
+
+
+def test_totals_match_a_groupby(index):
+    assert index.categories == ['Dining', 'Travel']
+    assert index.sums.tolist() == [25.0, 200.0, 5.0]  # uncategorized rows come last
+    assert index.counts.tolist() == [2, 1, 1]
+    assert index.total_spending() == 230.0
+    assert index.category_spending('dining') == 25.0
+    assert index.anomaly_count() == 2
+
+
+def test_updates_add_new_categories_before_the_uncategorized_entry(index):
+    index.update(chunk(['Health', 'Travel'], [7.0, np.nan]))
+    assert index.categories == ['Dining', 'Travel', 'Health']
+    assert index.sums.tolist() == [25.0, 200.0, 7.0, 5.0]
+    assert index.counts.tolist() == [2, 2, 1, 1]
+
+
+def test_merge_matches_one_pass():
+    rows = chunk(['Dining', 'Travel', 'Health', None, 'Dining', 'Shopping'], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                 [1, 0, 0, 1, 0, 1])
+    whole = AggregateIndex()
+    whole.update(rows)
+    merged, shard = AggregateIndex(), AggregateIndex()
+    merged.update(rows.iloc[:3])
+    shard.update(rows.iloc[3:])
+    merged.merge(shard)
+    for name in whole.categories:
+        assert merged.category_spending(name) == whole.category_spending(name)
+    assert merged.total_spending() == whole.total_spending()
+    assert merged.anomaly_count() == whole.anomaly_count()
+
+
+def test_json_round_trip(index):
+    restored = AggregateIndex.from_json(index.to_json())
+    assert restored.categories == index.categories
+    np.testing.assert_array_equal(restored.sums, index.sums)
+    np.testing.assert_array_equal(restored.anomalies, index.anomalies)
+
+
+@pytest.mark.parametrize("category, expected", [('din', [0]), ('ING', [0, 2]), ('^t', [1]), ('(', []),
+                                                ('rent', [])])
+def test_category_matching_is_partial_and_case_insensitive(category, expected):
+    assert matching_positions(['Dining', 'Travel', 'Shopping'], category) == expected
@@ -0,0 +1,79 @@
+"""Appends to an analyzed upload: row hashes and duplicate rows.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import io
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from ingest import row_hashes
+from test_dataset_store import transactions
+from upload_registry import UploadRegistry
+
+
+@pytest.fixture(scope='module')
+def app_module():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        import app
+    return app
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'upload_registry', UploadRegistry(str(tmp_path / 'uploads')))
+    return app_module.app.test_client()
+
+
+def post_csv(client, url, df):
+    body = df.to_csv(index=False).encode()
+    response = client.post(url, data={'file': (io.BytesIO(body), 'transactions.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_row_hash_ignores_label_and_time_dtype():
+    df = transactions(5)
+    relabeled = df.assign(Class=1 - df['Class'], Time=df['Time'].astype('int64'))
+    np.testing.assert_array_equal(row_hashes(df), row_hashes(relabeled))
+    assert len(set(row_hashes(df))) == 5
+    assert row_hashes(df.assign(Amount=df['Amount'] + 0.01))[0] != row_hashes(df)[0]
+
+
+def test_hash_segments_stay_few_and_searchable(tmp_path):
+    registry = UploadRegistry(str(tmp_path))
+    dataset_id = '0' * 32
+    stored = []
+    for start in range(0, 64, 4):
+        batch = np.arange(start, start + 4, dtype='uint64') * 7919
+        registry.save_row_hashes(dataset_id, batch)
+        stored.append(batch)
+    assert len(registry._row_hash_segments(dataset_id)) <= 5
+    stored = np.concatenate(stored)
+    np.testing.assert_array_equal(registry.known_row_hashes(dataset_id, stored), True)
+    np.testing.assert_array_equal(registry.known_row_hashes(dataset_id, stored + 1), False)
+
+
+def test_append_skips_stored_and_repeated_rows(client):
+    upload = transactions(40)
+    dataset_id = post_csv(client, '/analyze', upload)["dataset_id"]
+    fresh = transactions(10, start=40, seed=1)
+    delta = pd.concat([upload.iloc[:5], fresh, fresh.iloc[:2]], ignore_index=True)
+    result = post_csv(client, f'/datasets/{dataset_id}/append', delta)
+    assert result["rows_received"] == 17
+    assert result["rows_appended"] == 10
+    assert result["duplicates_skipped"] == 7
+    assert result["num_rows"] == 50
+
+    again = post_csv(client, f'/datasets/{dataset_id}/append', delta)
+    assert again["rows_appended"] == 0
+    assert again["num_rows"] == 50
+
+
+def test_append_to_unknown_dataset(client):
+    body = transactions(3).to_csv(index=False).encode()
+    response = client.post(f'/datasets/{"f" * 32}/append', data={'file': (io.BytesIO(body), 't.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 404
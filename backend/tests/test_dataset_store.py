@@ -0,0 +1,88 @@
+"""Columnar dataset store: conversion, appends and rebuilds of a stale copy.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from dataset_store import UNLABELED, ColumnarWriter, DatasetStore, read_meta
+from ingest import append_csv_rows
+
+
+def transactions(rows, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'Time': np.arange(start, start + rows, dtype='float64')})
+    for i in range(1, 29):
+        df[f'V{i}'] = rng.normal(size=rows).astype('float32')
+    df['Amount'] = np.round(rng.uniform(1, 100, rows), 2)
+    df['Category'] = rng.choice(['Dining', 'Travel', 'Shopping'], rows)
+    df['Class'] = (rng.random(rows) < 0.1).astype('int64')
+    return df
+
+
+@pytest.fixture
+def store(tmp_path):
+    csv_path = str(tmp_path / 'upload.csv')
+    transactions(50).to_csv(csv_path, index=False)
+    return DatasetStore(csv_path, str(tmp_path / 'columnar'))
+
+
+def test_load_matches_csv(store):
+    expected = pd.read_csv(store.csv_path)
+    df = store.load()
+    assert len(df) == 50
+    np.testing.assert_allclose(df['Amount'], expected['Amount'])
+    np.testing.assert_allclose(df['V7'], expected['V7'], atol=1e-6)
+    assert list(df['Category'].astype(str)) == list(expected['Category'])
+
+
+def test_append_publishes_rows_and_csv_together(store):
+    store.load()
+    delta = transactions(20, start=50, seed=1)
+    meta = store.append(store.appender(), delta, append_csv_rows)
+    assert meta["num_rows"] == 70
+    assert len(pd.read_csv(store.csv_path)) == 70
+    # The CSV change is recorded in meta.json, so the copy is not rebuilt.
+    assert read_meta(store.store_dir)["version"] == meta["version"]
+    assert store.meta()["version"] == meta["version"]
+    np.testing.assert_allclose(store.load()['Time'], np.arange(70))
+
+
+def test_append_drops_bytes_left_by_a_failed_append(store):
+    meta = store.meta()
+    data_dir = os.path.join(store.store_dir, f'v{meta["version"]}')
+    with open(os.path.join(data_dir, 'Time.bin'), 'ab') as f:
+        f.write(b'\x00' * 24)  # three float64 rows that were never published
+    store.append(store.appender(), transactions(5, start=50, seed=2), append_csv_rows)
+    assert os.path.getsize(os.path.join(data_dir, 'Time.bin')) == 55 * 8
+    np.testing.assert_allclose(store.load()['Time'], np.arange(55))
+
+
+def test_rows_without_class_are_unlabeled(store):
+    delta = transactions(10, start=50, seed=3).drop(columns='Class')
+    store.append(store.appender(), delta, append_csv_rows)
+    classes = store.load()['Class'].to_numpy()
+    assert (classes[50:] == UNLABELED).all()
+    assert set(classes[:50]) <= {0, 1}
+
+
+def test_changed_csv_is_rebuilt(store):
+    first = store.meta()["version"]
+    transactions(30, seed=4).to_csv(store.csv_path, index=False)
+    meta = store.meta()
+    assert meta["version"] == first + 1
+    assert meta["num_rows"] == 30
+
+
+def test_writer_with_append_continues_categories(tmp_path):
+    writer = ColumnarWriter(str(tmp_path))
+    writer.append(transactions(10))
+    writer.close()
+    appender = ColumnarWriter(str(tmp_path), append=True)
+    extra = transactions(5, start=10, seed=5)
+    extra['Category'] = 'Groceries'
+    appender.append(extra)
+    meta = appender.close()
+    assert meta["num_rows"] == 15
+    assert meta["categories"][-1] == 'Groceries'
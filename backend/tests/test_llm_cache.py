@@ -0,0 +1,116 @@
+"""LLM response cache: hits, expiry, single-flight coalescing and SQLite persistence.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import sqlite3
+import threading
+from types import SimpleNamespace
+import pytest
+from llm_cache import LLMResponseCache, cached_chat_completion, make_cache_key
+
+MODEL = 'test-model'
+
+
+class FakeClient:
+    """Groq-style client that counts calls and can hold them until released."""
+
+    def __init__(self, reply='{"ok": true}', gate=None):
+        self.reply = reply
+        self.gate = gate
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, temperature):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f' {self.reply} '))])
+
+
+def reject(text):
+    raise ValueError(text)
+
+
+def ask(client, cache, text='How much did I spend?'):
+    return cached_chat_completion(client, cache, f'prompt: {text}', model=MODEL, temperature=0.1, key_text=text)
+
+
+def test_repeated_question_is_served_from_cache():
+    client, cache = FakeClient(), LLMResponseCache()
+    assert ask(client, cache) == '{"ok": true}'
+    # Case, whitespace and trailing punctuation do not change the key.
+    assert ask(client, cache, '  how much did I   SPEND ') == '{"ok": true}'
+    assert client.calls == 1
+    assert cache.snapshot()["hits"] == 1
+    ask(client, cache, 'Something else')
+    assert client.calls == 2
+
+
+def test_expired_entries_are_fetched_again():
+    client, cache = FakeClient(), LLMResponseCache(ttl_seconds=0)
+    ask(client, cache)
+    ask(client, cache)
+    assert client.calls == 2
+
+
+def test_invalid_responses_are_not_cached():
+    client, cache = FakeClient(reply='not json'), LLMResponseCache()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cached_chat_completion(client, cache, 'p', model=MODEL, temperature=0.1, key_text='q', validate=reject)
+    assert client.calls == 2
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_concurrent_misses_share_one_request():
+    gate = threading.Event()
+    client, cache = FakeClient(gate=gate), LLMResponseCache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ask(client, cache))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Release the leader only once every other caller is waiting on it.
+    for _ in range(500):
+        if cache.snapshot()["coalesced"] == 7:
+            break
+        threading.Event().wait(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert client.calls == 1
+    assert results == ['{"ok": true}'] * 8
+    assert cache.snapshot()["coalesced"] == 7
+
+
+def test_sqlite_file_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite')
+    client = FakeClient()
+    ask(client, LLMResponseCache(sqlite_path=path))
+    restarted = LLMResponseCache(sqlite_path=path)
+    assert ask(client, restarted) == '{"ok": true}'
+    assert client.calls == 1
+    assert restarted.snapshot()["disk_hits"] == 1
+
+
+def rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT key FROM llm_cache").fetchall()
+
+
+def test_expired_sqlite_rows_are_deleted(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite')
+    client = FakeClient()
+    ask(client, LLMResponseCache(sqlite_path=path, ttl_seconds=0), 'first')
+    assert len(rows(path)) == 1
+    # Opening the file drops rows that have already expired...
+    cache = LLMResponseCache(sqlite_path=path)
+    assert rows(path) == []
+    # ...and so does reading one that expired since.
+    key = make_cache_key('second', MODEL, 0.1)
+    with sqlite3.connect(path) as db:
+        db.execute("INSERT INTO llm_cache VALUES (?, 'stale', 0)", (key,))
+    failing = FakeClient(reply='not json')
+    with pytest.raises(ValueError):
+        cached_chat_completion(failing, cache, 'p', model=MODEL, temperature=0.1, key_text='second', validate=reject)
+    assert rows(path) == []
+    assert failing.calls == 1
@@ -0,0 +1,126 @@
+"""Model evaluation: metrics against scikit-learn, candidates and the evaluation cache.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import io
+import os
+import shutil
+import warnings
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, confusion_matrix, roc_auc_score
+from model_evaluation import CANDIDATES_DIR, EvaluationCache, ModelCatalog, evaluate_margins, evaluate_models
+from preprocessing import preprocessing_path
+from scoring_kernel import KERNEL_FILE, MODEL_FILE, ScoringKernel, source_digest
+from test_dataset_store import transactions
+from test_scoring_kernel import ASSETS_DIR
+from upload_registry import UploadRegistry
+
+
+@pytest.fixture(scope='module')
+def scored():
+    rng = np.random.default_rng(0)
+    labels = (rng.random(3000) < 0.05).astype('int64')
+    # Rounded so both models have runs of tied scores.
+    margins = np.stack([np.round(labels * 2.0 + rng.normal(0, 1.5, 3000), 1),
+                        np.round(rng.normal(0, 1, 3000), 1)], axis=1)
+    return margins, labels
+
+
+def test_metrics_match_sklearn(scored):
+    margins, labels = scored
+    for j, result in enumerate(evaluate_margins(margins, labels)):
+        scores = margins[:, j].astype('float32')
+        assert result["matrix"] == confusion_matrix(labels, scores > 0).tolist()
+        assert result["roc_auc"] == pytest.approx(roc_auc_score(labels, scores))
+        assert result["average_precision"] == pytest.approx(average_precision_score(labels, scores))
+
+
+def test_curves_are_downsampled_with_both_ends(scored):
+    margins, labels = scored
+    result = evaluate_margins(margins, labels, curve_points=11)[0]
+    assert len(result["roc"]["fpr"]) <= 11
+    assert (result["roc"]["fpr"][0], result["roc"]["tpr"][0]) == (0.0, 0.0)
+    assert (result["roc"]["fpr"][-1], result["roc"]["tpr"][-1]) == (1.0, 1.0)
+    assert result["pr"]["recall"][-1] == 1.0
+    thresholds = result["pr"]["threshold"]
+    assert thresholds == sorted(thresholds, reverse=True) and 0 <= thresholds[-1] <= thresholds[0] <= 1
+
+
+def test_single_class_has_no_ranking_metrics():
+    result = evaluate_margins(np.array([[1.0], [-1.0]]), np.array([0, 0]))[0]
+    assert result["matrix"] == [[1, 1], [0, 0]]
+    assert result["roc_auc"] is None and result["roc"] is None
+
+
+def test_models_are_scored_together():
+    df = transactions(500)
+    labels = df['Class'].to_numpy()
+    rng = np.random.default_rng(1)
+    columns = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+    kernels = [ScoringKernel(rng.normal(size=30), rng.normal(), columns) for _ in range(3)]
+    together = evaluate_models(df, labels, kernels)
+    for kernel, result in zip(kernels, together):
+        alone = evaluate_margins(kernel.decision_function(kernel.as_matrix(df))[:, None], labels)[0]
+        assert result["matrix"] == alone["matrix"]
+        assert result["roc_auc"] == pytest.approx(alone["roc_auc"])
+    with pytest.raises(ValueError):
+        evaluate_models(df, labels, [kernels[0], ScoringKernel(np.ones(2), 0.0, ['Time', 'Amount'])])
+
+
+def test_cache_is_an_lru_per_version_and_dataset():
+    cache = EvaluationCache(max_entries=2)
+    cache.put('v1', 'a', {"roc_auc": 0.9})
+    cache.put('v2', 'a', {"roc_auc": 0.8})
+    assert cache.get('v1', 'a') == {"roc_auc": 0.9}
+    cache.put('v1', 'b', {"roc_auc": 0.7})
+    assert cache.get('v2', 'a') is None  # least recently used
+    assert cache.get('v1', 'a') is not None
+    assert cache.stats == {"hits": 2, "misses": 1}
+
+
+def test_catalog_loads_candidates_and_skips_broken_ones(tmp_path):
+    candidate_dir = tmp_path / CANDIDATES_DIR / 'copy'
+    candidate_dir.mkdir(parents=True)
+    for name in (MODEL_FILE, os.path.basename(preprocessing_path(ASSETS_DIR)), KERNEL_FILE):
+        shutil.copy(os.path.join(ASSETS_DIR, name), candidate_dir / name)
+    (tmp_path / CANDIDATES_DIR / 'broken').mkdir()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        models = ModelCatalog(str(tmp_path)).candidates()
+    assert [model.name for model in models] == ['copy']
+    assert models[0].version == source_digest(ASSETS_DIR)[:12]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        import app
+    monkeypatch.setattr(app, 'upload_registry', UploadRegistry(str(tmp_path / 'uploads')))
+    monkeypatch.setattr(app, 'evaluation_cache', EvaluationCache())
+    return app.app.test_client()
+
+
+def evaluate(client, df):
+    body = df.to_csv(index=False).encode()
+    return client.post('/models/evaluate?models=active', data={'file': (io.BytesIO(body), 'labeled.csv')},
+                       content_type='multipart/form-data')
+
+
+def test_endpoint_leaves_out_unlabeled_rows_and_caches(client):
+    df = transactions(200).astype({'Class': 'float64'})
+    df.loc[:9, 'Class'] = np.nan
+    first = evaluate(client, df).get_json()
+    assert first["num_rows"] == 190
+    assert first["positives"] == int(df['Class'].sum())
+    assert first["models"][0]["cached"] is False
+    assert evaluate(client, df).get_json()["models"][0]["cached"] is True
+
+
+def test_endpoint_rejects_labels_other_than_0_and_1(client):
+    df = transactions(20)
+    df.loc[0, 'Class'] = 2
+    response = evaluate(client, df)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid labels"
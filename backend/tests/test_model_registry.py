@@ -0,0 +1,82 @@
+"""ModelRegistry readiness and reloads against a copy of ml_assets/.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import os
+import shutil
+import warnings
+import pytest
+import model_registry
+from model_registry import ModelNotReadyError, ModelRegistry
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ml_assets')
+
+
+@pytest.fixture
+def assets_copy(tmp_path):
+    for name in os.listdir(ASSETS_DIR):
+        if os.path.isfile(os.path.join(ASSETS_DIR, name)):
+            shutil.copy(os.path.join(ASSETS_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+
+@pytest.fixture(autouse=True)
+def quiet_unpickling():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        yield
+
+
+def test_initial_load_makes_registry_ready(assets_copy):
+    registry = ModelRegistry(assets_copy, poll_interval=0)
+    registry.start(background=False)
+    assert registry.is_ready()
+    assert registry.current().version == registry.snapshot()["version"]
+
+
+def test_failed_first_load_is_retried_on_next_poll(assets_copy, monkeypatch):
+    real_load_bundle = model_registry.load_bundle
+    calls = []
+
+    def flaky_load_bundle(assets_dir):
+        calls.append(assets_dir)
+        if len(calls) == 1:
+            raise OSError("artifact is being written")
+        return real_load_bundle(assets_dir)
+
+    monkeypatch.setattr(model_registry, 'load_bundle', flaky_load_bundle)
+    registry = ModelRegistry(assets_copy, poll_interval=0)
+    registry.start(background=False)
+    assert not registry.is_ready()
+    with pytest.raises(ModelNotReadyError):
+        registry.current(timeout=0)
+
+    # The artifacts did not change, yet the poll retries because nothing is loaded.
+    assert registry.reload_if_changed()
+    assert registry.is_ready()
+    assert registry.snapshot()["last_error"] is None
+    assert len(calls) == 2
+
+
+def test_loaded_registry_ignores_unchanged_files(assets_copy, monkeypatch):
+    registry = ModelRegistry(assets_copy, poll_interval=0)
+    registry.start(background=False)
+
+    def fail(assets_dir):
+        raise AssertionError("unchanged artifacts should not be reloaded")
+
+    monkeypatch.setattr(model_registry, 'load_bundle', fail)
+    assert not registry.reload_if_changed()
+
+
+def test_changed_files_are_loaded_once_settled(assets_copy):
+    registry = ModelRegistry(assets_copy, poll_interval=0)
+    registry.start(background=False)
+    before = registry.current()
+    metrics_path = os.path.join(assets_copy, model_registry.METRICS_FILE)
+    stat = os.stat(metrics_path)
+    os.utime(metrics_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not registry.reload_if_changed()  # first sighting waits for writes to settle
+    assert registry.reload_if_changed()
+    assert registry.current() is not before
+    assert registry.reloads == 1
@@ -0,0 +1,64 @@
+"""Local query parser: which phrasings skip the LLM, and how they are answered.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import warnings
+import pandas as pd
+import pytest
+from aggregate_index import AggregateIndex
+from query_parser import MIN_CONFIDENCE, parse_query_locally
+
+
+def parsed(query):
+    result, confidence = parse_query_locally(query)
+    return {key: value for key, value in result.items() if value is not None}, confidence
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How much did I spend on dining last month vs this month?",
+     {"query_type": "spending_comparison", "category": "dining", "comparison": "month_over_month"}),
+    ("What is my total spending?", {"query_type": "total_spending"}),
+    ("What did I spend last week?", {"query_type": "total_spending", "time_period": "last_week"}),
+    ("How much did I spend on restaurants?", {"query_type": "category_spending", "category": "dining"}),
+    ("How much did I spend on dinning this week?",
+     {"query_type": "category_spending", "category": "dining", "time_period": "this_week"}),
+    ("How many fraudulent transactions do I have?", {"query_type": "anomaly_count"}),
+    ("How can I save money?", {"query_type": "savings_analysis"}),
+])
+def test_common_phrasings_are_parsed_locally(query, expected):
+    result, confidence = parsed(query)
+    assert result == expected
+    assert confidence >= MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("query", [
+    "Which category did I spend the most on?",  # rankings
+    "How much did I spend on coffee?",  # a target that is not a category
+    "Did I pay my rent?",
+    "Compare dining and travel",  # category against category
+    "How much did I spend on travel last month and this week?",  # two periods
+    "What is the weather?",
+])
+def test_ambiguous_queries_go_to_the_llm(query):
+    assert parsed(query)[1] < MIN_CONFIDENCE
+
+
+@pytest.fixture(scope='module')
+def app_module():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        import app
+    return app
+
+
+def test_savings_questions_get_the_savings_plan(app_module):
+    aggregates = AggregateIndex()
+    aggregates.update(pd.DataFrame({'Category': ['Dining', 'Travel', 'Groceries'], 'Amount': [400.0, 30.0, 500.0]}))
+    answer = app_module.analyze_query_with_data(parse_query_locally("How can I save money?")[0], aggregates)
+    assert list(answer["data"]["savings_plan"]) == ['Dining']  # Travel is under the threshold, Groceries essential
+    assert "$60.00/month" in answer["response"]
+
+    requirements = parse_query_locally("How much could I save on groceries?")[0]
+    answer = app_module.analyze_query_with_data(requirements, aggregates)
+    assert answer["data"]["savings_plan"] == {}
+    assert "no savings suggestions for groceries" in answer["response"]
@@ -0,0 +1,132 @@
+"""Parity of the compiled scoring kernel with the scikit-learn model, and kernel freshness checks.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import os
+import shutil
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+import scoring_kernel
+from generate_data import REAL_ANOMALIES
+from preprocessing import load_preprocessor, preprocessing_path
+from scoring import RAW_FEATURE_COLUMNS
+from scoring_kernel import (KERNEL_FILE, MODEL_FILE, ScoringKernel, compile_kernel, load_or_compile_kernel, sigmoid,
+                            source_digest)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ml_assets')
+
+
+@pytest.fixture(scope='module')
+def model():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        return joblib.load(os.path.join(ASSETS_DIR, MODEL_FILE))
+
+
+@pytest.fixture(scope='module')
+def features():
+    """Synthetic rows shaped like generate_data.py output, plus the real fraud templates."""
+    rng = np.random.default_rng(42)
+    n = 20_000
+    synthetic = np.empty((n, len(RAW_FEATURE_COLUMNS)), dtype='float32')
+    synthetic[:, 0] = rng.integers(1, 172000, n)
+    synthetic[:, 1:29] = rng.uniform(-3, 3, (n, 28))
+    synthetic[:, 29] = np.round(rng.exponential(40.0, n), 2)
+    anomalies = np.array([row[:30] for row in REAL_ANOMALIES], dtype='float32')
+    return np.vstack([synthetic, anomalies])
+
+
+@pytest.fixture
+def assets_copy(tmp_path):
+    for name in (MODEL_FILE, os.path.basename(preprocessing_path(ASSETS_DIR)), KERNEL_FILE):
+        shutil.copy(os.path.join(ASSETS_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+
+def sklearn_scores(model, features):
+    preprocessor = load_preprocessor(ASSETS_DIR)
+    df = pd.DataFrame(preprocessor.transform(features), columns=preprocessor.feature_names)
+    return model.predict(df), model.predict_proba(df)[:, 1]
+
+
+def test_kernel_matches_sklearn(model, features):
+    kernel = compile_kernel(model, load_preprocessor(ASSETS_DIR))
+    expected_labels, expected_proba = sklearn_scores(model, features)
+    # float32 folding may flip a row sitting exactly on the decision boundary.
+    assert (kernel.predict(features) != expected_labels).mean() <= 1e-4
+    np.testing.assert_allclose(kernel.predict_proba(features), expected_proba, atol=1e-5)
+
+
+def test_predict_proba_saturates_without_overflow():
+    kernel = ScoringKernel(np.ones(2, dtype='float32'), 0.0, columns=['a', 'b'])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        proba = kernel.predict_proba(np.array([[-1e4, -1e4], [0, 0], [1e4, 1e4]], dtype='float32'))
+    np.testing.assert_allclose(proba, [0.0, 0.5, 1.0])
+    np.testing.assert_allclose(sigmoid(np.array([-2.0, 2.0])), 1 / (1 + np.exp([2.0, -2.0])))
+
+
+def test_tracked_kernel_is_current(model, features):
+    kernel = ScoringKernel.load(os.path.join(ASSETS_DIR, KERNEL_FILE))
+    assert kernel.source_digest == source_digest(ASSETS_DIR)
+    compiled = compile_kernel(model, load_preprocessor(ASSETS_DIR))
+    np.testing.assert_array_equal(kernel.weights, compiled.weights)
+    assert kernel.bias == compiled.bias
+
+
+def test_fresh_kernel_loads_regardless_of_mtime(assets_copy, monkeypatch):
+    # A checkout can leave the kernel older than its sources; the digest still matches.
+    os.utime(os.path.join(assets_copy, KERNEL_FILE), (0, 0))
+
+    def fail(*args):
+        raise AssertionError("kernel should not be recompiled")
+
+    monkeypatch.setattr(scoring_kernel, 'compile_from_assets', fail)
+    assert load_or_compile_kernel(assets_copy).source_digest == source_digest(assets_copy)
+
+
+def test_changed_sources_recompile_kernel(assets_copy):
+    kernel_path = os.path.join(assets_copy, KERNEL_FILE)
+    with open(preprocessing_path(assets_copy), 'a') as f:
+        f.write('\n')
+    digest = source_digest(assets_copy)
+    assert ScoringKernel.load(kernel_path).source_digest != digest
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        kernel = load_or_compile_kernel(assets_copy)
+    assert kernel.source_digest == digest
+    assert ScoringKernel.load(kernel_path).source_digest == digest
+
+
+def test_kernel_without_digest_is_recompiled(assets_copy):
+    kernel_path = os.path.join(assets_copy, KERNEL_FILE)
+    legacy = ScoringKernel.load(kernel_path)
+    np.savez(kernel_path, weights=legacy.weights, bias=legacy.bias, columns=np.array(legacy.columns))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        kernel = load_or_compile_kernel(assets_copy)
+    assert kernel.source_digest == source_digest(assets_copy)
+
+
+def test_save_replaces_kernel_atomically(assets_copy):
+    kernel_path = os.path.join(assets_copy, KERNEL_FILE)
+    kernel = ScoringKernel.load(kernel_path)
+    kernel.save(kernel_path)
+    assert sorted(os.listdir(assets_copy)) == sorted([MODEL_FILE, os.path.basename(preprocessing_path(assets_copy)), KERNEL_FILE])
+    np.testing.assert_array_equal(ScoringKernel.load(kernel_path).weights, kernel.weights)
+
+
+def test_unreadable_kernel_is_recompiled(assets_copy):
+    kernel_path = os.path.join(assets_copy, KERNEL_FILE)
+    with open(kernel_path, 'rb') as f:
+        partial = f.read(100)
+    with open(kernel_path, 'wb') as f:
+        f.write(partial)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        kernel = load_or_compile_kernel(assets_copy)
+    assert kernel.source_digest == source_digest(assets_copy)
+    assert ScoringKernel.load(kernel_path).source_digest == kernel.source_digest
@@ -0,0 +1,77 @@
+"""What-if simulation: free-text parsing and the month-by-month projection.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import numpy as np
+import pytest
+from simulation import SAVINGS_RATE, ScenarioError, normalize_scenario, parse_scenario_text, simulate
+
+CATEGORIES = ['Dining', 'Travel', 'Shopping', 'Entertainment']
+
+
+def changes(text):
+    scenario = parse_scenario_text(text, CATEGORIES)
+    return scenario and scenario["changes"]
+
+
+def test_one_time_purchase():
+    assert changes("What if I buy a $1,000 laptop today?") == [{"type": "one_time_expense", "amount": 1000.0}]
+
+
+def test_a_month_before_the_amount_is_not_monthly():
+    assert changes("In a month I'll buy a $1000 TV") == [{"type": "one_time_expense", "amount": 1000.0}]
+
+
+@pytest.mark.parametrize("text", ["I'll pay $120 a month for a gym", "A new gym at $120 per month",
+                                  "Add a $120 monthly gym membership", "A gym for $120/mo"])
+def test_recurring_expense(text):
+    assert changes(text) == [{"type": "recurring_expense", "amount": 120.0}]
+
+
+@pytest.mark.parametrize("text", ["What if I cancel my $15 a month streaming?", "Cut my $40 monthly gym",
+                                  "Stop the $30 per month magazine", "Put $1k into savings each month",
+                                  "What if I start saving $200 more per month?"])
+def test_freed_monthly_amount_goes_to_savings(text):
+    assert [change["type"] for change in changes(text)] == ["extra_savings"]
+
+
+def test_category_cut_and_increase():
+    assert changes("Cut dining by 50%") == [{"type": "cut_category", "category": "Dining", "percent": 50.0}]
+    assert changes("Spend 20% more on travel") == [{"type": "cut_category", "category": "Travel", "percent": -20.0}]
+
+
+@pytest.mark.parametrize("text", ["What if I move to Mars?", "A refund of $200",
+                                  "Swap a $50 plan for a $30 plan"])
+def test_unclear_text_is_left_to_the_llm(text):
+    assert parse_scenario_text(text, CATEGORIES) is None
+
+
+def test_normalize_rejects_bad_changes():
+    with pytest.raises(ScenarioError):
+        normalize_scenario({"changes": [{"type": "cut_category", "category": "Rent", "percent": 10}]}, CATEGORIES)
+    with pytest.raises(ScenarioError):
+        normalize_scenario({"changes": [{"type": "one_time_expense", "amount": 10, "month": 7}]}, CATEGORIES)
+
+
+def test_projection():
+    spend = {'Dining': 400.0, 'Travel': 600.0}
+    scenarios = [normalize_scenario(change_list, CATEGORIES) for change_list in (
+        [{"type": "cut_category", "category": "Dining", "percent": 50}],
+        [{"type": "one_time_expense", "amount": 300, "month": 2}],
+        [{"type": "recurring_expense", "amount": 100, "start_month": 3}],
+    )]
+    projection = simulate(spend, 1200.0, scenarios, months=4)
+    baseline = SAVINGS_RATE * 1200.0
+    np.testing.assert_allclose(projection["baseline"], [baseline] * 4)
+    np.testing.assert_allclose(projection["savings"], [[baseline + 200] * 4,
+                                                       [baseline, baseline - 300, baseline, baseline],
+                                                       [baseline, baseline, baseline - 100, baseline - 100]])
+    np.testing.assert_allclose(projection["cumulative"][:, -1], projection["savings"].sum(axis=1))
+
+
+def test_cuts_to_one_category_stop_at_everything_it_spends():
+    spend = {'Dining': 400.0, 'Travel': 600.0}
+    cut = {"type": "cut_category", "category": "Dining", "percent": 70}
+    scenario = normalize_scenario([cut, cut], CATEGORIES)
+    projection = simulate(spend, 1000.0, [scenario], months=2)
+    np.testing.assert_allclose(projection["savings"], [[SAVINGS_RATE * 1000.0 + 400.0] * 2])
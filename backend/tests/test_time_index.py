@@ -0,0 +1,101 @@
+"""Sorted time index: rolling and calendar periods against a brute-force scan.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from dataset_store import DatasetStore
+from ingest import append_csv_rows
+from test_dataset_store import transactions
+from time_index import DAY_SECONDS, TimeIndex
+
+CATEGORIES = ['Dining', 'Travel', 'Shopping']
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(0)
+    times = rng.uniform(0, 120 * DAY_SECONDS, 2000).round()
+    times[::97] = np.nan
+    amounts = rng.uniform(1, 100, 2000).round(2)
+    codes = rng.integers(-1, len(CATEGORIES), 2000)
+    return times, amounts, codes
+
+
+def brute_force(times, amounts, codes, positions, start, stop):
+    keep = np.isin(codes, positions)
+    if start is not None:
+        keep &= (times >= start) & (times < stop)
+    return amounts[keep].sum()
+
+
+@pytest.mark.parametrize("period", ['this_week', 'last_week', 'this_month', 'last_month', 'all_time'])
+@pytest.mark.parametrize("category", [None, 'dining', 'ing'])
+def test_rolling_periods_match_a_scan(rows, period, category):
+    times, amounts, codes = rows
+    index = TimeIndex.build(times, amounts, codes, CATEGORIES)
+    start, stop = index.period_range(period)
+    positions = ([-1] + list(range(len(CATEGORIES))) if category is None else
+                 [i for i, name in enumerate(CATEGORIES) if category in name.lower()])
+    expected = brute_force(times, amounts, codes, positions, start, stop)
+    assert index.spending(period, category) == pytest.approx(expected)
+
+
+def test_rolling_windows_end_at_the_latest_transaction(rows):
+    index = TimeIndex.build(*rows, CATEGORIES)
+    assert index.latest == np.nanmax(rows[0])
+    start, stop = index.period_range('last_week')
+    assert (start, stop) == (index.latest - 14 * DAY_SECONDS, index.latest - 7 * DAY_SECONDS)
+
+
+def test_calendar_periods_with_an_epoch():
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def tick(*date):
+        return (datetime(*date, tzinfo=timezone.utc) - epoch).total_seconds()
+
+    index = TimeIndex.build(np.array([tick(2024, 3, 15, 12)]), np.array([1.0]), np.array([0]), CATEGORIES)
+    assert index.period_range('this_month', epoch=epoch) == (tick(2024, 3, 1), np.inf)
+    assert index.period_range('last_month', epoch=epoch) == (tick(2024, 2, 1), tick(2024, 3, 1))
+    assert index.period_range('this_week', epoch=epoch) == (tick(2024, 3, 11), np.inf)  # a Monday
+    assert index.period_range('last_week', epoch=epoch) == (tick(2024, 3, 4), tick(2024, 3, 11))
+
+
+def test_empty_index():
+    index = TimeIndex.build(np.array([]), np.array([]), np.array([], dtype='int64'), CATEGORIES)
+    assert index.latest is None
+    assert index.spending('this_month') == 0.0
+    assert index.spending('all_time', 'dining') == 0.0
+
+
+def test_saved_index_answers_the_same(rows, tmp_path):
+    index = TimeIndex.build(*rows, CATEGORIES)
+    index.save(str(tmp_path / 'index'))
+    loaded = TimeIndex.load(str(tmp_path / 'index'))
+    assert loaded.latest == index.latest
+    for period in ('this_month', 'last_week', 'all_time'):
+        assert loaded.spending(period, 'travel') == index.spending(period, 'travel')
+
+
+def test_store_index_follows_appends(tmp_path):
+    csv_path = str(tmp_path / 'upload.csv')
+    transactions(30).to_csv(csv_path, index=False)
+    store = DatasetStore(csv_path, str(tmp_path / 'columnar'))
+    assert store.load_time_index().latest == 29
+    delta = transactions(5, start=30, seed=1)
+    store.append(store.appender(), delta, append_csv_rows)
+    index = store.load_time_index()
+    assert index.latest == 34
+    assert index.spending('all_time') == pytest.approx(store.load()['Amount'].sum())
+
+
+def test_invalid_epoch_fails_at_import():
+    result = subprocess.run([sys.executable, '-c', 'import time_index'], cwd=BACKEND_DIR, capture_output=True,
+                            text=True, env={**os.environ, 'TIME_EPOCH': 'yesterday'})
+    assert result.returncode != 0
+    assert "TIME_EPOCH must be an ISO-8601 datetime" in result.stderr
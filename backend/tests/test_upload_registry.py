@@ -0,0 +1,83 @@
+"""Per-upload dataset handles: IDs, the latest upload, eviction and discards.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import os
+import numpy as np
+import pytest
+from test_dataset_store import transactions
+from upload_registry import UnknownDatasetError, UploadRegistry
+
+
+def write_csv(df):
+    return lambda file, path: df.to_csv(path, index=False)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return UploadRegistry(str(tmp_path / 'uploads'))
+
+
+def test_each_upload_gets_its_own_dataset(registry):
+    first, first_path = registry.save_upload(None, write_csv(transactions(10)))
+    second, _ = registry.save_upload(None, write_csv(transactions(20, seed=1)))
+    assert first != second
+    assert os.path.basename(first_path) == 'upload.csv'
+    assert len(registry.load(first)) == 10
+    assert len(registry.load(second)) == 20
+    assert registry.meta(second)["num_rows"] == 20
+
+
+def test_latest_upload(registry):
+    assert registry.latest_id() is None
+    dataset_id, _ = registry.save_upload(None, write_csv(transactions(5)))
+    registry.mark_latest(dataset_id)
+    assert registry.latest_id() == dataset_id
+
+
+@pytest.mark.parametrize("dataset_id", [None, '', '../etc', 'ABC', '0' * 32])
+def test_unknown_or_malformed_ids(registry, dataset_id):
+    with pytest.raises(UnknownDatasetError):
+        registry.store(dataset_id)
+
+
+def test_discard_removes_the_upload(registry):
+    dataset_id, csv_path = registry.save_upload(None, write_csv(transactions(5)))
+    registry.load(dataset_id)
+    registry.discard(dataset_id)
+    assert not os.path.exists(os.path.dirname(csv_path))
+    with pytest.raises(UnknownDatasetError):
+        registry.load(dataset_id)
+
+
+def test_memory_budget_evicts_the_coldest_dataset(tmp_path):
+    registry = UploadRegistry(str(tmp_path / 'uploads'), memory_budget_bytes=1)
+    first, _ = registry.save_upload(None, write_csv(transactions(10)))
+    second, _ = registry.save_upload(None, write_csv(transactions(10, seed=1)))
+    registry.load(first)
+    registry.load(second)
+    # The dataset just loaded is kept even over the budget; the other is unloaded.
+    assert list(registry._stores) == [second]
+    np.testing.assert_allclose(registry.load(first)['Time'], np.arange(10))
+
+
+def test_open_handles_are_bounded(tmp_path):
+    registry = UploadRegistry(str(tmp_path / 'uploads'), max_open_datasets=2)
+    ids = [registry.save_upload(None, write_csv(transactions(5, seed=i)))[0] for i in range(4)]
+    for dataset_id in ids:
+        registry.meta(dataset_id)
+        with registry.dataset_lock(dataset_id):
+            pass
+    assert list(registry._stores) == ids[2:]
+    assert set(registry._dataset_locks) <= set(ids[2:])
+
+
+def test_anomalies_round_trip(registry):
+    dataset_id, _ = registry.save_upload(None, write_csv(transactions(5)))
+    with pytest.raises(UnknownDatasetError):
+        registry.load_anomalies(dataset_id)
+    registry.save_anomalies(dataset_id, [1, 3], [0.9, 0.7])
+    registry.append_anomalies(dataset_id, [7], [0.6])
+    positions, scores = registry.load_anomalies(dataset_id)
+    assert positions.tolist() == [1, 3, 7]
+    np.testing.assert_allclose(scores, [0.9, 0.7, 0.6])
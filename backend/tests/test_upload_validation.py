@@ -0,0 +1,99 @@
+"""Upload validation: what is refused from the first block, before a full parse.
+
+Run from the backend directory with: python -m pytest tests
+"""
+import io
+import warnings
+import pytest
+from ingest import MissingColumnsError
+from test_dataset_store import transactions
+from upload_registry import UploadRegistry
+from upload_validation import UploadRejected, validate_csv_upload
+
+REQUIRED = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+
+def csv_bytes(rows=20):
+    return transactions(rows).to_csv(index=False).encode()
+
+
+def validate(data, **limits):
+    stream = io.BytesIO(data)
+    stream.seek(5)
+    result = validate_csv_upload(stream, REQUIRED, **limits)
+    assert stream.tell() == 0  # left rewound for the real parse
+    return result
+
+
+def test_valid_upload():
+    header, size, estimated_rows = validate(csv_bytes())
+    assert header[:2] == ['Time', 'V1'] and 'Category' in header
+    assert size == len(csv_bytes())
+    assert 0 < estimated_rows <= 20
+
+
+def test_row_estimate_is_a_lower_bound_from_the_first_block():
+    data = csv_bytes(2000)
+    _, _, estimated_rows = validate(data, sniff_bytes=4096)
+    assert 1000 < estimated_rows <= 2000
+
+
+def test_missing_model_columns():
+    with pytest.raises(MissingColumnsError) as error:
+        validate(b'Time,Amount,Category\n1,2.5,Dining\n')
+    assert 'V1' in error.value.args[0]
+
+
+@pytest.mark.parametrize("data, message", [
+    (b'', 'empty'),
+    (b'  \n\n', 'empty'),
+    (b'Time,V1\x00\x01', 'not a CSV'),
+    (b'\xff\xfe' + b'T\x00i\x00', 'not a CSV'),
+])
+def test_unreadable_files(data, message):
+    with pytest.raises(UploadRejected, match=message) as error:
+        validate(data)
+    assert error.value.status == 400
+
+
+def test_first_row_with_extra_fields():
+    header = ','.join(REQUIRED).encode()
+    row = ','.join(['1'] * (len(REQUIRED) + 2)).encode()
+    with pytest.raises(UploadRejected, match='fields'):
+        validate(header + b'\n' + row + b'\n')
+
+
+def test_header_longer_than_the_sniffed_block():
+    with pytest.raises(UploadRejected, match='No header line'):
+        validate(b'x' * 100 + b'\n1\n', sniff_bytes=50)
+
+
+def test_size_and_row_limits_answer_413():
+    data = csv_bytes(200)
+    with pytest.raises(UploadRejected) as error:
+        validate(data, max_bytes=len(data) - 1)
+    assert error.value.status == 413
+    with pytest.raises(UploadRejected) as error:
+        validate(data, max_rows=10)
+    assert error.value.status == 413
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # scikit-learn version mismatch on unpickling
+        import app
+    monkeypatch.setattr(app, 'upload_registry', UploadRegistry(str(tmp_path / 'uploads')))
+    return app.app.test_client()
+
+
+def test_rejected_uploads_are_not_stored(client, tmp_path):
+    response = client.post('/analyze', data={'file': (io.BytesIO(b'\x00\x01'), 'x.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Upload rejected"
+    response = client.post('/analyze', data={'file': (io.BytesIO(b'Time,Amount\n1,2\n'), 'x.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert "missing required columns" in response.get_json()["error"]
+    assert not any(path.is_dir() for path in (tmp_path / 'uploads').iterdir())
@@ -0,0 +1,151 @@
+"""Sorted per-category time index for period questions ("last month", "this week").
+
+Rows are ordered by (category, Time): one contiguous, time-sorted segment
+per category, with uncategorized rows last, plus a running total of Amount
+over that order. The spending of a category between two times is then two
+binary searches and a subtraction: O(log n) per matching category, however
+many rows fall in the range.
+
+Time counts TIME_RESOLUTION_SECONDS-second ticks. With TIME_EPOCH set (the
+ISO-8601 UTC datetime of Time == 0), months and weeks are calendar months
+and ISO weeks. Without it, they are rolling 30- and 7-day windows. Either
+way, "this" and "last" are relative to the dataset's latest transaction,
+not the wall clock, so historical uploads still answer sensibly.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from aggregate_index import matching_positions
+
+TIME_RESOLUTION_SECONDS = float(os.getenv('TIME_RESOLUTION_SECONDS', 1))
+TIME_PERIODS = ('this_week', 'last_week', 'this_month', 'last_month', 'all_time')
+DAY_SECONDS = 86400
+ROLLING_DAYS = {'week': 7, 'month': 30}
+
+
+def parse_epoch(text):
+    """TIME_EPOCH as an aware UTC datetime (naive values are taken as UTC), or None."""
+    if not text:
+        return None
+    epoch = datetime.fromisoformat(text)
+    return epoch if epoch.tzinfo else epoch.replace(tzinfo=timezone.utc)
+
+
+# Parsed once here, so a bad value stops startup instead of failing every period query.
+try:
+    TIME_EPOCH = parse_epoch(os.getenv('TIME_EPOCH'))
+except ValueError:
+    raise ValueError(f"TIME_EPOCH must be an ISO-8601 datetime such as 2024-01-01T00:00:00, "
+                     f"got {os.getenv('TIME_EPOCH')!r}") from None
+
+
+def _calendar_start(moment, unit):
+    if unit == 'week':
+        day = moment - timedelta(days=moment.weekday())
+        return day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _previous_start(start, unit):
+    if unit == 'week':
+        return start - timedelta(days=7)
+    return _calendar_start(start - timedelta(days=1), 'month')
+
+
+class TimeIndex:
+    """Time-sorted Amount prefix sums, one segment per category."""
+
+    def __init__(self, categories, offsets, times, amount_prefix):
+        self.categories = list(categories)
+        self.offsets = np.asarray(offsets, dtype='int64')
+        self.times = times
+        self.amount_prefix = amount_prefix
+        self.latest = self._latest()
+
+    @classmethod
+    def build(cls, times, amounts, codes, categories):
+        """Builds the index from column arrays; a category code of -1 means no category."""
+        num_categories = len(categories)
+        codes = np.where(np.asarray(codes) < 0, num_categories, codes)
+        order = np.lexsort((np.asarray(times, dtype='float64'), codes))
+        sorted_codes = codes[order]
+        offsets = np.searchsorted(sorted_codes, np.arange(num_categories + 2))
+        amount_prefix = np.concatenate([[0.0], np.cumsum(np.nan_to_num(np.asarray(amounts, dtype='float64')[order]))])
+        return cls(categories, offsets, np.asarray(times, dtype='float64')[order], amount_prefix)
+
+    def save(self, index_dir):
+        os.makedirs(index_dir)
+        np.save(os.path.join(index_dir, 'times.npy'), self.times)
+        np.save(os.path.join(index_dir, 'amount_prefix.npy'), self.amount_prefix)
+        np.save(os.path.join(index_dir, 'offsets.npy'), self.offsets)
+        with open(os.path.join(index_dir, 'categories.json'), 'w') as f:
+            json.dump(self.categories, f)
+
+    @classmethod
+    def load(cls, index_dir):
+        """Memory-maps a saved index; only the pages a lookup touches are read."""
+        with open(os.path.join(index_dir, 'categories.json')) as f:
+            categories = json.load(f)
+        return cls(categories, np.load(os.path.join(index_dir, 'offsets.npy')),
+                   np.load(os.path.join(index_dir, 'times.npy'), mmap_mode='r'),
+                   np.load(os.path.join(index_dir, 'amount_prefix.npy'), mmap_mode='r'))
+
+    def _segment(self, position):
+        return self.offsets[position], self.offsets[position + 1]
+
+    def _latest(self):
+        # Each segment is sorted with missing times last, so its latest valid
+        # time sits just before the first NaN: O(categories), not a scan.
+        latest = None
+        for position in range(len(self.offsets) - 1):
+            start, stop = self._segment(position)
+            valid = start + np.searchsorted(self.times[start:stop], np.inf, side='right')
+            if valid > start and (latest is None or self.times[valid - 1] > latest):
+                latest = float(self.times[valid - 1])
+        return latest
+
+    def period_range(self, period, epoch=None, resolution=TIME_RESOLUTION_SECONDS):
+        """[start, stop) in Time units for one of TIME_PERIODS; (None, None) means every row."""
+        if period == 'all_time':
+            return None, None
+        if self.latest is None:
+            return np.inf, np.inf
+        which, unit = period.split('_')
+        epoch = TIME_EPOCH if epoch is None else epoch
+        if epoch is None:
+            length = ROLLING_DAYS[unit] * DAY_SECONDS / resolution
+            start = self.latest - length
+            return (start, np.inf) if which == 'this' else (start - length, start)
+
+        def ticks(moment):
+            return (moment - epoch).total_seconds() / resolution
+
+        current = _calendar_start(epoch + timedelta(seconds=self.latest * resolution), unit)
+        if which == 'this':
+            return ticks(current), np.inf
+        return ticks(_previous_start(current, unit)), ticks(current)
+
+    def range_totals(self, positions, start, stop):
+        """(sum of Amount, rows) for the given category positions with start <= Time < stop.
+
+        None for both bounds selects every row, including those without a Time.
+        """
+        total, count = 0.0, 0
+        for position in positions:
+            first, last = self._segment(position)
+            segment = self.times[first:last]
+            lo = first if start is None else first + np.searchsorted(segment, start, side='left')
+            hi = last if stop is None else first + np.searchsorted(segment, stop, side='left')
+            total += float(self.amount_prefix[hi] - self.amount_prefix[lo])
+            count += int(hi - lo)
+        return total, count
+
+    def spending(self, period, category=None):
+        """Spending in a period: matching categories (as AggregateIndex), or every row when category is None."""
+        if category is None:
+            positions = range(len(self.offsets) - 1)
+        else:
+            positions = matching_positions(self.categories, category)
+        start, stop = self.period_range(period)
+        return self.range_totals(positions, start, stop)[0]
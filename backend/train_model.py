@@ -1,98 +1,286 @@
-import pandas as pd
-import joblib
-import os
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import confusion_matrix, accuracy_score, precision_score, recall_score, f1_score, matthews_corrcoef
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
-import seaborn as sns
+"""Trains the fraud detection model and saves it to ml_assets/.
 
-print("Starting model training process...")
+Usage (from the backend directory):
+    python train_model.py                         # in-memory LogisticRegression (default)
+    python train_model.py --mode stream --n-jobs 4
+        # streams creditcard.csv in chunks and fits an SGD logistic regression
+        # with partial_fit; CV and the alpha search run on --n-jobs cores
+    python train_model.py --output-dir ml_assets/candidates/<name>
+        # trains a candidate for /models/evaluate without replacing the served model
+"""
+import argparse
+import json
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from preprocessing import PREPROCESSING_FILE, Preprocessor
+from scoring import RAW_FEATURE_COLUMNS
 
-# --- 1. Load Data ---
 try:
-    df = pd.read_csv('creditcard.csv')
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Downcast dtypes for streamed chunks; Time (< 2**24 seconds) is exact in float32.
+CSV_DTYPES = {'Time': 'float32', **{f'V{i}': 'float32' for i in range(1, 29)}, 'Amount': 'float32', 'Class': 'int8'}
+OUTPUT_DIR = 'ml_assets'
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- Streaming mode helpers ---
+def iter_chunks(csv_path, chunk_rows, preprocessor, test_size, n_folds, seed):
+    """Yields (X, y, is_test, fold) per CSV chunk, X holding the model features.
+
+    The test/fold assignment is drawn from a generator seeded by the chunk
+    index, so every pass over the file (and every worker) sees the same split.
+    """
+    reader = pd.read_csv(csv_path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunk_rows)
+    for index, chunk in enumerate(reader):
+        features = preprocessor.transform(chunk[RAW_FEATURE_COLUMNS].to_numpy())
+        X = pd.DataFrame(features, columns=preprocessor.feature_names)
+        rng = np.random.default_rng([seed, index])
+        is_test = rng.random(len(chunk)) < test_size
+        fold = rng.integers(0, n_folds, len(chunk))
+        yield X, chunk['Class'].to_numpy(), is_test, fold
+
+
+def fit_streaming(csv_path, alpha, opts, holdout_folds=(None,)):
+    """Fits SGD logistic regressions over the training rows, epoch by epoch.
+
+    One model per entry of holdout_folds trains from the same pass over the
+    file: a fold index leaves that CV fold out and evaluates on it, None uses
+    every training row and evaluates on the test rows. Returns (models,
+    2x2 confusion counts per model, peak RSS in MB).
+    """
+    from sklearn.linear_model import SGDClassifier
+
+    def rows(holdout, is_test, fold, training):
+        if holdout is None:
+            return ~is_test if training else is_test
+        return ~is_test & ((fold != holdout) if training else (fold == holdout))
+
+    models = [SGDClassifier(loss='log_loss', alpha=alpha, random_state=opts['seed']) for _ in holdout_folds]
+    chunk_args = (csv_path, opts['chunk_rows'], opts['preprocessor'], opts['test_size'], opts['n_folds'], opts['seed'])
+    for _ in range(opts['epochs']):
+        for X, y, is_test, fold in iter_chunks(*chunk_args):
+            for model, holdout in zip(models, holdout_folds):
+                train = rows(holdout, is_test, fold, training=True)
+                if train.any():
+                    model.partial_fit(X[train], y[train], classes=[0, 1])
+
+    cms = [np.zeros(4, dtype='int64') for _ in holdout_folds]
+    for X, y, is_test, fold in iter_chunks(*chunk_args):
+        for model, holdout, cm in zip(models, holdout_folds, cms):
+            evaluate = rows(holdout, is_test, fold, training=False)
+            if evaluate.any():
+                cm += np.bincount(y[evaluate] * 2 + model.predict(X[evaluate]), minlength=4)
+    return models, [cm.reshape(2, 2) for cm in cms], peak_rss_mb()
+
+
+def train_streaming(args):
+    """Out-of-core training: one pass for scaler statistics, a parallel
+    cross-validated alpha search, then a final fit on all training rows."""
+    from joblib import Parallel, delayed
+    from sklearn.preprocessing import StandardScaler
+    from confusion_report import derived_metrics
+
+    stats = {"mode": "stream", "chunk_rows": args.chunk_rows, "n_jobs": args.n_jobs, "epochs": args.epochs}
+    total_start = time.perf_counter()
+
+    # Pass 1: per-column statistics for the scaled features.
+    start = time.perf_counter()
+    amount_scaler, time_scaler = StandardScaler(), StandardScaler()
+    num_rows = 0
+    for chunk in pd.read_csv(args.csv, usecols=['Time', 'Amount'], dtype=CSV_DTYPES, chunksize=args.chunk_rows):
+        amount_scaler.partial_fit(chunk['Amount'].to_numpy(dtype='float64').reshape(-1, 1))
+        time_scaler.partial_fit(chunk['Time'].to_numpy(dtype='float64').reshape(-1, 1))
+        num_rows += len(chunk)
+    stats["num_rows"] = num_rows
+    stats["scaler_pass_seconds"] = time.perf_counter() - start
+    print(f"Scaler statistics computed over {num_rows} rows.")
+
+    preprocessor = Preprocessor.from_column_stats({
+        "scaled_amount": (float(amount_scaler.mean_[0]), float(amount_scaler.scale_[0])),
+        "scaled_time": (float(time_scaler.mean_[0]), float(time_scaler.scale_[0])),
+    })
+    opts = {
+        "chunk_rows": args.chunk_rows, "epochs": args.epochs, "seed": args.seed,
+        "test_size": args.test_size, "n_folds": args.cv_folds, "preprocessor": preprocessor,
+    }
+
+    # Cross-validated search over alpha: one worker per alpha, each fitting
+    # all of its CV folds from a single stream of the file.
+    start = time.perf_counter()
+    folds = list(range(args.cv_folds))
+    results = Parallel(n_jobs=args.n_jobs)(
+        delayed(fit_streaming)(args.csv, alpha, opts, holdout_folds=folds) for alpha in args.alphas
+    )
+    cv_scores = {alpha: [derived_metrics(cm)["f1_score"] for cm in cms]
+                 for alpha, (_, cms, _) in zip(args.alphas, results)}
+    best_alpha = max(args.alphas, key=lambda alpha: np.mean(cv_scores[alpha]))
+    stats["search_seconds"] = time.perf_counter() - start
+    stats["cv_f1"] = {str(alpha): float(np.mean(scores)) for alpha, scores in cv_scores.items()}
+    stats["best_alpha"] = best_alpha
+    worker_peaks = [peak for _, _, peak in results if peak is not None]
+    stats["worker_peak_rss_mb"] = max(worker_peaks) if worker_peaks else None
+    print(f"Cross-validation complete. F1 by alpha: {stats['cv_f1']}; best alpha {best_alpha}.")
+
+    # Final fit on every training row, evaluated on the held-out test rows.
+    start = time.perf_counter()
+    (model,), (cm,), _ = fit_streaming(args.csv, best_alpha, opts)
+    stats["final_fit_seconds"] = time.perf_counter() - start
+    print("Model training complete.")
+
+    metrics = derived_metrics(cm)
+    stats["total_seconds"] = time.perf_counter() - total_start
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return model, preprocessor, metrics, cm, stats
+
+
+def train_in_memory(args):
+    """The original path: whole CSV in memory, single LogisticRegression fit."""
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import confusion_matrix, accuracy_score, precision_score, recall_score, f1_score, matthews_corrcoef
+
+    stats = {"mode": "memory"}
+    total_start = time.perf_counter()
+
+    # --- 1. Load Data ---
+    df = pd.read_csv(args.csv)
     print("Dataset loaded successfully.")
-except FileNotFoundError:
-    print("Error: 'creditcard.csv' not found. Make sure it's in the 'backend' directory.")
-    exit()
-
-# --- 2. Preprocess Data ---
-# Separate features (X) and target (y)
-X = df.drop('Class', axis=1)
-y = df['Class']
-
-# Scale the 'Amount' and 'Time' columns
-# Using StandardScaler to normalize the data
-scaler = StandardScaler()
-X['scaled_amount'] = scaler.fit_transform(X['Amount'].values.reshape(-1, 1))
-X['scaled_time'] = scaler.fit_transform(X['Time'].values.reshape(-1, 1))
-X = X.drop(['Time', 'Amount'], axis=1)
-print("Data preprocessing and scaling complete.")
-
-# --- 3. Split Data ---
-# Split into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-print("Data split into training and testing sets.")
-
-# --- 4. Train Model ---
-# Using Logistic Regression, which is good for this type of binary classification
-model = LogisticRegression(max_iter=1000, random_state=42)
-model.fit(X_train, y_train)
-print("Model training complete.")
-
-# --- 5. Evaluate Model & Get Metrics ---
-# This is where we get the numbers for our website display
-y_pred = model.predict(X_test)
-
-# Calculate the confusion matrix values
-# .ravel() flattens the matrix into a simple array [tn, fp, fn, tp]
-tn, fp, fn, tp = confusion_matrix(y_test, y_pred).ravel()
-
-# Calculate performance metrics
-accuracy = accuracy_score(y_test, y_pred)
-precision = precision_score(y_test, y_pred)
-recall = recall_score(y_test, y_pred)
-# New metrics
-f1 = f1_score(y_test, y_pred)
-mcc = matthews_corrcoef(y_test, y_pred)
-specificity = tn / (tn + fp)
-
-metrics = {
-    "tn": int(tn), "fp": int(fp),
-    "fn": int(fn), "tp": int(tp),
-    "accuracy": accuracy,
-    "precision": precision,
-    "recall": recall,
-    "f1_score": f1,
-    "specificity": specificity,
-    "mcc": mcc
-}
-print("Model evaluation complete. Metrics:")
-print(metrics)
-
-# --- Confusion Matrix Plot ---
-cm = confusion_matrix(y_test, y_pred)
-plt.figure(figsize=(6, 4))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['Not Fraud', 'Fraud'], yticklabels=['Not Fraud', 'Fraud'])
-plt.xlabel('Predicted')
-plt.ylabel('Actual')
-plt.title('Confusion Matrix')
-plt.tight_layout()
-plt.show()
-
-# --- 6. Save Artifacts ---
-# Create the ml_assets directory if it doesn't already exist
-output_dir = 'ml_assets'
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Use joblib to serialize and save the Python objects to files
-joblib.dump(model, os.path.join(output_dir, 'fraud_detection_model.pkl'))
-joblib.dump(metrics, os.path.join(output_dir, 'model_metrics.pkl'))
-joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
-
-print(f"\nSuccess! Model, metrics, and scaler have been saved to the '{output_dir}/' directory.")
\ No newline at end of file
+    stats["num_rows"] = len(df)
+
+    # --- 2. Preprocess Data ---
+    # Separate features (X) and target (y)
+    raw = df[RAW_FEATURE_COLUMNS].to_numpy()
+    y = df['Class']
+
+    # Scale the 'Amount' and 'Time' columns, each with its own statistics.
+    # The fitted preprocessor is saved so serving applies exactly the same
+    # transform.
+    preprocessor = Preprocessor.fit(raw)
+    X = pd.DataFrame(preprocessor.transform(raw), columns=preprocessor.feature_names)
+    del raw
+    print("Data preprocessing and scaling complete.")
+
+    # --- 3. Split Data ---
+    # Split into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.seed, stratify=y
+    )
+    print("Data split into training and testing sets.")
+
+    # --- 4. Train Model ---
+    # Using Logistic Regression, which is good for this type of binary classification
+    start = time.perf_counter()
+    model = LogisticRegression(max_iter=1000, random_state=args.seed)
+    model.fit(X_train, y_train)
+    stats["fit_seconds"] = time.perf_counter() - start
+    print("Model training complete.")
+
+    # --- 5. Evaluate Model & Get Metrics ---
+    # This is where we get the numbers for our website display
+    y_pred = model.predict(X_test)
+
+    # Calculate the confusion matrix values
+    # .ravel() flattens the matrix into a simple array [tn, fp, fn, tp]
+    cm = confusion_matrix(y_test, y_pred)
+    tn, fp, fn, tp = cm.ravel()
+
+    metrics = {
+        "tn": int(tn), "fp": int(fp),
+        "fn": int(fn), "tp": int(tp),
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred),
+        "recall": recall_score(y_test, y_pred),
+        "f1_score": f1_score(y_test, y_pred),
+        "specificity": tn / (tn + fp),
+        "mcc": matthews_corrcoef(y_test, y_pred),
+    }
+    stats["total_seconds"] = time.perf_counter() - total_start
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return model, preprocessor, metrics, cm, stats
+
+
+def plot_confusion_matrix(cm):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(6, 4))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['Not Fraud', 'Fraud'], yticklabels=['Not Fraud', 'Fraud'])
+    plt.xlabel('Predicted')
+    plt.ylabel('Actual')
+    plt.title('Confusion Matrix')
+    plt.tight_layout()
+    plt.show()
+
+
+# Use joblib to serialize and save the Python objects to files. Each file is
+# written to a temporary name and renamed into place, so a running server
+# (which hot-swaps new artifacts) never reads a half-written pickle.
+def dump_atomic(obj, filename, output_dir=OUTPUT_DIR):
+    path = os.path.join(output_dir, filename)
+    joblib.dump(obj, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the fraud detection model.")
+    parser.add_argument('--csv', default='creditcard.csv')
+    parser.add_argument('--mode', choices=['memory', 'stream'], default='memory',
+                        help='memory: load the whole CSV; stream: chunked, out-of-core SGD')
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--epochs', type=int, default=3, help='passes over the CSV per streaming fit')
+    parser.add_argument('--alphas', type=float, nargs='+', default=[1e-5, 1e-4, 1e-3],
+                        help='SGD regularization strengths to cross-validate')
+    parser.add_argument('--cv-folds', type=int, default=3)
+    parser.add_argument('--n-jobs', type=int, default=-1, help='worker processes for the alpha search (one alpha per worker)')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-plot', action='store_true', help='skip the confusion matrix window')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help='where to save the artifacts, e.g. ml_assets/candidates/<name> for a candidate model')
+    args = parser.parse_args()
+
+    print("Starting model training process...")
+    if not os.path.exists(args.csv):
+        print(f"Error: '{args.csv}' not found. Make sure it's in the 'backend' directory.")
+        exit()
+
+    train = train_streaming if args.mode == 'stream' else train_in_memory
+    model, preprocessor, metrics, cm, stats = train(args)
+    print("Model evaluation complete. Metrics:")
+    print(metrics)
+    print("Training stats:")
+    print(stats)
+
+    if not args.no_plot:
+        plot_confusion_matrix(cm)
+
+    # --- 6. Save Artifacts ---
+    # Create the ml_assets directory if it doesn't already exist
+    output_dir = args.output_dir
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    dump_atomic(model, 'fraud_detection_model.pkl', output_dir)
+    dump_atomic(metrics, 'model_metrics.pkl', output_dir)
+    preprocessor.save(os.path.join(output_dir, PREPROCESSING_FILE))
+    with open(os.path.join(output_dir, 'training_stats.json.tmp'), 'w') as f:
+        json.dump(stats, f, indent=2)
+    os.replace(os.path.join(output_dir, 'training_stats.json.tmp'), os.path.join(output_dir, 'training_stats.json'))
+
+    print(f"\nSuccess! Model, metrics, preprocessing and training stats have been saved to the '{output_dir}/' directory.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Per-upload dataset handles backed by the columnar dataset store."""
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from dataset_store import DatasetStore, file_lock
+
+DEFAULT_MEMORY_BUDGET_BYTES = int(os.getenv('DATASET_CACHE_BYTES', 512 * 1024 * 1024))
+# Dataset handles kept open at most, loaded or not.
+DEFAULT_MAX_OPEN_DATASETS = int(os.getenv('DATASET_MAX_OPEN', 256))
+LATEST_FILE = 'LATEST'
+UPLOAD_FILE = 'upload.csv'
+ANOMALIES_FILE = 'anomalies.npz'
+APPEND_LOCK_FILE = '.append.lock'
+# Sorted content hashes of the rows stored so far, one .npy segment per upload or append.
+ROW_HASHES_DIR = 'row_hashes'
+_DATASET_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UnknownDatasetError(KeyError):
+    """Raised when a dataset ID is malformed or has no stored upload."""
+
+
+def _atomic_write_text(path, text):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class UploadRegistry:
+    """Stores each upload under its own ID and keeps hot datasets in memory.
+
+    Uploads are written to a temporary file and renamed into place, so
+    concurrent workers sharing the uploads directory never see a partial
+    file and never need a lock. Loaded DataFrames are kept in an LRU that
+    is bounded by memory_budget_bytes; evicted datasets stay on disk in
+    columnar form and are memory-mapped again on the next access.
+    """
+
+    def __init__(self, root_dir, memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES,
+                 max_open_datasets=DEFAULT_MAX_OPEN_DATASETS):
+        self.root_dir = root_dir
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_open_datasets = max_open_datasets
+        self._lock = threading.Lock()
+        self._stores = OrderedDict()
+        self._dataset_locks = {}
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _dataset_dir(self, dataset_id):
+        if not dataset_id or not _DATASET_ID_RE.match(dataset_id):
+            raise UnknownDatasetError(dataset_id)
+        return os.path.join(self.root_dir, dataset_id)
+
+    def csv_path(self, dataset_id):
+        return os.path.join(self._dataset_dir(dataset_id), UPLOAD_FILE)
+
+    def save_upload(self, file, save_fn):
+        """Atomically stores an uploaded file and returns (dataset_id, csv_path).
+
+        save_fn(file, path) performs the actual copy, e.g. ingest.save_upload.
+        """
+        dataset_id = uuid.uuid4().hex
+        dataset_dir = self._dataset_dir(dataset_id)
+        os.makedirs(dataset_dir)
+        csv_path = os.path.join(dataset_dir, UPLOAD_FILE)
+        tmp_path = f'{csv_path}.{os.getpid()}.tmp'
+        save_fn(file, tmp_path)
+        os.replace(tmp_path, csv_path)
+        return dataset_id, csv_path
+
+    def discard(self, dataset_id):
+        """Removes a rejected upload from disk and from the LRU."""
+        with self._lock:
+            self._stores.pop(dataset_id, None)
+            self._dataset_locks.pop(dataset_id, None)
+        shutil.rmtree(self._dataset_dir(dataset_id), ignore_errors=True)
+
+    def mark_latest(self, dataset_id):
+        """Records dataset_id as the default for requests that don't name one."""
+        _atomic_write_text(os.path.join(self.root_dir, LATEST_FILE), dataset_id)
+
+    def latest_id(self):
+        try:
+            with open(os.path.join(self.root_dir, LATEST_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def store(self, dataset_id):
+        """Returns the DatasetStore for dataset_id, tracking it in the LRU."""
+        csv_path = self.csv_path(dataset_id)
+        with self._lock:
+            store = self._stores.get(dataset_id)
+            if store is not None:
+                self._stores.move_to_end(dataset_id)
+                return store
+        if not os.path.exists(csv_path):
+            raise UnknownDatasetError(dataset_id)
+        store = DatasetStore(csv_path, os.path.join(os.path.dirname(csv_path), 'columnar'))
+        with self._lock:
+            store = self._stores.setdefault(dataset_id, store)
+            self._stores.move_to_end(dataset_id)
+        self._enforce_budget(keep=dataset_id)
+        return store
+
+    def meta(self, dataset_id):
+        """Returns the columnar metadata for dataset_id (num_rows, columns, ...)."""
+        return self.store(dataset_id).meta()
+
+    def load(self, dataset_id):
+        """Returns the dataset as a DataFrame, evicting cold datasets if needed."""
+        df = self.store(dataset_id).load()
+        self._enforce_budget(keep=dataset_id)
+        return df
+
+    def load_aggregates(self, dataset_id):
+        """Returns the precomputed AggregateIndex for dataset_id."""
+        return self.store(dataset_id).load_aggregates()
+
+    def load_time_index(self, dataset_id):
+        """Returns the sorted TimeIndex for dataset_id."""
+        return self.store(dataset_id).load_time_index()
+
+    def save_anomalies(self, dataset_id, positions, scores):
+        """Stores the row positions and scores of the upload's flagged rows."""
+        path = os.path.join(self._dataset_dir(dataset_id), ANOMALIES_FILE)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz'
+        np.savez(tmp_path, positions=np.asarray(positions, dtype='int64'), scores=np.asarray(scores, dtype='float64'))
+        os.replace(tmp_path, path)
+
+    def append_anomalies(self, dataset_id, positions, scores):
+        """Adds flagged rows from an append to those saved for the upload."""
+        try:
+            old_positions, old_scores = self.load_anomalies(dataset_id)
+        except UnknownDatasetError:
+            old_positions, old_scores = np.empty(0, dtype='int64'), np.empty(0)
+        self.save_anomalies(dataset_id, np.concatenate([old_positions, np.asarray(positions, dtype='int64')]),
+                            np.concatenate([old_scores, np.asarray(scores, dtype='float64')]))
+
+    @contextmanager
+    def dataset_lock(self, dataset_id):
+        """Serializes appends to one dataset across threads and worker processes.
+
+        A thread lock orders this process's requests, and an flock on a file
+        in the dataset directory orders them against other workers.
+        """
+        lock_path = os.path.join(self._dataset_dir(dataset_id), APPEND_LOCK_FILE)
+        with self._lock:
+            lock = self._dataset_locks.setdefault(dataset_id, threading.Lock())
+        with lock, file_lock(lock_path):
+            yield
+
+    def _row_hash_segments(self, dataset_id):
+        hashes_dir = os.path.join(self._dataset_dir(dataset_id), ROW_HASHES_DIR)
+        try:
+            names = sorted(name for name in os.listdir(hashes_dir) if name.endswith('.npy'))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(hashes_dir, name) for name in names]
+
+    def has_row_hashes(self, dataset_id):
+        return bool(self._row_hash_segments(dataset_id))
+
+    def save_row_hashes(self, dataset_id, hashes):
+        """Stores the content hashes of newly stored rows as a new sorted segment.
+
+        The newest segments are merged while the previous one is at most
+        twice the size of the new one, so a dataset keeps O(log rows)
+        segments and each hash is rewritten O(log rows) times.
+        """
+        hashes_dir = os.path.join(self._dataset_dir(dataset_id), ROW_HASHES_DIR)
+        os.makedirs(hashes_dir, exist_ok=True)
+        segments = self._row_hash_segments(dataset_id)
+        next_index = int(os.path.basename(segments[-1])[:-len('.npy')]) + 1 if segments else 0
+        merged = np.unique(np.asarray(hashes, dtype='uint64'))
+        if segments and len(merged) == 0:
+            return
+        replaced = []
+        while segments and len(np.load(segments[-1], mmap_mode='r')) <= 2 * len(merged):
+            replaced.append(segments.pop())
+            merged = np.union1d(np.load(replaced[-1]), merged)
+        path = os.path.join(hashes_dir, f'{next_index:06d}.npy')
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, merged)
+        os.replace(tmp_path, path)
+        for old_path in replaced:
+            os.remove(old_path)
+
+    def known_row_hashes(self, dataset_id, hashes):
+        """Boolean mask: which of hashes are already stored for the dataset.
+
+        Each segment is memory-mapped and binary-searched, so the cost grows
+        with the number of new rows, not with the size of the history.
+        """
+        hashes = np.asarray(hashes, dtype='uint64')
+        known = np.zeros(len(hashes), dtype=bool)
+        for path in self._row_hash_segments(dataset_id):
+            segment = np.load(path, mmap_mode='r')
+            if len(segment) == 0:
+                continue
+            positions = np.minimum(np.searchsorted(segment, hashes), len(segment) - 1)
+            known |= segment[positions] == hashes
+        return known
+
+    def load_anomalies(self, dataset_id):
+        """Returns (positions, scores) saved by save_anomalies."""
+        path = os.path.join(self._dataset_dir(dataset_id), ANOMALIES_FILE)
+        try:
+            with np.load(path) as data:
+                return data['positions'], data['scores']
+        except FileNotFoundError:
+            raise UnknownDatasetError(dataset_id)
+
+    def _enforce_budget(self, keep=None):
+        with self._lock:
+            total = sum(store.cached_nbytes() for store in self._stores.values())
+            for dataset_id in list(self._stores):
+                if total <= self.memory_budget_bytes and len(self._stores) <= self.max_open_datasets:
+                    break
+                if dataset_id == keep:
+                    continue
+                store = self._stores.pop(dataset_id)
+                self._dataset_locks.pop(dataset_id, None)
+                loaded = store.cached_nbytes()
+                total -= loaded
+                store.unload()
+                if loaded:
+                    print(f"[REGISTRY] Evicted dataset {dataset_id} from memory")
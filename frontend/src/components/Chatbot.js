@@ -3,7 +3,7 @@ import axios from 'axios';
 
 const API_URL = process.env.REACT_APP_API_URL;
 
-function Chatbot() {
+function Chatbot({ datasetId }) {
     const [query, setQuery] = useState('');
     const [response, setResponse] = useState('');
     const [isLoading, setIsLoading] = useState(false);
@@ -19,7 +19,8 @@ function Chatbot() {
 
         try {
             const result = await axios.post(`${API_URL}/query`, {
-                query: query
+                query: query,
+                dataset_id: datasetId
             });
             setResponse(result.data.response || JSON.stringify(result.data, null, 2));
         } catch (err) {
@@ -4,65 +4,71 @@ import axios from 'axios';
 const API_URL = process.env.REACT_APP_API_URL;
 
 
-// This component fetches and displays the confusion matrix image from the backend
+// This component fetches the confusion matrix counts from the backend and renders them as a table
 function ConfusionMatrixImage({ file }) {
-    const [imgSrc, setImgSrc] = useState(null);
+    const [matrix, setMatrix] = useState(null);
     const [error, setError] = useState('');
     const [loading, setLoading] = useState(false);
-    const [showModal, setShowModal] = useState(false);
 
     useEffect(() => {
         if (!file) {
-            setImgSrc(null);
+            setMatrix(null);
             setError('');
             return;
         }
-        const fetchImage = async () => {
+        const fetchMatrix = async () => {
             setLoading(true);
             setError('');
-            setImgSrc(null);
+            setMatrix(null);
             const formData = new FormData();
             formData.append('file', file);
             try {
-                const response = await axios.post(`${API_URL}/confusion-matrix`, formData, {
+                // format=json returns just the 2x2 counts and metrics; no server-side image rendering
+                const response = await axios.post(`${API_URL}/confusion-matrix?format=json`, formData, {
                     headers: { 'Content-Type': 'multipart/form-data' },
                 });
-                setImgSrc(`data:image/png;base64,${response.data.image}`);
+                setMatrix(response.data);
             } catch (err) {
-                setError('Failed to load confusion matrix image.');
+                setError('Failed to load confusion matrix.');
             } finally {
                 setLoading(false);
             }
         };
-        fetchImage();
+        fetchMatrix();
     }, [file]);
 
     if (!file) return null;
     if (loading) return <p>Loading confusion matrix...</p>;
     if (error) return <p style={{ color: 'red' }}>{error}</p>;
-    if (!imgSrc) return null;
+    if (!matrix) return null;
+    const { tn, fp, fn, tp, accuracy, precision, recall } = matrix;
     return (
-        <div style={{ textAlign: 'center', margin: '24px 0' }}>
+        <div className="confusion-matrix-panel">
             <h4>Confusion Matrix</h4>
-            <img
-                src={imgSrc}
-                alt="Confusion Matrix"
-                style={{ maxWidth: '100%', border: '1px solid #ccc', borderRadius: '8px', cursor: 'pointer', transition: 'box-shadow 0.2s' }}
-                onClick={() => setShowModal(true)}
-                title="Click to enlarge"
-            />
-            {showModal && (
-                <div className="cmatrix-modal-overlay" onClick={() => setShowModal(false)}>
-                    <div className="cmatrix-modal-content" onClick={e => e.stopPropagation()}>
-                        <img
-                            src={imgSrc}
-                            alt="Confusion Matrix Enlarged"
-                            style={{ maxWidth: '90vw', maxHeight: '80vh', borderRadius: '12px', boxShadow: '0 8px 32px rgba(0,0,0,0.25)' }}
-                        />
-                        <button className="cmatrix-modal-close" onClick={() => setShowModal(false)}>&times;</button>
-                    </div>
-                </div>
-            )}
+            <table className="confusion-matrix">
+                <thead>
+                    <tr>
+                        <th>Actual \ Predicted</th>
+                        <th>Not Fraud</th>
+                        <th>Fraud</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    <tr>
+                        <th>Not Fraud</th>
+                        <td className="true-negative">{tn}</td>
+                        <td className="false-positive">{fp}</td>
+                    </tr>
+                    <tr>
+                        <th>Fraud</th>
+                        <td className="false-negative">{fn}</td>
+                        <td className="true-positive">{tp}</td>
+                    </tr>
+                </tbody>
+            </table>
+            <p className="confusion-matrix-summary">
+                Accuracy {accuracy.toFixed(4)} · Precision {precision.toFixed(4)} · Recall {recall.toFixed(4)}
+            </p>
         </div>
     );
 }
@@ -267,8 +267,8 @@ function FinAnalysis({
                             </div>
                         </div>
                     )}
-                    {activeTab === 'chatbot' && <Chatbot />}
-                    {activeTab === 'simulator' && <WhatIfSimulator />}
+                    {activeTab === 'chatbot' && <Chatbot datasetId={results && results.dataset_id} />}
+                    {activeTab === 'simulator' && <WhatIfSimulator datasetId={results && results.dataset_id} />}
                 </>
             )}
         </div>
@@ -3,7 +3,14 @@ import axios from 'axios';
 
 const API_URL = process.env.REACT_APP_API_URL;
 
-function WhatIfSimulator() {
+// Figures come back as numbers; older responses used preformatted strings.
+const formatMoney = (value) => (
+    typeof value === 'number'
+        ? value.toLocaleString(undefined, { minimumFractionDigits: 2, maximumFractionDigits: 2 })
+        : value
+);
+
+function WhatIfSimulator({ datasetId }) {
     const [scenario, setScenario] = useState('');
     const [simulation, setSimulation] = useState(null);
     const [isLoading, setIsLoading] = useState(false);
@@ -19,7 +26,8 @@ function WhatIfSimulator() {
 
         try {
             const result = await axios.post(`${API_URL}/simulate`, {
-                scenario: scenario
+                scenario: scenario,
+                dataset_id: datasetId
             });
             setSimulation(result.data);
         } catch (err) {
@@ -57,9 +65,9 @@ function WhatIfSimulator() {
                     <h4>Simulation Results:</h4>
                     <div className="result-card">
                         <p><strong>Impact:</strong> {simulation.impact_description}</p>
-                        <p><strong>Original 6-month savings:</strong> ${simulation.original_6month_savings}</p>
-                        <p><strong>New 6-month savings:</strong> ${simulation.new_6month_savings}</p>
-                        <p><strong>Monthly change:</strong> ${simulation.monthly_change}</p>
+                        <p><strong>Original 6-month savings:</strong> ${formatMoney(simulation.original_6month_savings)}</p>
+                        <p><strong>New 6-month savings:</strong> ${formatMoney(simulation.new_6month_savings)}</p>
+                        <p><strong>Monthly change:</strong> ${formatMoney(simulation.monthly_change)}</p>
                     </div>
 
                     {simulation.recommendations && simulation.recommendations.length > 0 && (